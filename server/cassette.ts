@@ -0,0 +1,218 @@
+import fs from 'fs'
+import path from 'path'
+import crypto from 'crypto'
+
+// Record/replay of upstream provider traffic. In record mode every provider
+// response is stored with its timing; in replay mode the same request is
+// answered from disk, so tests and prompt tuning don't pay for real calls.
+
+export type CassetteMode = 'record' | 'replay'
+
+interface RecordedChunk {
+  delayMs: number
+  text: string
+}
+
+interface Interaction {
+  key: string
+  request: { path: string; body: unknown }
+  response: {
+    status: number
+    headers: Record<string, string>
+    headersMs: number
+    chunks: RecordedChunk[]
+  }
+}
+
+interface CassetteFile {
+  version: 1
+  interactions: Interaction[]
+}
+
+// Transport-level headers would not match a body that fetch already decoded.
+const SKIPPED_HEADERS = new Set([
+  'connection',
+  'content-encoding',
+  'content-length',
+  'date',
+  'keep-alive',
+  'set-cookie',
+  'transfer-encoding',
+])
+
+const CASSETTE_NAME = /^[\w.-]+$/
+
+function sleep(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms))
+}
+
+/** API keys are sent in headers, so the key only covers the path and body. */
+function requestKey(urlPath: string, body: string): string {
+  return crypto.createHash('sha256').update(`${urlPath}\n${body}`).digest('hex').slice(0, 16)
+}
+
+function parseBody(body: string): unknown {
+  try {
+    return JSON.parse(body)
+  } catch {
+    return body
+  }
+}
+
+export function isValidCassetteName(name: unknown): name is string {
+  return typeof name === 'string' && CASSETTE_NAME.test(name)
+}
+
+export class Cassette {
+  readonly mode: CassetteMode
+  readonly name: string
+  readonly speed: number
+  private file: string
+  private interactions: Interaction[]
+  private cursors = new Map<string, number>()
+
+  /** `speed` scales replay timing: 1 = original pacing, 10 = ten times faster, 0 = instant. */
+  constructor(mode: CassetteMode, dir: string, name: string, speed: number) {
+    this.mode = mode
+    this.name = name
+    this.speed = speed
+    this.file = path.join(dir, `${name}.json`)
+    this.interactions =
+      mode === 'replay' && fs.existsSync(this.file)
+        ? (JSON.parse(fs.readFileSync(this.file, 'utf-8')) as CassetteFile).interactions
+        : []
+  }
+
+  get size(): number {
+    return this.interactions.length
+  }
+
+  describe() {
+    return { mode: this.mode, name: this.name, speed: this.speed, size: this.size }
+  }
+
+  fetch = async (url: string, init: RequestInit): Promise<Response> => {
+    const urlPath = new URL(url).pathname
+    const body = typeof init.body === 'string' ? init.body : ''
+    const key = requestKey(urlPath, body)
+
+    return this.mode === 'record'
+      ? this.record(url, init, { key, request: { path: urlPath, body: parseBody(body) } })
+      : this.replay(key)
+  }
+
+  private async record(
+    url: string,
+    init: RequestInit,
+    entry: Pick<Interaction, 'key' | 'request'>,
+  ): Promise<Response> {
+    const started = performance.now()
+    const response = await fetch(url, init)
+    const headersAt = performance.now()
+
+    const headers: Record<string, string> = {}
+    response.headers.forEach((value, name) => {
+      if (!SKIPPED_HEADERS.has(name)) headers[name] = value
+    })
+
+    const chunks: RecordedChunk[] = []
+    const save = () => {
+      this.interactions.push({
+        ...entry,
+        response: {
+          status: response.status,
+          headers,
+          headersMs: Math.round(headersAt - started),
+          chunks,
+        },
+      })
+      fs.mkdirSync(path.dirname(this.file), { recursive: true })
+      fs.writeFileSync(
+        this.file,
+        JSON.stringify({ version: 1, interactions: this.interactions } satisfies CassetteFile, null, 2),
+      )
+    }
+
+    if (!response.body) {
+      save()
+      return new Response(null, { status: response.status, headers })
+    }
+
+    // Pass the body through untouched while noting when each chunk arrived.
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let last = headersAt
+
+    const stream = new ReadableStream<Uint8Array>({
+      async pull(controller) {
+        const { done, value } = await reader.read()
+        if (done) {
+          const tail = decoder.decode()
+          if (tail) chunks.push({ delayMs: 0, text: tail })
+          save()
+          controller.close()
+          return
+        }
+        const now = performance.now()
+        chunks.push({ delayMs: Math.round(now - last), text: decoder.decode(value, { stream: true }) })
+        last = now
+        controller.enqueue(value)
+      },
+      cancel(reason) {
+        return reader.cancel(reason)
+      },
+    })
+
+    return new Response(stream, { status: response.status, headers })
+  }
+
+  private async replay(key: string): Promise<Response> {
+    const matches = this.interactions.filter((i) => i.key === key)
+    if (matches.length === 0) {
+      return Response.json(
+        { error: `No recorded interaction ${key} in cassette "${this.name}"` },
+        { status: 500 },
+      )
+    }
+
+    // Repeated identical requests (e.g. Regenerate) replay successive recordings.
+    const cursor = this.cursors.get(key) ?? 0
+    this.cursors.set(key, cursor + 1)
+    const { response } = matches[cursor % matches.length]
+
+    const pace = (ms: number) => (this.speed > 0 && ms > 0 ? sleep(ms / this.speed) : undefined)
+    await pace(response.headersMs)
+
+    const encoder = new TextEncoder()
+    const stream = new ReadableStream<Uint8Array>({
+      async start(controller) {
+        for (const chunk of response.chunks) {
+          await pace(chunk.delayMs)
+          controller.enqueue(encoder.encode(chunk.text))
+        }
+        controller.close()
+      },
+    })
+
+    return new Response(stream, { status: response.status, headers: response.headers })
+  }
+}
+
+/** Builds the cassette configured by CassetteMode / CassetteDir / Cassette / CassetteSpeed. */
+export function cassetteFromEnv(defaultDir: string): Cassette | null {
+  const mode = process.env.CassetteMode?.toLowerCase()
+  if (mode !== 'record' && mode !== 'replay') return null
+
+  const name = process.env.Cassette || 'default'
+  if (!isValidCassetteName(name)) {
+    throw new Error(`Invalid cassette name: ${name}`)
+  }
+
+  const speed = Number(process.env.CassetteSpeed ?? 1)
+  return new Cassette(
+    mode,
+    process.env.CassetteDir || defaultDir,
+    name,
+    Number.isFinite(speed) && speed >= 0 ? speed : 1,
+  )
+}
@@ -0,0 +1,56 @@
+import os from 'os'
+import path from 'path'
+import fs from 'fs'
+import v8 from 'v8'
+import vm from 'vm'
+import express from 'express'
+import type { IdeaStore } from './sections'
+
+// Memory introspection for the soak tests. Mounted only when YomaDebug is set:
+// heap snapshots expose everything the process holds, including API keys.
+
+export function isDebugEnabled(): boolean {
+  const flag = process.env.YomaDebug?.toLowerCase()
+  return flag === '1' || flag === 'true'
+}
+
+let collectGarbage: (() => void) | null = null
+
+/** Lazily exposes V8's gc() without requiring --expose-gc on the command line. */
+function forceGC() {
+  if (!collectGarbage) {
+    v8.setFlagsFromString('--expose-gc')
+    collectGarbage = vm.runInNewContext('gc') as () => void
+  }
+  collectGarbage()
+}
+
+export function debugRouter(ideaStore: IdeaStore) {
+  const router = express.Router()
+  const snapshotDir = process.env.YomaDebugDir || os.tmpdir()
+
+  // ?gc=1 collects garbage first, so samples reflect retained memory only.
+  // `ideas` shows when the store is full: growth before that is expected.
+  router.get('/memory', (req, res) => {
+    if (req.query.gc === '1') forceGC()
+    const { rss, heapTotal, heapUsed, external, arrayBuffers } = process.memoryUsage()
+    res.json({
+      rss,
+      heapTotal,
+      heapUsed,
+      external,
+      arrayBuffers,
+      uptimeMs: Math.round(process.uptime() * 1000),
+      ideas: { stored: ideaStore.size, capacity: ideaStore.capacity },
+    })
+  })
+
+  router.post('/heap-snapshot', (_req, res) => {
+    fs.mkdirSync(snapshotDir, { recursive: true })
+    forceGC()
+    const file = v8.writeHeapSnapshot(path.join(snapshotDir, `server-${Date.now()}.heapsnapshot`))
+    res.json({ path: file })
+  })
+
+  return router
+}
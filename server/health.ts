@@ -0,0 +1,129 @@
+import express from 'express'
+
+// Probes for orchestration: /healthz says the process is up, /readyz says it
+// can serve a generation right now — valid configuration, a reachable
+// provider that accepts our key, and a key with admission headroom.
+
+export interface CheckResult {
+  ok: boolean
+  detail: string
+}
+
+export interface UpstreamCheck extends CheckResult {
+  latencyMs: number
+  checkedAt: string
+}
+
+interface ReadinessChecks {
+  config: () => CheckResult
+  admission: () => CheckResult
+  upstream: () => Promise<CheckResult>
+}
+
+// The upstream probe is a real HTTP round trip, so its result is reused;
+// failures are retried sooner than successes are refreshed.
+const UPSTREAM_OK_TTL_MS = 30_000
+const UPSTREAM_FAILED_TTL_MS = 2_000
+
+export function isWarmupEnabled(): boolean {
+  const flag = process.env.YomaWarmup?.toLowerCase()
+  return flag === '1' || flag === 'true'
+}
+
+export class Readiness {
+  private checks: ReadinessChecks
+  private upstream: UpstreamCheck | null = null
+  private upstreamAt = 0
+  private pending: Promise<UpstreamCheck> | null = null
+  private warming = false
+
+  constructor(checks: ReadinessChecks) {
+    this.checks = checks
+  }
+
+  /** Cached upstream probe; concurrent callers share one request. */
+  checkUpstream(): Promise<UpstreamCheck> {
+    const cached = this.upstream
+    if (cached) {
+      const ttl = cached.ok ? UPSTREAM_OK_TTL_MS : UPSTREAM_FAILED_TTL_MS
+      if (Date.now() - this.upstreamAt < ttl) return Promise.resolve(cached)
+    }
+    this.pending ??= this.probe().finally(() => {
+      this.pending = null
+    })
+    return this.pending
+  }
+
+  private async probe(): Promise<UpstreamCheck> {
+    const started = performance.now()
+    const result = await this.checks.upstream().catch(
+      (error: unknown): CheckResult => ({
+        ok: false,
+        detail: error instanceof Error ? error.message : String(error),
+      }),
+    )
+    this.upstreamAt = Date.now()
+    this.upstream = {
+      ...result,
+      latencyMs: Math.round(performance.now() - started),
+      checkedAt: new Date(this.upstreamAt).toISOString(),
+    }
+    return this.upstream
+  }
+
+  /**
+   * Probes the provider until it answers, leaving a warm keep-alive
+   * connection for the first real request. Not ready until then.
+   * Resolves with the successful check.
+   */
+  async warmUp(): Promise<UpstreamCheck> {
+    this.warming = true
+    try {
+      for (;;) {
+        const check = await this.checkUpstream()
+        if (check.ok) return check
+        console.warn(`Warm-up failed: ${check.detail}, retrying in ${UPSTREAM_FAILED_TTL_MS} ms`)
+        await new Promise((resolve) => setTimeout(resolve, UPSTREAM_FAILED_TTL_MS))
+      }
+    } finally {
+      this.warming = false
+    }
+  }
+
+  private async upstreamCheck(): Promise<CheckResult> {
+    if (!this.warming) return this.checkUpstream()
+    const last = this.upstream ? `, last probe: ${this.upstream.detail}` : ''
+    return { ok: false, detail: `warming up${last}` }
+  }
+
+  async report() {
+    const config = this.checks.config()
+    const upstream: CheckResult = config.ok
+      ? await this.upstreamCheck()
+      : { ok: false, detail: 'skipped: configuration is invalid' }
+    // After the probe: a 429 to the probe takes that key out of rotation.
+    const admission = this.checks.admission()
+
+    return {
+      ready: config.ok && upstream.ok && admission.ok,
+      checks: { config, upstream, admission },
+    }
+  }
+}
+
+export function healthRouter(readiness: Readiness) {
+  const router = express.Router()
+
+  router.get('/healthz', (_req, res) => {
+    res.setHeader('Cache-Control', 'no-store')
+    res.json({ status: 'ok', uptimeMs: Math.round(process.uptime() * 1000) })
+  })
+
+  router.get('/readyz', async (_req, res) => {
+    const report = await readiness.report()
+    res.setHeader('Cache-Control', 'no-store')
+    res.status(report.ready ? 200 : 503).json(report)
+  })
+
+  return router
+}
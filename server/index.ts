@@ -2,32 +2,75 @@ import path from 'path'
 import express from 'express'
 import cors from 'cors'
 import dotenv from 'dotenv'
+import { serveStatic, compressJson } from './static'
+import { KeyPool, parseKeys, retryAfterMs, type RateLimits, type PooledKey } from './keyPool'
+import { Cassette, cassetteFromEnv, isValidCassetteName } from './cassette'
+import { debugRouter, isDebugEnabled } from './debug'
+import { Readiness, healthRouter, isWarmupEnabled, type CheckResult } from './health'
+import { traceOf, traced, traceRequests, type Trace } from './tracing'
+import { PromptError, parseIdeaRequest, buildIdeaPrompt, ideaRequestKey } from './prompt'
+import {
+  IdeaStore,
+  parseSections,
+  joinSections,
+  sectionBody,
+  buildSectionPrompt,
+} from './sections'
 
 dotenv.config({ path: path.resolve(import.meta.dirname, '..', '.env') })
 
 const app = express()
 app.use(cors())
-app.use(express.json())
+app.use('/api', compressJson)
+app.use(['/api/generate', '/api/regenerate-section'], traceRequests())
+app.use(traced('parse', express.json()))
 
 const PORT = process.env.PORT || 3001
+const IS_PRODUCTION = process.env.NODE_ENV === 'production'
+const DIST_DIR = path.resolve(import.meta.dirname, '..', 'dist')
 
 const AI_PROVIDER = (process.env.WhatAIYomaWillUse || 'Claude').toLowerCase()
 
-function getAIConfig() {
-  if (AI_PROVIDER === 'claude') {
-    return {
-      provider: 'Claude' as const,
-      apiKey: process.env.ClaudeAPI || '',
-      model: process.env.ClaudeModel || 'claude-sonnet-4-20250514',
-    }
-  }
+const CASSETTE_DIR = path.resolve(import.meta.dirname, '..', 'tests', 'cassettes')
+let cassette = cassetteFromEnv(CASSETTE_DIR)
+
+// Replaying never reaches the provider, so it works without real keys.
+function providerKeys(value: string | undefined): string[] {
+  const keys = parseKeys(value)
+  return keys.length === 0 && cassette?.mode === 'replay' ? ['cassette-replay'] : keys
+}
+
+function upstreamFetch(url: string, init: RequestInit): Promise<Response> {
+  return cassette ? cassette.fetch(url, init) : fetch(url, init)
+}
+
+function rateLimits(provider: 'Claude' | 'Openrouter'): RateLimits {
   return {
-    provider: 'Openrouter' as const,
-    apiKey: process.env.OpenrouterAPI || '',
-    model: process.env.OpenrouterModel || 'openai/gpt-4o',
+    requestsPerMinute: Number(process.env[`${provider}RPM`]) || 50,
+    tokensPerMinute: Number(process.env[`${provider}TPM`]) || 80000,
   }
 }
 
+// Each *API variable may hold several comma-separated keys.
+const AI_CONFIG =
+  AI_PROVIDER === 'claude'
+    ? {
+        provider: 'Claude' as const,
+        pool: new KeyPool(providerKeys(process.env.ClaudeAPI), rateLimits('Claude')),
+        model: process.env.ClaudeModel || 'claude-sonnet-4-20250514',
+        baseUrl: process.env.ClaudeBaseURL || 'https://api.anthropic.com',
+      }
+    : {
+        provider: 'Openrouter' as const,
+        pool: new KeyPool(providerKeys(process.env.OpenrouterAPI), rateLimits('Openrouter')),
+        model: process.env.OpenrouterModel || 'openai/gpt-4o',
+        baseUrl: process.env.OpenrouterBaseURL || 'https://openrouter.ai/api/v1',
+      }
+
+function getAIConfig() {
+  return AI_CONFIG
+}
+
 const SYSTEM_PROMPT = `You are YomaAI — a uniquely creative idea generator for storytelling projects. Your entire purpose is to craft ORIGINAL, NON-CLICHÉ ideas that surprise and inspire creators.
 
 ═══════════════════════════════════════
@@ -277,83 +320,444 @@ CRITICAL REMINDERS
 4. "None (Realistic)" means if you cannot explain something with a Wikipedia article about real technology, it does NOT belong in the story.
 5. Your reputation depends on generating ideas that are genuinely, verifiably fresh. Every idea should feel like it could redefine its genre.`
 
-app.post('/api/generate', async (req, res) => {
-  const { prompt } = req.body
+type AIConfig = ReturnType<typeof getAIConfig>
 
-  if (!prompt) {
-    res.status(400).json({ error: 'Prompt is required' })
-    return
-  }
+interface AIResult {
+  text: string
+  outputTokens: number | null
+}
 
-  const config = getAIConfig()
+class UpstreamError extends Error {
+  status: number
+  retryAfterMs: number | null
 
-  if (!config.apiKey) {
-    res.status(500).json({ error: `API key for ${config.provider} is not configured` })
-    return
+  constructor(status: number, body: string, retryAfterMs: number | null = null) {
+    super(body)
+    this.status = status
+    this.retryAfterMs = retryAfterMs
   }
+}
 
-  try {
-    if (config.provider === 'Claude') {
-      const response = await fetch('https://api.anthropic.com/v1/messages', {
+const FULL_MAX_TOKENS = 8192
+const SECTION_MAX_TOKENS = 2048
+
+// Rough chars-per-token ratio, only used to size token-bucket reservations.
+const CHARS_PER_TOKEN = 4
+
+/** Tokens to reserve for a request: estimated input plus the output limit. */
+function estimateTokens(prompt: string, maxTokens: number): number {
+  return Math.ceil((SYSTEM_PROMPT.length + prompt.length) / CHARS_PER_TOKEN) + maxTokens
+}
+
+const ideaStore = new IdeaStore(500)
+
+function buildRequest(config: AIConfig, apiKey: string, prompt: string, maxTokens: number) {
+  if (config.provider === 'Claude') {
+    return {
+      url: `${config.baseUrl}/v1/messages`,
+      init: {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'x-api-key': config.apiKey,
+          'x-api-key': apiKey,
           'anthropic-version': '2023-06-01',
         },
         body: JSON.stringify({
           model: config.model,
-          max_tokens: 8192,
+          max_tokens: maxTokens,
           system: SYSTEM_PROMPT,
           messages: [{ role: 'user', content: prompt }],
         }),
-      })
+      },
+    }
+  }
 
-      if (!response.ok) {
-        const err = await response.text()
-        res.status(response.status).json({ error: err })
-        return
-      }
+  return {
+    url: `${config.baseUrl}/chat/completions`,
+    init: {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization: `Bearer ${apiKey}`,
+      },
+      body: JSON.stringify({
+        model: config.model,
+        messages: [
+          { role: 'system', content: SYSTEM_PROMPT },
+          { role: 'user', content: prompt },
+        ],
+        max_tokens: maxTokens,
+      }),
+    },
+  }
+}
 
-      const data = await response.json()
-      const text = data.content?.[0]?.text || ''
-      res.json({ result: text })
-    } else {
-      const response = await fetch('https://openrouter.ai/api/v1/chat/completions', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          Authorization: `Bearer ${config.apiKey}`,
-        },
-        body: JSON.stringify({
-          model: config.model,
-          messages: [
-            { role: 'system', content: SYSTEM_PROMPT },
-            { role: 'user', content: prompt },
-          ],
-          max_tokens: 8192,
-        }),
-      })
+// The subset of the Anthropic / OpenRouter response bodies we read.
+interface ProviderResponse {
+  content?: { text?: string }[]
+  choices?: { message?: { content?: string } }[]
+  usage?: {
+    input_tokens?: number
+    output_tokens?: number
+    completion_tokens?: number
+    total_tokens?: number
+  }
+}
 
-      if (!response.ok) {
-        const err = await response.text()
-        res.status(response.status).json({ error: err })
-        return
-      }
+function readResult(
+  config: AIConfig,
+  data: ProviderResponse,
+): AIResult & { totalTokens: number | null } {
+  if (config.provider === 'Claude') {
+    const input = data.usage?.input_tokens
+    const output = data.usage?.output_tokens
+    return {
+      text: data.content?.[0]?.text || '',
+      outputTokens: output ?? null,
+      totalTokens: input !== undefined && output !== undefined ? input + output : null,
+    }
+  }
+  return {
+    text: data.choices?.[0]?.message?.content || '',
+    outputTokens: data.usage?.completion_tokens ?? null,
+    totalTokens: data.usage?.total_tokens ?? null,
+  }
+}
+
+/**
+ * Sends the prompt through the key pool: the key with the most headroom
+ * goes first, and keys answering 429/401/403 are taken out of rotation
+ * while the request moves on to the next one. Each attempt is a span of
+ * `trace`, and the provider receives it as `traceparent`.
+ */
+async function callAI(
+  config: AIConfig,
+  prompt: string,
+  maxTokens: number,
+  trace: Trace,
+): Promise<AIResult> {
+  const reserved = estimateTokens(prompt, maxTokens)
+  const tried = new Set<PooledKey>()
+  let lastError: UpstreamError | null = null
+
+  for (;;) {
+    const acquiring = trace.start('acquire')
+    const key = config.pool.acquire(reserved, tried)
+    trace.end(acquiring, key ? { key: key.id } : {})
+    if (!key) {
+      throw (
+        lastError ??
+        new UpstreamError(
+          429,
+          `All ${config.provider} API keys are rate limited — try again shortly`,
+          config.pool.retryAfterMs(reserved),
+        )
+      )
+    }
+    tried.add(key)
+
+    const { url, init } = buildRequest(config, key.secret, prompt, maxTokens)
+    // Provider queueing and generation: until the response headers arrive.
+    const upstream = trace.start('upstream', { key: key.id })
+    const headers = { ...init.headers, traceparent: trace.traceparent(upstream) }
+    let response: Response
+    try {
+      response = await upstreamFetch(url, { ...init, headers })
+    } catch (error) {
+      trace.end(upstream, { status: 'error' })
+      config.pool.settle(key, reserved, 0)
+      throw error
+    }
+    trace.end(upstream, { status: response.status })
 
-      const data = await response.json()
-      const text = data.choices?.[0]?.message?.content || ''
-      res.json({ result: text })
+    if (response.status === 429) {
+      config.pool.settle(key, reserved, 0, response.headers)
+      config.pool.markRateLimited(key, retryAfterMs(response.headers))
+      lastError = new UpstreamError(429, await response.text(), retryAfterMs(response.headers))
+      continue
     }
+
+    if (response.status === 401 || response.status === 403) {
+      config.pool.settle(key, reserved, 0)
+      config.pool.markUnauthorized(key)
+      console.error(`${config.provider} ${key.id} rejected (${response.status}), removed from rotation`)
+      lastError = new UpstreamError(response.status, await response.text())
+      continue
+    }
+
+    if (!response.ok) {
+      config.pool.settle(key, reserved, 0, response.headers)
+      throw new UpstreamError(response.status, await response.text())
+    }
+
+    const download = trace.start('download', { key: key.id })
+    const data: ProviderResponse = await response.json()
+    trace.end(download)
+    const { totalTokens, ...result } = readResult(config, data)
+    config.pool.settle(key, reserved, totalTokens ?? reserved, response.headers)
+    return result
+  }
+}
+
+function sendAIError(res: express.Response, error: unknown) {
+  if (error instanceof UpstreamError) {
+    if (error.retryAfterMs !== null) {
+      res.setHeader('Retry-After', Math.ceil(error.retryAfterMs / 1000))
+    }
+    res.status(error.status).json({ error: error.message })
+    return
+  }
+  console.error('AI API error:', error)
+  res.status(500).json({ error: 'Failed to generate idea' })
+}
+
+/**
+ * The prompt and its request key for a /api/generate body: structured
+ * { selections, additionalDetails } from the create page, or a ready-made
+ * `prompt` from older clients. Returns null when neither is present.
+ */
+function resolvePrompt(body: Record<string, unknown>): { prompt: string; requestKey: string } | null {
+  if (body.selections !== undefined || body.additionalDetails !== undefined) {
+    const request = parseIdeaRequest(body)
+    return { prompt: buildIdeaPrompt(request), requestKey: ideaRequestKey(request) }
+  }
+  if (typeof body.prompt === 'string' && body.prompt) {
+    return { prompt: body.prompt, requestKey: ideaRequestKey(body.prompt) }
+  }
+  return null
+}
+
+app.post('/api/generate', async (req, res) => {
+  const trace = traceOf(res)
+  const prompting = trace.start('prompt')
+  let resolved: ReturnType<typeof resolvePrompt>
+  try {
+    resolved = resolvePrompt(req.body ?? {})
   } catch (error) {
-    console.error('AI API error:', error)
-    res.status(500).json({ error: 'Failed to generate idea' })
+    // Server-Timing is written with the response, so the span ends first.
+    trace.end(prompting)
+    if (!(error instanceof PromptError)) throw error
+    res.status(400).json({ error: error.message })
+    return
+  }
+  trace.end(prompting)
+
+  if (!resolved) {
+    res.status(400).json({ error: 'Prompt is required' })
+    return
+  }
+
+  const { prompt, requestKey } = resolved
+  const config = getAIConfig()
+
+  if (config.pool.size === 0) {
+    res.status(500).json({ error: `API key for ${config.provider} is not configured` })
+    return
+  }
+
+  try {
+    const { text, outputTokens } = await callAI(config, prompt, FULL_MAX_TOKENS, trace)
+    const splitting = trace.start('sections')
+    const { preamble, sections } = parseSections(text)
+    const ideaId = ideaStore.add({ prompt, preamble, sections })
+    trace.end(splitting)
+    res.json({ result: text, ideaId, requestKey, preamble, sections, usage: { outputTokens } })
+  } catch (error) {
+    sendAIError(res, error)
+  }
+})
+
+app.post('/api/regenerate-section', async (req, res) => {
+  const { ideaId, sectionId } = req.body
+
+  const idea = typeof ideaId === 'string' ? ideaStore.get(ideaId) : undefined
+  if (!idea) {
+    res.status(404).json({ error: 'Idea not found — generate it again' })
+    return
+  }
+
+  const index = idea.sections.findIndex((s) => s.id === sectionId)
+  if (index === -1) {
+    res.status(400).json({ error: `Unknown section: ${sectionId}` })
+    return
+  }
+
+  const config = getAIConfig()
+
+  if (config.pool.size === 0) {
+    res.status(500).json({ error: `API key for ${config.provider} is not configured` })
+    return
+  }
+
+  const section = idea.sections[index]
+
+  try {
+    const { text, outputTokens } = await callAI(
+      config,
+      buildSectionPrompt(idea, section),
+      SECTION_MAX_TOKENS,
+      traceOf(res),
+    )
+    const updated = { ...section, content: sectionBody(text, section.title) }
+    idea.sections = idea.sections.map((s, i) => (i === index ? updated : s))
+
+    res.json({
+      result: joinSections(idea.preamble, idea.sections),
+      ideaId,
+      preamble: idea.preamble,
+      sections: idea.sections,
+      section: updated,
+      usage: { outputTokens },
+    })
+  } catch (error) {
+    sendAIError(res, error)
+  }
+})
+
+// Key hints and utilization are for operators: hidden in production
+// unless debugging is explicitly enabled.
+if (!IS_PRODUCTION || isDebugEnabled()) {
+  app.get('/api/keys', (_req, res) => {
+    const config = getAIConfig()
+    res.json({ provider: config.provider, keys: config.pool.snapshot() })
+  })
+}
+
+const UPSTREAM_PROBE_TIMEOUT_MS = 5000
+
+function checkConfig(config: AIConfig): CheckResult {
+  if (config.pool.size === 0) {
+    return { ok: false, detail: `API key for ${config.provider} is not configured` }
+  }
+  if (!URL.canParse(config.baseUrl)) {
+    return { ok: false, detail: `Invalid ${config.provider}BaseURL: ${config.baseUrl}` }
+  }
+  return { ok: true, detail: `${config.provider} ${config.model}, ${config.pool.size} key(s)` }
+}
+
+// Ready means a full generation fits: the system prompt plus its output.
+function checkAdmission(config: AIConfig): CheckResult {
+  const reserved = estimateTokens('', FULL_MAX_TOKENS)
+  const admissible = config.pool.admissible(reserved)
+  if (admissible > 0) {
+    return { ok: true, detail: `${admissible} of ${config.pool.size} key(s) can take a request` }
+  }
+  const waitSeconds = Math.ceil(config.pool.retryAfterMs(reserved) / 1000)
+  return { ok: false, detail: `No key has headroom, retry in ${waitSeconds}s` }
+}
+
+// The model list is free and still checks the key, so a probe costs no
+// tokens. It bypasses the cassette: a recording must not contain probes.
+function probeRequest(config: AIConfig, apiKey: string) {
+  return config.provider === 'Claude'
+    ? {
+        url: `${config.baseUrl}/v1/models?limit=1`,
+        headers: { 'x-api-key': apiKey, 'anthropic-version': '2023-06-01' },
+      }
+    : { url: `${config.baseUrl}/models`, headers: { Authorization: `Bearer ${apiKey}` } }
+}
+
+async function probeUpstream(config: AIConfig): Promise<CheckResult> {
+  if (cassette?.mode === 'replay') {
+    return { ok: true, detail: `Replaying cassette "${cassette.name}", provider not contacted` }
+  }
+
+  const rejected: string[] = []
+  const limited: string[] = []
+  for (const key of config.pool.activeKeys()) {
+    const { url, headers } = probeRequest(config, key.secret)
+    const response = await fetch(url, {
+      headers,
+      signal: AbortSignal.timeout(UPSTREAM_PROBE_TIMEOUT_MS),
+    })
+    await response.arrayBuffer()
+
+    if (response.status === 401 || response.status === 403) {
+      rejected.push(key.id)
+      continue
+    }
+    // Reachable, but this key cannot take requests yet: the admission
+    // check reports the wait.
+    if (response.status === 429) {
+      config.pool.markRateLimited(key, retryAfterMs(response.headers))
+      limited.push(key.id)
+      continue
+    }
+    if (!response.ok) {
+      return { ok: false, detail: `${config.provider} answered ${response.status}` }
+    }
+    return { ok: true, detail: `${config.provider} reachable, ${key.id} accepted` }
   }
+
+  if (limited.length > 0) {
+    return { ok: true, detail: `${config.provider} reachable, ${limited.join(', ')} rate limited` }
+  }
+  return rejected.length > 0
+    ? { ok: false, detail: `${config.provider} rejected ${rejected.join(', ')}` }
+    : { ok: false, detail: 'No key in rotation to probe with' }
+}
+
+const readiness = new Readiness({
+  config: () => checkConfig(getAIConfig()),
+  admission: () => checkAdmission(getAIConfig()),
+  upstream: () => probeUpstream(getAIConfig()),
 })
 
+app.use(healthRouter(readiness))
+
+// Test harness control: switch the active cassette without restarting.
+// Only mounted when the server was started with CassetteMode.
+if (cassette) {
+  const { mode } = cassette
+
+  app.get('/api/cassette', (_req, res) => {
+    res.json(cassette?.describe())
+  })
+
+  app.put('/api/cassette', (req, res) => {
+    const { name, speed } = req.body
+    if (!isValidCassetteName(name)) {
+      res.status(400).json({ error: 'Cassette name may only contain letters, digits, ".", "_" and "-"' })
+      return
+    }
+    cassette = new Cassette(
+      mode,
+      process.env.CassetteDir || CASSETTE_DIR,
+      name,
+      typeof speed === 'number' && speed >= 0 ? speed : (cassette?.speed ?? 1),
+    )
+    res.json(cassette.describe())
+  })
+}
+
+if (isDebugEnabled()) {
+  app.use('/api/debug', debugRouter(ideaStore))
+}
+
+if (IS_PRODUCTION) {
+  app.use(serveStatic(DIST_DIR))
+}
+
 app.listen(PORT, () => {
   const config = getAIConfig()
   console.log(`YomaAI server running on port ${PORT}`)
+  if (IS_PRODUCTION) {
+    console.log(`Serving frontend from ${DIST_DIR}`)
+  }
+  if (cassette) {
+    console.log(`Cassette: ${cassette.mode} "${cassette.name}" (${cassette.size} interactions)`)
+  }
+  if (isDebugEnabled()) {
+    console.log('Debug endpoints enabled at /api/debug')
+  }
   console.log(`AI Provider: ${config.provider} | Model: ${config.model}`)
-  console.log(`API Key: ${config.apiKey ? '***configured***' : '!!! MISSING !!!'}`)
+  console.log(
+    `API Keys: ${config.pool.size > 0 ? `${config.pool.size} configured` : '!!! MISSING !!!'}`,
+  )
+  if (isWarmupEnabled() && checkConfig(config).ok) {
+    console.log(`Warming up connection to ${config.baseUrl}...`)
+    readiness.warmUp().then((check) => {
+      console.log(`Upstream ready: ${check.detail} (${check.latencyMs} ms)`)
+    })
+  }
 })
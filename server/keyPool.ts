@@ -0,0 +1,266 @@
+// Several API keys per provider, each with its own request and token
+// budget, so throughput is not capped by a single account's rate limits.
+
+const MINUTE_MS = 60_000
+const DEFAULT_COOLDOWN_MS = MINUTE_MS
+
+export interface RateLimits {
+  requestsPerMinute: number
+  tokensPerMinute: number
+}
+
+/** Continuously refilling bucket; may go into debt when a reservation overshoots. */
+class TokenBucket {
+  capacity: number
+  private available: number
+  private updatedAt = Date.now()
+
+  constructor(capacity: number) {
+    this.capacity = capacity
+    this.available = capacity
+  }
+
+  private refill() {
+    const now = Date.now()
+    const perMs = this.capacity / MINUTE_MS
+    this.available = Math.min(this.capacity, this.available + (now - this.updatedAt) * perMs)
+    this.updatedAt = now
+  }
+
+  get level(): number {
+    this.refill()
+    return this.available
+  }
+
+  take(amount: number) {
+    this.refill()
+    this.available -= amount
+  }
+
+  give(amount: number) {
+    this.refill()
+    this.available = Math.min(this.capacity, this.available + amount)
+  }
+
+  /** Adopts the provider's own view of the window from rate-limit headers. */
+  sync(limit: number, remaining: number) {
+    this.capacity = limit
+    this.available = Math.min(limit, remaining)
+    this.updatedAt = Date.now()
+  }
+
+  /** Milliseconds until at least `amount` is available again. */
+  msUntil(amount: number): number {
+    const missing = amount - this.level
+    return missing <= 0 ? 0 : Math.ceil(missing / (this.capacity / MINUTE_MS))
+  }
+}
+
+export interface PooledKey {
+  id: string
+  secret: string
+  requests: TokenBucket
+  tokens: TokenBucket
+  disabledUntil: number
+  disabledReason: string | null
+  stats: { requests: number; rateLimited: number; unauthorized: number }
+}
+
+interface HeaderLimits {
+  requests?: { limit: number; remaining: number }
+  tokens?: { limit: number; remaining: number }
+}
+
+function numberHeader(headers: Headers, ...names: string[]): number | undefined {
+  for (const name of names) {
+    const value = Number(headers.get(name))
+    if (headers.has(name) && Number.isFinite(value)) return value
+  }
+  return undefined
+}
+
+// Anthropic uses anthropic-ratelimit-*, OpenRouter/OpenAI-compatible
+// backends use x-ratelimit-* (with or without the -requests suffix).
+export function readRateLimitHeaders(headers: Headers): HeaderLimits {
+  const result: HeaderLimits = {}
+
+  const requestLimit = numberHeader(
+    headers,
+    'anthropic-ratelimit-requests-limit',
+    'x-ratelimit-limit-requests',
+    'x-ratelimit-limit',
+  )
+  const requestRemaining = numberHeader(
+    headers,
+    'anthropic-ratelimit-requests-remaining',
+    'x-ratelimit-remaining-requests',
+    'x-ratelimit-remaining',
+  )
+  if (requestLimit !== undefined && requestRemaining !== undefined) {
+    result.requests = { limit: requestLimit, remaining: requestRemaining }
+  }
+
+  const tokenLimit = numberHeader(
+    headers,
+    'anthropic-ratelimit-tokens-limit',
+    'x-ratelimit-limit-tokens',
+  )
+  const tokenRemaining = numberHeader(
+    headers,
+    'anthropic-ratelimit-tokens-remaining',
+    'x-ratelimit-remaining-tokens',
+  )
+  if (tokenLimit !== undefined && tokenRemaining !== undefined) {
+    result.tokens = { limit: tokenLimit, remaining: tokenRemaining }
+  }
+
+  return result
+}
+
+export function retryAfterMs(headers: Headers): number {
+  const seconds = numberHeader(headers, 'retry-after')
+  return seconds !== undefined ? seconds * 1000 : DEFAULT_COOLDOWN_MS
+}
+
+function keyHint(secret: string): string {
+  return secret.length > 8 ? `…${secret.slice(-4)}` : '…'
+}
+
+export class KeyPool {
+  private keys: PooledKey[]
+
+  constructor(secrets: string[], limits: RateLimits) {
+    this.keys = secrets.map((secret, i) => ({
+      id: `key-${i + 1}`,
+      secret,
+      requests: new TokenBucket(limits.requestsPerMinute),
+      tokens: new TokenBucket(limits.tokensPerMinute),
+      disabledUntil: 0,
+      disabledReason: null,
+      stats: { requests: 0, rateLimited: 0, unauthorized: 0 },
+    }))
+  }
+
+  get size(): number {
+    return this.keys.length
+  }
+
+  private isActive(key: PooledKey): boolean {
+    return key.disabledUntil <= Date.now()
+  }
+
+  private headroom(key: PooledKey): number {
+    return Math.min(
+      key.requests.level / key.requests.capacity,
+      key.tokens.level / key.tokens.capacity,
+    )
+  }
+
+  /**
+   * Whether the key can take a request reserving `estimatedTokens`. A
+   * reservation larger than the whole bucket waits for a full bucket.
+   */
+  private canAdmit(key: PooledKey, estimatedTokens: number): boolean {
+    return (
+      this.isActive(key) &&
+      key.requests.level >= 1 &&
+      key.tokens.level >= Math.min(estimatedTokens, key.tokens.capacity)
+    )
+  }
+
+  /** Keys still in rotation, most headroom first. Nothing is reserved. */
+  activeKeys(): PooledKey[] {
+    return this.keys
+      .filter((key) => this.isActive(key))
+      .sort((a, b) => this.headroom(b) - this.headroom(a))
+  }
+
+  /** How many keys acquire(estimatedTokens) could hand out right now. */
+  admissible(estimatedTokens: number): number {
+    return this.keys.filter((key) => this.canAdmit(key, estimatedTokens)).length
+  }
+
+  /**
+   * Reserves one request and `estimatedTokens` on the key with the most
+   * headroom. Returns null when every key is disabled or exhausted.
+   */
+  acquire(estimatedTokens: number, exclude: Set<PooledKey>): PooledKey | null {
+    let best: PooledKey | null = null
+    for (const key of this.keys) {
+      if (exclude.has(key) || !this.canAdmit(key, estimatedTokens)) continue
+      if (!best || this.headroom(key) > this.headroom(best)) best = key
+    }
+
+    if (best) {
+      best.requests.take(1)
+      best.tokens.take(estimatedTokens)
+      best.stats.requests++
+    }
+    return best
+  }
+
+  /** Refunds the unused part of a reservation and syncs with provider headers. */
+  settle(key: PooledKey, reservedTokens: number, usedTokens: number, headers?: Headers) {
+    key.tokens.give(Math.max(0, reservedTokens - usedTokens))
+    if (!headers) return
+
+    const limits = readRateLimitHeaders(headers)
+    if (limits.requests) key.requests.sync(limits.requests.limit, limits.requests.remaining)
+    if (limits.tokens) key.tokens.sync(limits.tokens.limit, limits.tokens.remaining)
+  }
+
+  markRateLimited(key: PooledKey, cooldownMs: number) {
+    key.stats.rateLimited++
+    key.disabledUntil = Date.now() + cooldownMs
+    key.disabledReason = 'rate limited'
+  }
+
+  /** Invalid keys never come back on their own — fix .env and restart. */
+  markUnauthorized(key: PooledKey) {
+    key.stats.unauthorized++
+    key.disabledUntil = Infinity
+    key.disabledReason = 'unauthorized'
+  }
+
+  /** Shortest wait until any usable key has capacity again, for Retry-After. */
+  retryAfterMs(estimatedTokens: number): number {
+    const waits = this.keys
+      .filter((key) => key.disabledUntil !== Infinity)
+      .map((key) =>
+        Math.max(
+          key.disabledUntil - Date.now(),
+          key.requests.msUntil(1),
+          key.tokens.msUntil(Math.min(estimatedTokens, key.tokens.capacity)),
+        ),
+      )
+    return waits.length > 0 ? Math.max(0, Math.min(...waits)) : DEFAULT_COOLDOWN_MS
+  }
+
+  snapshot() {
+    return this.keys.map((key) => ({
+      id: key.id,
+      hint: keyHint(key.secret),
+      active: this.isActive(key),
+      disabledReason: this.isActive(key) ? null : key.disabledReason,
+      disabledForMs:
+        key.disabledUntil === Infinity ? null : Math.max(0, key.disabledUntil - Date.now()),
+      requests: {
+        available: Math.floor(key.requests.level),
+        limit: key.requests.capacity,
+      },
+      tokens: {
+        available: Math.floor(key.tokens.level),
+        limit: key.tokens.capacity,
+      },
+      utilization: Math.round((1 - Math.max(0, this.headroom(key))) * 100) / 100,
+      stats: { ...key.stats },
+    }))
+  }
+}
+
+export function parseKeys(value: string | undefined): string[] {
+  return (value || '')
+    .split(',')
+    .map((key) => key.trim())
+    .filter(Boolean)
+}
@@ -0,0 +1,111 @@
+import crypto from 'crypto'
+import { MAX_DETAILS_LENGTH, ideaSettings } from '../src/data/ideaOptions'
+
+// The create page posts its dropdown selections as { settingId: option }
+// instead of a ready-made prompt, so the server can check them and build
+// the same text for equivalent requests.
+export interface IdeaRequest {
+  selections: Record<string, string>
+  additionalDetails: string
+}
+
+export class PromptError extends Error {}
+
+const EMPTY_PROMPT = 'Generate a completely original creative idea. Surprise me with something unique!'
+const PROMPT_HEADER = 'Create an original creative idea based on these preferences:\n\n'
+const DETAILS_HEADER = 'Additional Details from the creator:\n'
+const PROMPT_FOOTER = 'Remember: Be original, avoid clichés. Create something truly unique and surprising!'
+
+interface IndexedSetting {
+  order: number
+  label: string
+  // Lower-cased option → its canonical spelling and the prompt line for it.
+  options: Map<string, { value: string; line: string }>
+}
+
+const SETTINGS = new Map<string, IndexedSetting>(
+  ideaSettings.map((setting, order) => [
+    setting.id,
+    {
+      order,
+      label: setting.label,
+      options: new Map(
+        setting.options.map((value) => [
+          value.toLowerCase(),
+          { value, line: `${setting.label}: ${value}` },
+        ]),
+      ),
+    },
+  ]),
+)
+
+function isPlainObject(value: unknown): value is Record<string, unknown> {
+  return typeof value === 'object' && value !== null && !Array.isArray(value)
+}
+
+/**
+ * Checks a structured /api/generate body against ideaSettings and returns it
+ * normalized: options in their canonical spelling, in settings order, empty
+ * or blank choices dropped, details trimmed with \n line endings. Throws PromptError.
+ */
+export function parseIdeaRequest(body: Record<string, unknown>): IdeaRequest {
+  const { selections = {}, additionalDetails = '' } = body
+  if (!isPlainObject(selections)) {
+    throw new PromptError('selections must be an object of { settingId: option }')
+  }
+  if (typeof additionalDetails !== 'string') {
+    throw new PromptError('additionalDetails must be a string')
+  }
+
+  // Slots in settings order, so the result doesn't depend on the client's key order.
+  const chosen: (string | undefined)[] = new Array(ideaSettings.length)
+  for (const id in selections) {
+    const setting = SETTINGS.get(id)
+    if (!setting) throw new PromptError(`Unknown setting: ${id}`)
+    const raw = selections[id]
+    if (raw === null || (typeof raw === 'string' && raw.trim() === '')) continue
+    const option = typeof raw === 'string' ? setting.options.get(raw.trim().toLowerCase()) : undefined
+    if (!option) throw new PromptError(`Unknown ${setting.label} option: ${String(raw)}`)
+    chosen[setting.order] = option.value
+  }
+
+  const details = additionalDetails.replace(/\r\n?/g, '\n').trim().normalize('NFC')
+  if (details.length > MAX_DETAILS_LENGTH) {
+    throw new PromptError(`Additional details are too long (max ${MAX_DETAILS_LENGTH} characters)`)
+  }
+
+  const normalized: Record<string, string> = {}
+  for (let order = 0; order < chosen.length; order++) {
+    const value = chosen[order]
+    if (value !== undefined) normalized[ideaSettings[order].id] = value
+  }
+  return { selections: normalized, additionalDetails: details }
+}
+
+/** The user prompt for a normalized request, as the create page used to build it. */
+export function buildIdeaPrompt(request: IdeaRequest): string {
+  const lines = Object.entries(request.selections).map(
+    ([id, value]) => SETTINGS.get(id)!.options.get(value.toLowerCase())!.line,
+  )
+  const details = request.additionalDetails
+
+  if (lines.length === 0 && !details) return EMPTY_PROMPT
+
+  let prompt = PROMPT_HEADER
+  if (lines.length > 0) prompt += lines.join('\n') + '\n\n'
+  if (details) prompt += `${DETAILS_HEADER}${details}\n\n`
+  return prompt + PROMPT_FOOTER
+}
+
+/**
+ * Stable key for equivalent requests: the same choices and details give the
+ * same key however the client spelled, ordered or padded them. Raw-prompt
+ * requests are keyed on the prompt text and can never collide with these.
+ */
+export function ideaRequestKey(request: IdeaRequest | string): string {
+  const canonical =
+    typeof request === 'string'
+      ? `prompt\n${request}`
+      : `ideas/v1\n${JSON.stringify(request.selections)}\n${request.additionalDetails}`
+  return crypto.createHash('sha256').update(canonical).digest('hex').slice(0, 16)
+}
@@ -0,0 +1,102 @@
+import crypto from 'crypto'
+
+// Every idea follows the "## Heading" layout required by SYSTEM_PROMPT,
+// which makes each heading an addressable section.
+export interface IdeaSection {
+  id: string
+  title: string
+  content: string
+}
+
+export interface StoredIdea {
+  prompt: string
+  preamble: string
+  sections: IdeaSection[]
+}
+
+const HEADING = /^##[ \t]+(.+?)[ \t]*#*[ \t]*$/gm
+
+function slugify(title: string): string {
+  return (
+    title
+      .toLowerCase()
+      .replace(/[^\p{L}\p{N}]+/gu, '-')
+      .replace(/^-+|-+$/g, '') || 'section'
+  )
+}
+
+export function parseSections(markdown: string): { preamble: string; sections: IdeaSection[] } {
+  const matches = [...markdown.matchAll(HEADING)]
+  if (matches.length === 0) {
+    return { preamble: markdown.trim(), sections: [] }
+  }
+
+  const used = new Set<string>()
+  const sections = matches.map((match, i) => {
+    const start = match.index! + match[0].length
+    const end = i + 1 < matches.length ? matches[i + 1].index! : markdown.length
+    const title = match[1]
+
+    let id = slugify(title)
+    for (let n = 2; used.has(id); n++) id = `${slugify(title)}-${n}`
+    used.add(id)
+
+    return { id, title, content: markdown.slice(start, end).trim() }
+  })
+
+  return { preamble: markdown.slice(0, matches[0].index).trim(), sections }
+}
+
+export function joinSections(preamble: string, sections: IdeaSection[]): string {
+  const parts = sections.map((s) => `## ${s.title}\n\n${s.content}`)
+  return (preamble ? [preamble, ...parts] : parts).join('\n\n')
+}
+
+/** Strips the heading the model was asked to repeat, leaving only the body. */
+export function sectionBody(text: string, title: string): string {
+  const { preamble, sections } = parseSections(text)
+  if (sections.length === 0) return preamble
+  const own = sections.find((s) => s.title.toLowerCase() === title.toLowerCase())
+  return (own ?? sections[0]).content
+}
+
+export function buildSectionPrompt(idea: StoredIdea, section: IdeaSection): string {
+  return `The creator asked for an idea with this request:
+
+${idea.prompt}
+
+This is the current idea:
+
+${joinSections(idea.preamble, idea.sections)}
+
+Rewrite ONLY the "## ${section.title}" section. Keep it consistent with every other section — names, world rules, tone, narrative style and the chosen settings. Make it noticeably different from the current version of this section.
+
+Output only the rewritten section, starting with the line "## ${section.title}". Do not output any other section.`
+}
+
+/** Keeps the most recent ideas in memory so sections can be regenerated. */
+export class IdeaStore {
+  private ideas = new Map<string, StoredIdea>()
+  readonly capacity: number
+
+  constructor(capacity: number) {
+    this.capacity = capacity
+  }
+
+  get size(): number {
+    return this.ideas.size
+  }
+
+  add(idea: StoredIdea): string {
+    const id = crypto.randomUUID()
+    this.ideas.set(id, idea)
+    if (this.ideas.size > this.capacity) {
+      this.ideas.delete(this.ideas.keys().next().value!)
+    }
+    return id
+  }
+
+  get(id: string): StoredIdea | undefined {
+    return this.ideas.get(id)
+  }
+}
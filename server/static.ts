@@ -0,0 +1,126 @@
+import fs from 'fs'
+import path from 'path'
+import zlib from 'zlib'
+import express from 'express'
+import type { Request, Response, NextFunction } from 'express'
+
+// Vite emits content-hashed files into dist/assets — they never change under
+// the same name, so browsers may keep them forever.
+const IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+const REVALIDATE_CACHE = 'no-cache'
+
+// Client-side routes from App.tsx that must resolve to index.html.
+const SPA_ROUTES = ['/', '/create', '/settings']
+
+// JSON bodies smaller than this are not worth the compression overhead.
+const COMPRESS_MIN_BYTES = 1024
+
+const ENCODINGS = [
+  { name: 'br', ext: '.br' },
+  { name: 'gzip', ext: '.gz' },
+] as const
+
+type Encoding = (typeof ENCODINGS)[number]['name']
+
+// Brotli first: browsers list gzip earlier in Accept-Encoding, but br is smaller.
+function accepts(req: Request, encoding: Encoding): boolean {
+  return req.acceptsEncodings(encoding) === encoding
+}
+
+function pickEncoding(req: Request): Encoding | null {
+  return ENCODINGS.find((e) => accepts(req, e.name))?.name ?? null
+}
+
+/**
+ * Serves a build-time precompressed variant (`file.br` / `file.gz`)
+ * of a dist file when the client accepts it. Falls through otherwise.
+ */
+function precompressed(distDir: string) {
+  return (req: Request, res: Response, next: NextFunction) => {
+    if (req.method !== 'GET' && req.method !== 'HEAD') return next()
+
+    let filePath: string
+    try {
+      filePath = path.join(distDir, decodeURIComponent(req.path))
+    } catch {
+      return next()
+    }
+    if (!filePath.startsWith(distDir + path.sep)) return next()
+
+    const encoding = ENCODINGS.find(
+      (e) => accepts(req, e.name) && fs.existsSync(filePath + e.ext),
+    )
+    if (!encoding) return next()
+
+    res.setHeader('Content-Encoding', encoding.name)
+    res.setHeader('Vary', 'Accept-Encoding')
+    res.type(path.extname(filePath))
+    res.sendFile(filePath + encoding.ext, {
+      headers: { 'Cache-Control': cacheControlFor(req.path) },
+    })
+  }
+}
+
+function cacheControlFor(urlPath: string): string {
+  return urlPath.startsWith('/assets/') ? IMMUTABLE_CACHE : REVALIDATE_CACHE
+}
+
+/**
+ * Production static handler for the `vite build` output:
+ * precompressed variants, immutable caching for hashed assets
+ * and an index.html fallback for the SPA routes.
+ */
+export function serveStatic(distDir: string) {
+  const router = express.Router()
+  const indexHtml = path.join(distDir, 'index.html')
+
+  router.use(precompressed(distDir))
+  router.use(
+    express.static(distDir, {
+      index: false,
+      setHeaders: (res, filePath) => {
+        const urlPath = '/' + path.relative(distDir, filePath).split(path.sep).join('/')
+        res.setHeader('Cache-Control', cacheControlFor(urlPath))
+      },
+    }),
+  )
+
+  router.get(SPA_ROUTES, (req, res, next) => {
+    if (!fs.existsSync(indexHtml)) return next()
+    req.url = '/index.html'
+    precompressed(distDir)(req, res, () => {
+      res.sendFile(indexHtml, { headers: { 'Cache-Control': REVALIDATE_CACHE } })
+    })
+  })
+
+  return router
+}
+
+/**
+ * Compresses JSON responses on the fly. Generation results reach several
+ * kilobytes of markdown, which shrinks well with brotli/gzip.
+ */
+export function compressJson(req: Request, res: Response, next: NextFunction) {
+  const encoding = pickEncoding(req)
+  if (!encoding) return next()
+
+  const json = res.json.bind(res)
+  res.json = (body: unknown) => {
+    const raw = Buffer.from(JSON.stringify(body))
+    if (raw.length < COMPRESS_MIN_BYTES) return json(body)
+
+    const compressed =
+      encoding === 'br'
+        ? zlib.brotliCompressSync(raw, {
+            params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 5 },
+          })
+        : zlib.gzipSync(raw)
+
+    res.setHeader('Content-Type', 'application/json; charset=utf-8')
+    res.setHeader('Content-Encoding', encoding)
+    res.setHeader('Vary', 'Accept-Encoding')
+    res.setHeader('Content-Length', compressed.length)
+    return res.end(compressed)
+  }
+  next()
+}
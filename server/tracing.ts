@@ -0,0 +1,159 @@
+import fs from 'fs'
+import path from 'path'
+import crypto from 'crypto'
+import { performance } from 'perf_hooks'
+import type { NextFunction, Request, RequestHandler, Response } from 'express'
+
+// Per-request timing spans. The create page sends a W3C `traceparent`;
+// the server continues that trace, passes it on to the provider, reports
+// its stages in `Server-Timing` and, with YomaTraceDir set, writes them as
+// Chrome trace JSON (chrome://tracing, ui.perfetto.dev).
+
+export interface Span {
+  name: string
+  spanId: string
+  parentId: string | null
+  start: number
+  end: number | null
+  attributes: Record<string, string | number>
+}
+
+const TRACEPARENT = /^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$/
+const ZERO_TRACE_ID = '0'.repeat(32)
+
+function randomHex(bytes: number): string {
+  return crypto.randomBytes(bytes).toString('hex')
+}
+
+function epochMicros(time: number): number {
+  return Math.round((performance.timeOrigin + time) * 1000)
+}
+
+export class Trace {
+  readonly traceId: string
+  readonly root: Span
+  readonly spans: Span[] = []
+
+  /** Continues the caller's trace from a `traceparent` header, or starts a new one. */
+  constructor(traceparent: string | undefined, rootName: string) {
+    const match = TRACEPARENT.exec(traceparent?.trim().toLowerCase() ?? '')
+    const continued = match && match[1] !== ZERO_TRACE_ID
+    this.traceId = continued ? match[1] : randomHex(16)
+    this.root = this.open(rootName, continued ? match[2] : null, {})
+  }
+
+  private open(name: string, parentId: string | null, attributes: Span['attributes']): Span {
+    const span = { name, spanId: randomHex(8), parentId, start: performance.now(), end: null, attributes }
+    this.spans.push(span)
+    return span
+  }
+
+  start(name: string, attributes: Span['attributes'] = {}, parent: Span = this.root): Span {
+    return this.open(name, parent.spanId, attributes)
+  }
+
+  end(span: Span, attributes: Span['attributes'] = {}) {
+    span.end = performance.now()
+    Object.assign(span.attributes, attributes)
+  }
+
+  /** Header for an outgoing call made inside `span`. */
+  traceparent(span: Span = this.root): string {
+    return `00-${this.traceId}-${span.spanId}-01`
+  }
+
+  /**
+   * Finished spans as a Server-Timing value: one metric per span in start
+   * order (repeated names, e.g. retried upstream calls, stay separate), the
+   * root as `total`, and the trace context for correlation in the browser.
+   */
+  serverTiming(): string {
+    const metrics = this.spans
+      .filter((span) => span.end !== null)
+      .map((span) => {
+        const name = span.spanId === this.root.spanId ? 'total' : span.name
+        const desc = span.attributes.status !== undefined ? `;desc="${span.attributes.status}"` : ''
+        return `${name};dur=${(span.end! - span.start).toFixed(1)}${desc}`
+      })
+    return [...metrics, `traceparent;desc="${this.traceparent()}"`].join(', ')
+  }
+
+  /** Trace Event Format: complete ("X") events with epoch-microsecond timestamps. */
+  toChromeTrace() {
+    const pid = process.pid
+    return {
+      traceEvents: [
+        { name: 'process_name', ph: 'M', pid, tid: 0, args: { name: 'YomaAI server' } },
+        ...this.spans
+          .filter((span) => span.end !== null)
+          .map((span) => ({
+            name: span.name,
+            cat: 'server',
+            ph: 'X',
+            ts: epochMicros(span.start),
+            dur: Math.round((span.end! - span.start) * 1000),
+            pid,
+            tid: 0,
+            args: { traceId: this.traceId, spanId: span.spanId, parentId: span.parentId, ...span.attributes },
+          })),
+      ],
+      otherData: { traceId: this.traceId },
+    }
+  }
+}
+
+/** The trace started by traceRequests() for this request. */
+export function traceOf(res: Response): Trace {
+  return res.locals.trace
+}
+
+/**
+ * Starts a trace per request. Mount before the body parser so the parse
+ * stage is included, and wrap the parser itself with traced().
+ */
+export function traceRequests(): RequestHandler {
+  const dir = process.env.YomaTraceDir || null
+  if (dir) fs.mkdirSync(dir, { recursive: true })
+
+  return (req: Request, res: Response, next: NextFunction) => {
+    const trace = new Trace(req.get('traceparent'), `${req.method} ${req.originalUrl}`)
+    res.locals.trace = trace
+
+    // Headers must be set before the body goes out, so Server-Timing covers
+    // everything up to serialization; the written trace also has `respond`.
+    const json = res.json.bind(res)
+    res.json = (body: unknown) => {
+      trace.end(trace.root, { status: res.statusCode })
+      res.setHeader('Server-Timing', trace.serverTiming())
+      res.setHeader('traceparent', trace.traceparent())
+      const respond = trace.start('respond')
+      const result = json(body)
+      trace.end(respond)
+      return result
+    }
+
+    if (dir) {
+      res.on('finish', () => {
+        if (trace.root.end === null) trace.end(trace.root, { status: res.statusCode })
+        const file = path.join(dir, `${trace.traceId}-${trace.root.spanId}.json`)
+        fs.promises.writeFile(file, JSON.stringify(trace.toChromeTrace())).catch((error) => {
+          console.error('Failed to write trace:', error)
+        })
+      })
+    }
+    next()
+  }
+}
+
+/** Records a middleware (e.g. express.json()) as a span of the request's trace. */
+export function traced(name: string, middleware: RequestHandler): RequestHandler {
+  return (req, res, next) => {
+    const trace: Trace | undefined = res.locals.trace
+    if (!trace) return middleware(req, res, next)
+    const span = trace.start(name)
+    return middleware(req, res, (error?: unknown) => {
+      trace.end(span)
+      next(error)
+    })
+  }
+}
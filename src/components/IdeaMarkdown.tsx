@@ -0,0 +1,210 @@
+import { memo, startTransition, useEffect, useMemo, useState, type ReactElement, type ReactNode } from 'react'
+import Markdown from 'react-markdown'
+import { afterNextPaint } from '../tracing'
+
+export interface IdeaSection {
+  id: string
+  title: string
+  content: string
+}
+
+interface IdeaMarkdownProps {
+  result: string
+  preamble: string
+  sections: IdeaSection[]
+  renderSectionFooter: (section: IdeaSection) => ReactNode
+  /** Called once every chunk has been mounted and painted. */
+  onRendered?: () => void
+}
+
+// A long idea (~8k tokens) is mounted in chunks: enough for the first screen
+// right away, the rest one slice per frame in a transition, so React can
+// yield between chunks instead of parsing the whole text in one task.
+const CHUNK_CHARS = 1500
+const FIRST_PAINT_CHARS = 3000
+const SLICE_CHARS = 6000
+
+const PARSE_CACHE_LIMIT = 300
+
+const parsedChunks = new Map<string, ReactElement>()
+
+/**
+ * ReactMarkdown is a pure function of its text, so the element tree for a
+ * chunk is kept and reused when the same text is shown again — e.g. the
+ * untouched sections after "Rewrite section". Least recently used first out.
+ */
+function renderMarkdown(text: string): ReactElement {
+  const cached = parsedChunks.get(text)
+  if (cached) {
+    parsedChunks.delete(text)
+    parsedChunks.set(text, cached)
+    return cached
+  }
+
+  const element = Markdown({ children: text })
+  parsedChunks.set(text, element)
+  if (parsedChunks.size > PARSE_CACHE_LIMIT) {
+    const oldest = parsedChunks.keys().next().value
+    if (oldest !== undefined) parsedChunks.delete(oldest)
+  }
+  return element
+}
+
+const FENCE = /^\s*(```|~~~)/
+const BLANK_LINES = /(\n(?:[ \t]*\n)+)/
+const INDENTED = /^[ \t]/
+const LIST_ITEM = /^ {0,3}(?:[-*+]|\d{1,9}[.)])[ \t]/
+const HAS_LIST_ITEM = /^ {0,3}(?:[-*+]|\d{1,9}[.)])[ \t]/m
+const DEFINITION = /^ {0,3}\[[^\]]+\]:[ \t]*\S/
+
+/**
+ * Splits markdown at blank lines into chunks of about CHUNK_CHARS. Every
+ * chunk is parsed on its own, so a split never lands inside a fenced code
+ * block or a list: loose items and indented continuations stay with the
+ * list, which keeps its numbering and tightness.
+ */
+function splitMarkdown(text: string): string[] {
+  if (!text.trim()) return []
+
+  // Odd indices are the blank-line separators, kept so chunks stay verbatim.
+  const parts = text.split(BLANK_LINES)
+  const chunks: string[] = []
+  let current = ''
+  let inFence = false
+  let inList = false
+
+  for (let i = 0; i < parts.length; i += 2) {
+    const block = parts[i]
+    const continuesList = inList && (LIST_ITEM.test(block) || INDENTED.test(block))
+    if (current.length >= CHUNK_CHARS && !inFence && !continuesList && !INDENTED.test(block)) {
+      chunks.push(current)
+      current = ''
+    }
+    current += (current ? parts[i - 1] : '') + block
+    if (!inFence) inList = continuesList || HAS_LIST_ITEM.test(block)
+    for (const line of block.split('\n')) {
+      if (FENCE.test(line)) inFence = !inFence
+    }
+  }
+  if (current.trim()) chunks.push(current)
+  return chunks
+}
+
+/** Link reference definitions outside code blocks, one per line. */
+function referenceDefinitions(text: string): string {
+  const found: string[] = []
+  let inFence = false
+  for (const line of text.split('\n')) {
+    if (FENCE.test(line)) inFence = !inFence
+    else if (!inFence && DEFINITION.test(line)) found.push(line.trim())
+  }
+  return found.join('\n')
+}
+
+const MarkdownChunk = memo(function MarkdownChunk({ text }: { text: string }) {
+  return renderMarkdown(text)
+})
+
+/** Index just past the chunks that fit in `budget` characters after `from` (at least one). */
+function revealUpTo(sizes: number[], from: number, budget: number): number {
+  let end = from
+  let used = 0
+  while (end < sizes.length && used < budget) {
+    used += sizes[end]
+    end++
+  }
+  return end
+}
+
+/**
+ * How many chunks are mounted. New text (e.g. a rewritten section) starts
+ * over with as many characters as were already shown, at least the first
+ * paint, so the page doesn't shrink under the reader.
+ */
+function useRevealedCount(sizes: number[]): number {
+  const [revealed, setRevealed] = useState(() => revealUpTo(sizes, 0, FIRST_PAINT_CHARS))
+  const [revealedSizes, setRevealedSizes] = useState(sizes)
+
+  if (revealedSizes !== sizes) {
+    const shown = revealedSizes.slice(0, revealed).reduce((sum, size) => sum + size, 0)
+    const restarted = revealUpTo(sizes, 0, Math.max(FIRST_PAINT_CHARS, shown))
+    setRevealedSizes(sizes)
+    setRevealed(restarted)
+    return restarted
+  }
+
+  useEffect(() => {
+    if (revealed >= sizes.length) return
+    const frame = requestAnimationFrame(() => {
+      startTransition(() => setRevealed((count) => revealUpTo(sizes, count, SLICE_CHARS)))
+    })
+    return () => cancelAnimationFrame(frame)
+  }, [revealed, sizes])
+
+  return revealed
+}
+
+interface ChunkGroup {
+  section: IdeaSection | null
+  chunks: string[]
+  start: number
+}
+
+export default function IdeaMarkdown({
+  result,
+  preamble,
+  sections,
+  renderSectionFooter,
+  onRendered,
+}: IdeaMarkdownProps) {
+  const groups = useMemo(() => {
+    const parts =
+      sections.length > 0
+        ? [
+            { section: null, text: preamble },
+            ...sections.map((section) => ({ section, text: `## ${section.title}\n\n${section.content}` })),
+          ]
+        : [{ section: null, text: result }]
+
+    // Chunks are parsed separately, so each one gets every definition
+    // its reference links might point to.
+    const definitions = referenceDefinitions(parts.map((part) => part.text).join('\n'))
+    let start = 0
+    return parts.map(({ section, text }): ChunkGroup => {
+      const chunks = splitMarkdown(text).map((chunk) => (definitions ? `${chunk}\n\n${definitions}` : chunk))
+      const group = { section, chunks, start }
+      start += chunks.length
+      return group
+    })
+  }, [result, preamble, sections])
+
+  const sizes = useMemo(() => groups.flatMap((g) => g.chunks.map((chunk) => chunk.length)), [groups])
+  const revealed = useRevealedCount(sizes)
+  const complete = revealed >= sizes.length
+
+  useEffect(() => {
+    if (!complete || !onRendered) return
+    let cancelled = false
+    afterNextPaint().then(() => {
+      if (!cancelled) onRendered()
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [complete, sizes, onRendered])
+
+  return groups.map(({ section, chunks, start }, index) => {
+    const visible = chunks.slice(0, Math.max(0, revealed - start))
+    if (visible.length === 0) return null
+
+    const body = visible.map((chunk, i) => <MarkdownChunk key={i} text={chunk} />)
+    if (!section) return <div key={`text-${index}`}>{body}</div>
+
+    return (
+      <section key={section.id} data-section-id={section.id}>
+        {body}
+        {visible.length === chunks.length && renderSectionFooter(section)}
+      </section>
+    )
+  })
+}
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback, useMemo } from 'react'
+import { useState, useEffect, useCallback } from 'react'
 
 interface TypewriterDialogProps {
   onComplete: () => void
@@ -10,40 +10,56 @@ const DIALOG_LINES = [
 ]
 
 const CHAR_DELAY = 3 // ms per character
+// charIndex once the reader clicked: the whole line, whichever line it is.
+const REVEALED = Number.POSITIVE_INFINITY
+
+function prefersReducedMotion() {
+  return window.matchMedia?.('(prefers-reduced-motion: reduce)').matches ?? false
+}
 
 export default function TypewriterDialog({ onComplete }: TypewriterDialogProps) {
   const [currentLine, setCurrentLine] = useState(0)
-  const [displayedText, setDisplayedText] = useState('')
   const [charIndex, setCharIndex] = useState(0)
+  const [reducedMotion] = useState(prefersReducedMotion)
 
-  const lineComplete = useMemo(() => {
-    if (currentLine >= DIALOG_LINES.length) return true
-    return charIndex >= DIALOG_LINES[currentLine].length
-  }, [charIndex, currentLine])
+  const line = DIALOG_LINES[currentLine]
+  const visibleChars = reducedMotion ? line.length : Math.min(charIndex, line.length)
+  const lineComplete = visibleChars >= line.length
 
   const skipAll = useCallback(() => {
     onComplete()
   }, [onComplete])
 
-  // Typewriter effect
+  // Typewriter effect: at most one render per animation frame, revealing
+  // every character that CHAR_DELAY says is due by then.
   useEffect(() => {
-    if (currentLine >= DIALOG_LINES.length) return
+    if (lineComplete) return
 
-    const line = DIALOG_LINES[currentLine]
+    const length = DIALOG_LINES[currentLine].length
+    let frame = 0
+    let start: number | null = null
 
-    if (charIndex < line.length) {
-      const timer = setTimeout(() => {
-        setDisplayedText((prev) => prev + line[charIndex])
-        setCharIndex((prev) => prev + 1)
-      }, CHAR_DELAY)
-      return () => clearTimeout(timer)
+    const tick = (now: number) => {
+      start ??= now
+      const due = Math.min(length, Math.floor((now - start) / CHAR_DELAY))
+      // Never moves backwards, so a click that revealed the line sticks.
+      setCharIndex((prev) => Math.max(prev, due))
+      frame = requestAnimationFrame(tick)
     }
-  }, [charIndex, currentLine])
+    frame = requestAnimationFrame(tick)
+    return () => cancelAnimationFrame(frame)
+  }, [currentLine, lineComplete])
+
+  // Clicking the dialog box while typing shows the rest of the line at once.
+  // REVEALED rather than line.length: after Next in the same task this
+  // closure still holds the previous line.
+  const revealLine = () => {
+    setCharIndex(REVEALED)
+  }
 
   const handleNext = () => {
     if (currentLine < DIALOG_LINES.length - 1) {
       setCurrentLine((prev) => prev + 1)
-      setDisplayedText('')
       setCharIndex(0)
     } else {
       onComplete()
@@ -55,6 +71,7 @@ export default function TypewriterDialog({ onComplete }: TypewriterDialogProps)
       <div className="relative z-10 w-full max-w-2xl">
         {/* Dialog box */}
         <div
+          onClick={revealLine}
           className="border-2 border-gray-800 bg-white/90 p-8"
           style={{ borderRadius: '4px 6px 3px 5px' }}
         >
@@ -71,7 +88,7 @@ export default function TypewriterDialog({ onComplete }: TypewriterDialogProps)
             className={`min-h-[3rem] text-xl text-gray-800 ${!lineComplete ? 'typewriter-cursor' : ''}`}
             style={{ fontFamily: "'Chilanka', cursive" }}
           >
-            {displayedText}
+            {line.slice(0, visibleChars)}
           </p>
         </div>
 
@@ -4,6 +4,10 @@ export interface IdeaSetting {
   options: string[]
 }
 
+// Longest "Additional Details" the server accepts; the create page's textarea
+// uses the same limit.
+export const MAX_DETAILS_LENGTH = 4000
+
 export const ideaSettings: IdeaSetting[] = [
   {
     id: 'genre',
@@ -1,7 +1,8 @@
-import { useState } from 'react'
-import ReactMarkdown from 'react-markdown'
+import { useRef, useState } from 'react'
 import TypewriterDialog from '../components/TypewriterDialog'
-import { ideaSettings } from '../data/ideaOptions'
+import IdeaMarkdown, { type IdeaSection } from '../components/IdeaMarkdown'
+import { MAX_DETAILS_LENGTH, ideaSettings } from '../data/ideaOptions'
+import { ClientTrace } from '../tracing'
 
 type Phase = 'dialog' | 'settings' | 'loading' | 'result'
 
@@ -16,6 +17,13 @@ export default function CreateIdeaPage() {
   const [additionalDetails, setAdditionalDetails] = useState('')
   const [result, setResult] = useState('')
   const [error, setError] = useState('')
+  const [ideaId, setIdeaId] = useState('')
+  const [preamble, setPreamble] = useState('')
+  const [sections, setSections] = useState<IdeaSection[]>([])
+  const [regeneratingSection, setRegeneratingSection] = useState<string | null>(null)
+  const [sectionError, setSectionError] = useState('')
+  // The generation whose `render` stage ends when IdeaMarkdown has shown it all.
+  const pendingRender = useRef<{ trace: ClientTrace; parsed: number } | null>(null)
 
   const handleDialogComplete = () => {
     setPhase('settings')
@@ -25,62 +33,79 @@ export default function CreateIdeaPage() {
     setSelections((prev) => ({ ...prev, [id]: value }))
   }
 
-  const buildUserPrompt = (): string => {
-    const parts: string[] = []
-
-    for (const setting of ideaSettings) {
-      const value = selections[setting.id]
-      if (value) {
-        parts.push(`${setting.label}: ${value}`)
-      }
-    }
-
-    const details = additionalDetails.trim()
-
-    if (parts.length === 0 && !details) {
-      return 'Generate a completely original creative idea. Surprise me with something unique!'
-    }
-
-    let prompt = 'Create an original creative idea based on these preferences:\n\n'
-
-    if (parts.length > 0) {
-      prompt += parts.join('\n') + '\n\n'
-    }
-
-    if (details) {
-      prompt += `Additional Details from the creator:\n${details}\n\n`
-    }
-
-    prompt += 'Remember: Be original, avoid clichés. Create something truly unique and surprising!'
-
-    return prompt
-  }
-
   const handleGenerate = async () => {
     setPhase('loading')
     setError('')
     setResult('')
+    setSections([])
+    setSectionError('')
+
+    // request → parse → render, one trace with the server's spans.
+    const trace = new ClientTrace()
 
     try {
       const response = await fetch('/api/generate', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ prompt: buildUserPrompt() }),
+        headers: { 'Content-Type': 'application/json', traceparent: trace.traceparent },
+        body: JSON.stringify({ selections, additionalDetails }),
       })
+      const received = trace.measure('request')
 
       const data = await response.json()
+      const parsed = trace.measure('parse', received)
 
       if (!response.ok) {
         setError(data.error || 'Something went wrong')
         setPhase('settings')
+        trace.measure('generate')
         return
       }
 
       setResult(data.result)
+      setIdeaId(data.ideaId || '')
+      setPreamble(data.preamble || '')
+      setSections(data.sections || [])
+      pendingRender.current = { trace, parsed }
       setPhase('result')
     } catch {
       setError('Failed to connect to the server')
       setPhase('settings')
+      trace.measure('generate')
+    }
+  }
+
+  const handleRendered = () => {
+    const pending = pendingRender.current
+    if (!pending) return
+    pendingRender.current = null
+    pending.trace.measure('render', pending.parsed)
+    pending.trace.measure('generate')
+  }
+
+  const handleRegenerateSection = async (sectionId: string) => {
+    setRegeneratingSection(sectionId)
+    setSectionError('')
+
+    try {
+      const response = await fetch('/api/regenerate-section', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ideaId, sectionId }),
+      })
+
+      const data = await response.json()
+
+      if (!response.ok) {
+        setSectionError(data.error || 'Something went wrong')
+        return
+      }
+
+      setResult(data.result)
+      setSections(data.sections)
+    } catch {
+      setSectionError('Failed to connect to the server')
+    } finally {
+      setRegeneratingSection(null)
     }
   }
 
@@ -89,6 +114,9 @@ export default function CreateIdeaPage() {
     setAdditionalDetails('')
     setResult('')
     setError('')
+    setIdeaId('')
+    setSections([])
+    setSectionError('')
     setPhase('settings')
   }
 
@@ -148,10 +176,36 @@ export default function CreateIdeaPage() {
             }}
           >
             <div className="prose-yoma text-gray-800">
-              <ReactMarkdown>{result}</ReactMarkdown>
+              <IdeaMarkdown
+                result={result}
+                preamble={preamble}
+                sections={sections}
+                onRendered={handleRendered}
+                renderSectionFooter={(section) => (
+                  <button
+                    onClick={() => handleRegenerateSection(section.id)}
+                    disabled={regeneratingSection !== null}
+                    className="text-sm text-gray-400 underline decoration-dashed underline-offset-2 hover:text-gray-600 disabled:no-underline disabled:opacity-60"
+                  >
+                    {regeneratingSection === section.id ? 'Rewriting...' : '↻ Rewrite section'}
+                  </button>
+                )}
+              />
             </div>
           </div>
 
+          {sectionError && (
+            <div
+              className="mt-6 border-2 border-red-300 bg-red-50/80 p-4 text-center text-red-700"
+              style={{
+                fontFamily: "'Chilanka', cursive",
+                borderRadius: '4px 2px 5px 3px',
+              }}
+            >
+              {sectionError}
+            </div>
+          )}
+
           <div className="mt-8 flex justify-center gap-4">
             <button onClick={handleStartOver} className="sketchy-btn">
               Create Another Idea
@@ -250,6 +304,7 @@ export default function CreateIdeaPage() {
             placeholder="e.g. This is a fanfiction based on Naruto universe. I want the main character to be a rogue ninja from the Hidden Mist Village..."
             className="sketchy-textarea"
             rows={4}
+            maxLength={MAX_DETAILS_LENGTH}
           />
         </div>
 
@@ -0,0 +1,37 @@
+// Browser half of request tracing. A generation gets a W3C trace context,
+// sent as `traceparent` so the server continues the same trace; each client
+// stage becomes a performance measure named `yoma:<stage>` with the trace id
+// in its detail. The server's own stages arrive as Server-Timing on the
+// request's resource timing entry.
+
+function randomHex(bytes: number): string {
+  return Array.from(crypto.getRandomValues(new Uint8Array(bytes)), (byte) =>
+    byte.toString(16).padStart(2, '0'),
+  ).join('')
+}
+
+export class ClientTrace {
+  readonly traceId = randomHex(16)
+  readonly spanId = randomHex(8)
+  readonly startedAt = performance.now()
+
+  get traceparent(): string {
+    return `00-${this.traceId}-${this.spanId}-01`
+  }
+
+  /** Records `stage` from `start` (the trace start by default) until now; returns now. */
+  measure(stage: string, start = this.startedAt): number {
+    const end = performance.now()
+    performance.measure(`yoma:${stage}`, {
+      start,
+      end,
+      detail: { traceId: this.traceId, spanId: this.spanId },
+    })
+    return end
+  }
+}
+
+/** Resolves once the frame with the current state has been painted. */
+export function afterNextPaint(): Promise<void> {
+  return new Promise((resolve) => requestAnimationFrame(() => setTimeout(resolve)))
+}
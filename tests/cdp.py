@@ -0,0 +1,95 @@
+"""
+Клиент Chrome DevTools Protocol поверх WebSocket для автотестов YomaAI.
+
+driver.execute_cdp_cmd умеет только команды «запрос → ответ»,
+а часть протокола работает через события (HeapProfiler.addHeapSnapshotChunk,
+Fetch.requestPaused, ...). CDPSession подключается к той же вкладке
+по debuggerAddress из capabilities ChromeDriver и получает события.
+"""
+
+import json
+import threading
+import urllib.request
+from collections.abc import Callable
+
+import websocket
+
+
+class CDPSession:
+    """Отдельное CDP-подключение к текущей вкладке Chrome."""
+
+    def __init__(self, driver):
+        address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        with urllib.request.urlopen(f"http://{address}/json", timeout=5) as response:
+            targets = json.loads(response.read())
+        page = next(t for t in targets if t["type"] == "page")
+
+        self._ws = websocket.create_connection(
+            page["webSocketDebuggerUrl"], timeout=60, suppress_origin=True
+        )
+        self._next_id = 0
+        self._handlers: dict[str, list[Callable[[dict], None]]] = {}
+        self._results: dict[int, dict] = {}
+        self._lock = threading.RLock()
+
+    def on(self, method: str, handler: Callable[[dict], None]) -> None:
+        """Подписывает обработчик на событие CDP (вызывается при чтении сообщений)."""
+        self._handlers.setdefault(method, []).append(handler)
+
+    def send(self, method: str, params: dict | None = None) -> dict:
+        """
+        Отправляет команду и ждёт её результат. События, пришедшие
+        до ответа, передаются подписанным обработчикам — те могут
+        сами вызывать send (например, Fetch.fulfillRequest).
+        """
+        with self._lock:
+            self._next_id += 1
+            message_id = self._next_id
+            self._ws.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+
+        while True:
+            with self._lock:
+                if message_id in self._results:
+                    message = self._results.pop(message_id)
+                    break
+                message = json.loads(self._ws.recv())
+            self._route(message)
+
+        if "error" in message:
+            raise RuntimeError(f"{method}: {message['error']}")
+        return message.get("result", {})
+
+    def poll(self, timeout: float) -> bool:
+        """Ждёт одно сообщение до timeout секунд. Возвращает False, если их нет."""
+        with self._lock:
+            self._ws.settimeout(timeout)
+            try:
+                message = json.loads(self._ws.recv())
+            except websocket.WebSocketTimeoutException:
+                return False
+            finally:
+                self._ws.settimeout(60)
+        self._route(message)
+        return True
+
+    def _route(self, message: dict) -> None:
+        if "id" in message:
+            self._results[message["id"]] = message
+            return
+        for handler in self._handlers.get(message.get("method", ""), []):
+            handler(message.get("params", {}))
+
+    def close(self) -> None:
+        self._ws.close()
+
+
+def take_heap_snapshot(driver, path) -> None:
+    """Сохраняет снимок JS-кучи вкладки в файл .heapsnapshot (открывается в DevTools)."""
+    session = CDPSession(driver)
+    try:
+        with open(path, "w", encoding="utf-8") as out:
+            session.on("HeapProfiler.addHeapSnapshotChunk", lambda p: out.write(p["chunk"]))
+            session.send("HeapProfiler.enable")
+            session.send("HeapProfiler.takeHeapSnapshot", {"reportProgress": False})
+    finally:
+        session.close()
@@ -10,12 +10,79 @@
   uv run --with pytest --with selenium pytest tests/ -v
 """
 
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import json
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
 import pytest
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 
+from fake_provider import FakeProvider
+from helpers import PROJECT_ROOT
+from impact import ImpactPlugin, TrackedChrome
+from network import NetworkInterceptor
+from tracing import TraceCollector
+
 
 BASE_URL = "http://localhost:5173"
+# Express в production-режиме (npm start) — отдаёт собранный dist/
+PROD_URL = os.environ.get("YOMA_PROD_URL", "http://localhost:4173")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("yoma-soak", "Soak-тесты YomaAI (утечки памяти)")
+    group.addoption("--soak", action="store_true", help="запустить длительные soak-тесты")
+    group.addoption(
+        "--soak-cycles", type=int, default=2000,
+        help="число циклов генерация/регенерация/сброс (по умолчанию 2000)",
+    )
+    group.addoption(
+        "--soak-dir", default="soak-artifacts",
+        help="куда сохранять снимки кучи и замеры (по умолчанию soak-artifacts/)",
+    )
+    group = parser.getgroup("yoma-impact", "Выбор тестов по изменённым файлам (impact.py)")
+    group.addoption(
+        "--full-run", action="store_true",
+        help="выполнить все тесты, не используя кеш прошедших",
+    )
+    group = parser.getgroup("yoma-cassettes", "Кассеты трафика провайдера (server/cassette.ts)")
+    group.addoption(
+        "--record-cassettes", action="store_true",
+        help="перезаписать закоммиченные кассеты tests/cassettes через подменного провайдера",
+    )
+    group = parser.getgroup("yoma-tracing", "Сквозные трассы генерации (tracing.py)")
+    group.addoption(
+        "--trace-dir", default=None,
+        help="сохранять объединённую трассу браузер + сервер каждого теста (Chrome trace JSON)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "soak: длительный тест утечек памяти, только с --soak")
+    config.addinivalue_line(
+        "markers", "depends_on(*paths): файлы/каталоги, от которых тест зависит помимо найденных impact.py",
+    )
+    # Без cacheprovider (-p no:cacheprovider) хранить зависимости негде — выполняется всё.
+    if getattr(config, "cache", None) is not None:
+        config.pluginmanager.register(ImpactPlugin(config), "yoma-impact")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--soak"):
+        return
+    skip = pytest.mark.skip(reason="soak-тест: запустите с --soak")
+    for item in items:
+        if "soak" in item.keywords:
+            item.add_marker(skip)
 
 
 def _make_driver(width: int, height: int) -> webdriver.Chrome:
@@ -26,7 +93,7 @@ def _make_driver(width: int, height: int) -> webdriver.Chrome:
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument(f"--window-size={width},{height}")
 
-    browser = webdriver.Chrome(options=chrome_options)
+    browser = TrackedChrome(options=chrome_options)
     browser.implicitly_wait(5)
     return browser
 
@@ -37,6 +104,21 @@ def base_url():
     return BASE_URL
 
 
+@pytest.fixture(scope="session")
+def prod_url():
+    """URL production-сервера (переопределяется через YOMA_PROD_URL)."""
+    return PROD_URL
+
+
+@pytest.fixture(scope="session")
+def soak_options(request):
+    """Параметры soak-режима: {"cycles": int, "dir": Path}."""
+    artifacts = Path(request.config.getoption("--soak-dir"))
+    if not artifacts.is_absolute():
+        artifacts = PROJECT_ROOT / artifacts
+    return {"cycles": request.config.getoption("--soak-cycles"), "dir": artifacts}
+
+
 @pytest.fixture(scope="function")
 def driver():
     """Chrome WebDriver — десктоп (1920×1080). Закрывается после каждого теста."""
@@ -68,3 +150,131 @@ def tablet_driver():
     browser = _make_driver(768, 1024)
     yield browser
     browser.quit()
+
+
+@pytest.fixture(scope="function")
+def network(driver):
+    """
+    Перехват /api/* во вкладке driver через CDP (см. network.py).
+    Включается до первой навигации, так что сценарии действуют
+    с самого первого запроса и переживают перезагрузку страницы.
+    """
+    with NetworkInterceptor(driver) as interceptor:
+        yield interceptor
+
+
+@pytest.fixture(scope="function")
+def request_traces(driver, request):
+    """
+    Трассы генераций во вкладке driver (см. tracing.py): стадии браузера
+    и Server-Timing, а серверные спаны — из YomaTraceDir, если он задан
+    (тест может указать свой каталог в server_trace_dir).
+    После теста разбивка каждой трассы попадает в user_properties,
+    а с --trace-dir объединённая трасса сохраняется в <trace-dir>/<тест>.json.
+    """
+    server_dir = os.environ.get("YomaTraceDir")
+    collector = TraceCollector(driver, Path(server_dir) if server_dir else None)
+    yield collector
+
+    try:
+        traces = collector.collect()
+    except WebDriverException:
+        return
+    for trace in traces:
+        request.node.user_properties.append((f"trace_{trace.trace_id}", json.dumps(trace.breakdown())))
+
+    trace_dir = request.config.getoption("--trace-dir")
+    if trace_dir and traces:
+        artifacts = Path(trace_dir)
+        if not artifacts.is_absolute():
+            artifacts = PROJECT_ROOT / artifacts
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in request.node.nodeid)
+        collector.export(artifacts / f"{name}.json")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_server(
+    url: str, process: subprocess.Popen, log, timeout: float = 30, probe: str = "/healthz",
+) -> None:
+    """
+    Ждёт, пока отдельный Express-сервер ответит 200 на probe:
+    /healthz — процесс поднялся, /readyz — готов генерировать.
+    """
+    deadline = time.monotonic() + timeout
+    last_error = ""
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            output = log.read().decode(errors="replace")
+            raise RuntimeError(f"Сервер завершился при старте:\n{output}")
+        try:
+            urllib.request.urlopen(f"{url}{probe}", timeout=10)
+            return
+        except urllib.error.HTTPError as error:
+            last_error = error.read().decode(errors="replace")
+            time.sleep(0.2)
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Сервер не ответил на {probe} за {timeout} секунд: {url} {last_error}")
+
+
+@pytest.fixture(scope="function")
+def fake_provider():
+    """
+    Фабрика подменного AI-провайдера (см. fake_provider.py).
+    fake_provider({"key": rpm}, ...) → запущенный FakeProvider.
+    """
+    providers = []
+
+    def start(rpm_by_key: dict[str, int], **kwargs) -> FakeProvider:
+        provider = FakeProvider(rpm_by_key, **kwargs).__enter__()
+        providers.append(provider)
+        return provider
+
+    yield start
+    for provider in providers:
+        provider.__exit__(None, None, None)
+
+
+@pytest.fixture(scope="function")
+def start_api_server():
+    """
+    Фабрика отдельного Express-сервера (tsx server/index.ts)
+    на свободном порту с заданными переменными окружения.
+    Возвращает URL сервера; процесс останавливается после теста.
+    ready=True — ждать /readyz (ключи, провайдер, запас лимитов), а не /healthz.
+    """
+    tsx = PROJECT_ROOT / "node_modules" / ".bin" / "tsx"
+    if not tsx.exists() or shutil.which("node") is None:
+        pytest.skip("tsx не найден — выполните npm install")
+
+    processes = []
+
+    def start(env: dict[str, str], ready: bool = False) -> str:
+        port = _free_port()
+        log = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            [str(tsx), "server/index.ts"],
+            cwd=PROJECT_ROOT,
+            env={**os.environ, "PORT": str(port), **env},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        processes.append((process, log))
+        url = f"http://127.0.0.1:{port}"
+        _wait_for_server(url, process, log, probe="/readyz" if ready else "/healthz")
+        return url
+
+    yield start
+    for process, log in processes:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
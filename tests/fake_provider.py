@@ -0,0 +1,253 @@
+"""
+Подменный AI-провайдер для автотестов YomaAI.
+
+Локальный HTTP-сервер, который отвечает как Anthropic (/v1/messages)
+и OpenRouter (/chat/completions), но без реальных вызовов:
+  - у каждого ключа свой лимит запросов в минуту (429 при превышении);
+  - неизвестные или «отозванные» ключи получают 401;
+  - в ответ добавляются заголовки rate limit, как у настоящего провайдера;
+  - GET /v1/models и /models отвечают списком моделей (проверка /readyz)
+    или заданным probe_status и в лимиты не входят;
+  - на просьбу переписать секцию ('Rewrite ONLY the "## …" section')
+    возвращается только эта секция text, а не вся идея;
+  - время ответа — latency плюс latency_per_token на каждый выходной токен.
+
+Сервер подключается через ClaudeBaseURL / OpenrouterBaseURL.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Просьба из buildSectionPrompt (server/sections.ts).
+SECTION_REQUEST = re.compile(r'Rewrite ONLY the "## (.+?)" section')
+
+SECTION_TITLES = [
+    "Title", "Logline", "Synopsis", "Main Characters", "The Hook",
+    "World & Setting", "Key Themes", "Medium Showcase",
+    "Structure & Pacing", "Opening Scene",
+]
+
+
+def sample_idea(paragraphs_per_section: int = 2) -> str:
+    """Markdown-идея со всеми секциями из SYSTEM_PROMPT."""
+    paragraph = (
+        "The lighthouse keeper of Vell counts ships that never arrive, "
+        "and every uncounted hull becomes a debt the town must repay in memories."
+    )
+    return "\n\n".join(
+        f"## {title}\n\n" + "\n\n".join([paragraph] * paragraphs_per_section)
+        for title in SECTION_TITLES
+    )
+
+
+def epic_idea(target_chars: int = 32000) -> str:
+    """
+    Очень длинная идея (~8000 токенов при target_chars=32000), как у
+    «Epic» / «Extremely Intricate»: арки списками, стихи, абзацы о мире.
+    Текст секций не повторяется, чтобы кэш разбора не срабатывал сразу.
+    """
+    def blocks(title: str, n: int) -> list[str]:
+        arcs = "\n".join(
+            f"{i}. **{title}, arc {n}.{i}.** The keeper's daughter audits a harbour that "
+            f"only exists at low tide; ship {n * 10 + i} costs the town one shared memory."
+            for i in range(1, 6)
+        )
+        poem = (
+            f"> Count the hulls that never dock ({n}),\n"
+            "> count the bells that never ring,\n"
+            "> the harbour keeps a second clock\n"
+            "> and winds it with forgotten things."
+        )
+        world = (
+            f"In Vell ({title.lower()}, part {n}) the fog is taxed by the cubic fathom, and "
+            "lighthouse oil is brewed from the letters nobody sent. Children learn to read by "
+            "tracing ship names on the sea wall, and each winter the names are repainted."
+        )
+        rules = f"- *Rule {n}:* the fog remembers.\n- *Cost:* one memory per hull.\n- *Exception:* the keeper."
+        return [arcs, poem, world, rules]
+
+    per_section = target_chars // len(SECTION_TITLES)
+    sections = []
+    for title in SECTION_TITLES:
+        body: list[str] = []
+        while sum(len(b) for b in body) < per_section:
+            body.extend(blocks(title, len(body) // 4 + 1))
+        sections.append(f"## {title}\n\n" + "\n\n".join(body))
+    return "\n\n".join(sections)
+
+
+def idea_section(text: str, title: str) -> str:
+    """Секция "## title" из markdown-идеи вместе с заголовком; без такой секции — вся идея."""
+    match = re.search(rf"^## {re.escape(title)}\n.*?(?=^## |\Z)", text, re.MULTILINE | re.DOTALL)
+    return match.group(0).rstrip() if match else text
+
+
+class FakeProvider:
+    """Подменный провайдер с лимитами на ключ. Используется как контекст-менеджер."""
+
+    WINDOW_SECONDS = 60
+
+    def __init__(
+        self,
+        rpm_by_key: dict[str, int],
+        unauthorized: tuple[str, ...] = (),
+        text: str | None = None,
+        latency: float = 0.0,
+        latency_per_token: float = 0.0,
+        send_rate_limit_headers: bool = True,
+        probe_status: int | None = None,
+    ):
+        self.rpm_by_key = rpm_by_key
+        self.unauthorized = set(unauthorized)
+        self.text = text if text is not None else sample_idea()
+        self.latency = latency
+        # Генерация идёт со скоростью модели: длинный ответ отвечает дольше.
+        self.latency_per_token = latency_per_token
+        self.send_rate_limit_headers = send_rate_limit_headers
+        # Статус ответа на GET /models вместо списка моделей (можно менять на ходу).
+        self.probe_status = probe_status
+
+        self.requests_by_key: Counter = Counter()
+        self.rejected_by_key: Counter = Counter()
+        # Пользовательские промпты принятых запросов, по порядку.
+        self.prompts: list[str] = []
+        # max_tokens принятых запросов, по порядку.
+        self.max_tokens: list[int | None] = []
+        # GET-запросы списка моделей — так сервер проверяет провайдера для /readyz.
+        self.probes = 0
+        # Заголовок traceparent каждого POST, включая отклонённые (None — не пришёл).
+        self.traceparents: list[str | None] = []
+        self._window: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeProvider":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self, key: str) -> tuple[bool, int, int, float]:
+        """
+        Считает запрос в минутном окне ключа.
+        Возвращает (admitted, limit, remaining, reset_in_seconds).
+        """
+        limit = self.rpm_by_key[key]
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._window.get(key, (now, 0))
+            if now - started >= self.WINDOW_SECONDS:
+                started, count = now, 0
+            admitted = count < limit
+            if admitted:
+                count += 1
+                self.requests_by_key[key] += 1
+            else:
+                self.rejected_by_key[key] += 1
+            self._window[key] = (started, count)
+        return admitted, limit, limit - count, self.WINDOW_SECONDS - (now - started)
+
+    def _handler_class(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: dict, headers: dict | None = None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _key(self, is_claude: bool) -> str:
+                if is_claude:
+                    return self.headers.get("x-api-key", "")
+                return self.headers.get("Authorization", "").removeprefix("Bearer ")
+
+            def _authorized(self, key: str) -> bool:
+                return key not in provider.unauthorized and key in provider.rpm_by_key
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if not path.endswith("/models"):
+                    self._reply(404, {"error": {"type": "not_found_error"}})
+                    return
+                with provider._lock:
+                    provider.probes += 1
+                if not self._authorized(self._key(path.endswith("/v1/models"))):
+                    self._reply(401, {"error": {"type": "authentication_error"}})
+                    return
+                if provider.probe_status is not None:
+                    self._reply(provider.probe_status, {"error": {"type": "probe_error"}}, {"retry-after": 30})
+                    return
+                self._reply(200, {"data": [{"id": "fake-model"}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                is_claude = self.path.endswith("/v1/messages")
+                key = self._key(is_claude)
+                with provider._lock:
+                    provider.traceparents.append(self.headers.get("traceparent"))
+
+                if not self._authorized(key):
+                    self._reply(401, {"error": {"type": "authentication_error"}})
+                    return
+
+                admitted, limit, remaining, reset_in = provider._admit(key)
+                headers = {}
+                if provider.send_rate_limit_headers:
+                    if is_claude:
+                        headers["anthropic-ratelimit-requests-limit"] = limit
+                        headers["anthropic-ratelimit-requests-remaining"] = remaining
+                    else:
+                        headers["x-ratelimit-limit-requests"] = limit
+                        headers["x-ratelimit-remaining-requests"] = remaining
+
+                if not admitted:
+                    headers["retry-after"] = max(1, round(reset_in))
+                    self._reply(429, {"error": {"type": "rate_limit_error"}}, headers)
+                    return
+
+                prompt = body["messages"][-1]["content"]
+                with provider._lock:
+                    provider.prompts.append(prompt)
+                    provider.max_tokens.append(body.get("max_tokens"))
+                section = SECTION_REQUEST.search(prompt)
+                text = idea_section(provider.text, section.group(1)) if section else provider.text
+                # Как у настоящего провайдера: ответ не длиннее max_tokens.
+                output_tokens = min(max(1, len(text) // 4), body.get("max_tokens") or 1 << 30)
+                time.sleep(provider.latency + output_tokens * provider.latency_per_token)
+                input_tokens = sum(len(json.dumps(m)) for m in body.get("messages", [])) // 4
+                if is_claude:
+                    reply = {
+                        "content": [{"type": "text", "text": text}],
+                        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+                    }
+                else:
+                    reply = {
+                        "choices": [{"message": {"content": text}}],
+                        "usage": {
+                            "completion_tokens": output_tokens,
+                            "total_tokens": input_tokens + output_tokens,
+                        },
+                    }
+                self._reply(200, reply, headers)
+
+        return Handler
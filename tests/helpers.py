@@ -0,0 +1,89 @@
+"""
+Общие хелперы автотестов YomaAI.
+
+Обычный модуль, а не conftest.py и не тестовый файл: импортировать
+conftest и test_*.py из других модулей pytest не поддерживает.
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+MOCK_RESULT = {
+    "result": (
+        "## Test Idea\n\nThis is a **mock AI response** for automated testing. "
+        "It contains enough text to pass the length check and verifies that the "
+        "result phase renders correctly with markdown content."
+    ),
+}
+
+# Счётчики коммитов React и long tasks; ставятся через CDP до загрузки страницы.
+RENDER_STATS_JS = """
+(() => {
+  const stats = { commits: [], longTasks: [] };
+  window.__yomaRenderStats = stats;
+  let nextId = 0;
+  window.__REACT_DEVTOOLS_GLOBAL_HOOK__ = {
+    supportsFiber: true,
+    renderers: new Map(),
+    inject(renderer) { this.renderers.set(++nextId, renderer); return nextId; },
+    onCommitFiberRoot() { stats.commits.push(performance.now()); },
+    onCommitFiberUnmount() {},
+    onPostCommitFiberRoot() {},
+    checkDCE() {},
+  };
+  new PerformanceObserver((list) => {
+    for (const entry of list.getEntries()) {
+      stats.longTasks.push({ start: entry.startTime, duration: entry.duration });
+    }
+  }).observe({ type: 'longtask', buffered: true });
+})();
+"""
+
+
+def skip_dialog_via_storage(driver, base_url: str) -> None:
+    """Устанавливает skip-dialog в localStorage и переходит на /create."""
+    driver.get(base_url)
+    driver.execute_script("localStorage.setItem('yoma-skip-dialog', 'true');")
+    driver.get(f"{base_url}/create")
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located(
+            (By.XPATH, "//h1[contains(text(), 'Craft Your Idea')]")
+        )
+    )
+
+
+def post_json(url: str, payload: dict, headers: dict | None = None, timeout: int = 180, method: str = "POST"):
+    """POST (или method) JSON. Возвращает (status, body, headers ответа, секунды); ошибки HTTP не бросает."""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json", **(headers or {})},
+        method=method,
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, body, reply_headers = response.status, response.read(), response.headers
+    except urllib.error.HTTPError as error:
+        status, body, reply_headers = error.code, error.read(), error.headers
+    return status, json.loads(body or b"{}"), reply_headers, time.perf_counter() - started
+
+
+def server_env(base_url: str, keys: str, **extra: str) -> dict[str, str]:
+    """Окружение Express-сервера с провайдером Claude по адресу base_url."""
+    return {
+        "WhatAIYomaWillUse": "Claude",
+        "ClaudeAPI": keys,
+        "ClaudeBaseURL": base_url,
+        **extra,
+    }
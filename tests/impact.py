@@ -0,0 +1,316 @@
+"""
+Выбор тестов по изменённым файлам с кешем прошедших тестов.
+
+Для каждого прошедшего теста запоминается, какие файлы проекта он затронул,
+и их хеши (.pytest_cache, ключ yoma/impact):
+  - фронтенд — покрытие JS через CDP (Profiler.takePreciseCoverage):
+    модуль src/… затронут, если страница его загрузила — даже если ни одна
+    его функция не вызывалась (ошибка в импортированном, но не вызванном
+    модуле ломает загрузку всей страницы);
+  - backend — server/ и .env, если ответ /api пришёл из сети, а не от
+    network.py (remoteIPAddress в performance-логе ChromeDriver), если тест
+    поднимает свой сервер / провайдера / кассету или ходит в API без браузера;
+  - сам тестовый файл, импортируемые им модули tests/ и общие файлы
+    (conftest.py, package.json, …);
+  - файлы и каталоги из маркера @pytest.mark.depends_on(...) — для кода,
+    который тест запускает сам (например, бенчмарк через tsx).
+
+При следующем запуске тест, у которого все хеши совпали, не выполняется:
+он пропускается как «cached pass». --full-run выполняет всё заново.
+Soak-тесты не кешируются.
+
+Файлы src/, которые не попали в покрытие ни одного теста, и сборка
+(index.html, vite.config.ts, tsconfig*) ни к чему не привязаны: их правка
+перезапускает все тесты.
+"""
+
+import ast
+import hashlib
+import json
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import pytest
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from helpers import PROJECT_ROOT
+
+
+TESTS_DIR = PROJECT_ROOT / "tests"
+CACHE_KEY = "yoma/impact"
+# Хеши файлов src/ вне карты покрытия на момент прошлого прогона.
+UNMAPPED_KEY = "yoma/impact-unmapped"
+CACHED_REASON = "cached pass: затронутые файлы не менялись"
+
+# Сборка и точка входа фронтенда — в покрытии их не видно.
+BROWSER_FILES = {"index.html", "vite.config.ts", "tsconfig.json", "tsconfig.app.json"}
+# Изменение любого из них (и модулей, которые импортирует conftest.py) перезапускает все тесты.
+SHARED_FILES = {"tests/requirements.txt", "package.json", "package-lock.json"} | BROWSER_FILES
+SERVER_FIXTURES = {"start_api_server", "fake_provider", "prod_url"}
+
+# Текущий тест; TrackedChrome складывает в него покрытие.
+_current: "_Record | None" = None
+
+
+@dataclass
+class _Record:
+    item: pytest.Item
+    files: set[str] = field(default_factory=set)
+    # Модули src/, загруженные страницей в dev-режиме (карта покрытия).
+    covered: set[str] = field(default_factory=set)
+    duration: float = 0.0
+    failed: bool = False
+    skipped: bool = False
+    complete: bool = True
+    browser: bool = False
+
+
+# ─── Файлы и хеши ─────────────────────────────────────────────
+
+@cache
+def _source_files(directory: str) -> frozenset[str]:
+    return frozenset(
+        path.relative_to(PROJECT_ROOT).as_posix()
+        for path in (PROJECT_ROOT / directory).rglob("*")
+        if path.is_file()
+    )
+
+
+def _server_files() -> set[str]:
+    return set(_source_files("server")) | {".env"}
+
+
+def _frontend_files() -> set[str]:
+    return set(_source_files("src")) | BROWSER_FILES
+
+
+@cache
+def _local_imports(module: Path) -> frozenset[str]:
+    """Модули tests/, которые импортирует module (рекурсивно, включая его самого)."""
+    found = {module.relative_to(PROJECT_ROOT).as_posix()}
+    for node in ast.walk(ast.parse(module.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            imported = TESTS_DIR / f"{name.split('.')[0]}.py"
+            if imported.is_file() and imported != module:
+                found |= _local_imports(imported)
+    return frozenset(found)
+
+
+class _Hashes(dict):
+    """sha1 содержимого файла (None — файла нет), считается один раз за сессию."""
+
+    def __missing__(self, path: str) -> str | None:
+        file = PROJECT_ROOT / path
+        digest = hashlib.sha1(file.read_bytes()).hexdigest() if file.is_file() else None
+        self[path] = digest
+        return digest
+
+
+# ─── Покрытие из браузера ─────────────────────────────────────
+
+def _covered_files(script: dict) -> set[str]:
+    """
+    Файлы проекта за скриптом из Profiler.takePreciseCoverage. Скрипт в
+    покрытии — значит, загружен: модуль считается затронутым, даже если
+    выполнился только его верхний уровень.
+    """
+    path = unquote(urlsplit(script["url"]).path)
+    if path.startswith("/assets/"):
+        # Production-сборка: один бандл, исходники в нём не различить.
+        return _frontend_files()
+    if path.startswith("/src/") and (PROJECT_ROOT / path[1:]).is_file():
+        return {path[1:]}
+    return set()
+
+
+def _reached_backend(entry: dict) -> bool:
+    """Запись performance-лога — ответ /api, пришедший из сети (не Fetch.fulfillRequest)."""
+    if "Network.responseReceived" not in entry["message"]:
+        return False
+    message = json.loads(entry["message"])["message"]
+    if message["method"] != "Network.responseReceived":
+        return False
+    response = message["params"]["response"]
+    return urlsplit(response["url"]).path.startswith("/api/") and bool(response.get("remoteIPAddress"))
+
+
+class TrackedChrome(webdriver.Chrome):
+    """
+    Chrome, который записывает в текущий тест покрытие JS и обращения к /api.
+    Покрытие снимается перед каждой навигацией и перед quit(): после
+    перезагрузки скрипты прежней страницы и их счётчики пропадают.
+    Вне impact-записи (soak-тесты) ведёт себя как обычный webdriver.Chrome.
+    """
+
+    def __init__(self, options):
+        self._record = _current
+        if self._record is not None:
+            self._record.browser = True
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        super().__init__(options=options)
+        if self._record is not None:
+            # Бинарный режим (выполнялась функция или нет) почти не замедляет страницу.
+            self.execute_cdp_cmd("Profiler.enable", {})
+            self.execute_cdp_cmd("Profiler.startPreciseCoverage", {"callCount": False, "detailed": False})
+
+    def get(self, url: str) -> None:
+        self._collect()
+        super().get(url)
+
+    def refresh(self) -> None:
+        self._collect()
+        super().refresh()
+
+    def quit(self) -> None:
+        try:
+            self._collect()
+        finally:
+            super().quit()
+
+    def _collect(self) -> None:
+        record = self._record
+        if record is None:
+            return
+        try:
+            coverage = self.execute_cdp_cmd("Profiler.takePreciseCoverage", {})["result"]
+            log = self.get_log("performance")
+        except WebDriverException:
+            # Браузер уже недоступен — зависимости неполные, тест не кешируем.
+            record.complete = False
+            return
+        for script in coverage:
+            files = _covered_files(script)
+            record.files |= files
+            if urlsplit(script["url"]).path.startswith("/src/"):
+                record.covered |= files
+        if any(_reached_backend(entry) for entry in log):
+            record.files |= _server_files()
+
+
+# ─── Плагин pytest ────────────────────────────────────────────
+
+class ImpactPlugin:
+    """Пропускает тесты с неизменными зависимостями и записывает зависимости выполненных."""
+
+    def __init__(self, config):
+        self.cache = config.cache
+        self.full_run = config.getoption("--full-run")
+        self.entries: dict[str, dict] = self.cache.get(CACHE_KEY, {})
+        self.unmapped: dict[str, str | None] | None = self.cache.get(UNMAPPED_KEY, None)
+        self.hashes = _Hashes()
+        # Изменённые файлы вне карты покрытия: кеш этого прогона не используется.
+        self.invalidated: list[str] = []
+        self.recorded: set[str] = set()
+        self.reused: list[float] = []
+        self.ran: list[float] = []
+
+    def pytest_sessionstart(self, session):
+        # Хеши снимаются до прогона: правка во время прогона не попадёт в кеш как проверенная.
+        tests = {path.relative_to(PROJECT_ROOT).as_posix() for path in TESTS_DIR.glob("*.py")}
+        for path in SHARED_FILES | _frontend_files() | _server_files() | tests:
+            self.hashes[path]
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        if self.full_run:
+            return
+        if self.unmapped is None:
+            # Нет карты с прошлого прогона — неизвестно, что не покрыто.
+            self.invalidated = ["(нет карты покрытия)"] if self.entries else []
+        else:
+            self.invalidated = [
+                path for path, digest in self.unmapped.items() if self.hashes[path] != digest
+            ]
+        if self.invalidated:
+            return
+        skip = pytest.mark.skip(reason=CACHED_REASON)
+        for item in items:
+            entry = self.entries.get(item.nodeid)
+            if entry is None or "soak" in item.keywords:
+                continue
+            if all(self.hashes[path] == digest for path, digest in entry["files"].items()):
+                item.add_marker(skip)
+                self.reused.append(entry["duration"])
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        global _current
+        record = _current = None if "soak" in item.keywords else _Record(item)
+        yield
+        _current = None
+        if record is None or record.skipped:
+            return
+
+        self.ran.append(record.duration)
+        if record.failed or not record.complete:
+            self.entries.pop(item.nodeid, None)
+            return
+        files = {path: self.hashes[path] for path in sorted(self._dependencies(record))}
+        self.entries[item.nodeid] = {
+            "files": files,
+            "covered": sorted(record.covered),
+            "duration": round(record.duration, 3),
+        }
+        self.recorded.add(item.nodeid)
+
+    def pytest_runtest_logreport(self, report):
+        record = _current
+        if record is None or report.nodeid != record.item.nodeid:
+            return
+        record.duration += report.duration
+        if report.skipped:
+            record.skipped = True
+        elif report.failed:
+            record.failed = True
+
+    def pytest_sessionfinish(self, session):
+        if self.invalidated or self.full_run:
+            # Невыполненные тесты (-k, -x) проверялись со старыми файлами вне карты.
+            self.entries = {nodeid: self.entries[nodeid] for nodeid in self.recorded}
+        self.cache.set(CACHE_KEY, self.entries)
+
+        covered = set().union(*(entry.get("covered", ()) for entry in self.entries.values()))
+        unmapped = sorted(_source_files("src") - covered)
+        self.cache.set(UNMAPPED_KEY, {path: self.hashes[path] for path in unmapped})
+
+    def pytest_terminal_summary(self, terminalreporter):
+        terminalreporter.section("impact")
+        if self.full_run:
+            terminalreporter.write_line(f"полный прогон (--full-run): выполнено {len(self.ran)}")
+            return
+        if self.invalidated:
+            terminalreporter.write_line(
+                f"изменены файлы вне карты покрытия ({', '.join(self.invalidated[:5])}): "
+                f"выполнено {len(self.ran)}"
+            )
+            return
+        terminalreporter.write_line(
+            f"выполнено: {len(self.ran)} ({sum(self.ran):.1f} с), "
+            f"из кеша: {len(self.reused)}, сэкономлено ≈{sum(self.reused):.1f} с"
+        )
+
+    @staticmethod
+    def _dependencies(record: _Record) -> set[str]:
+        item = record.item
+        fixtures = set(item.fixturenames)
+        files = SHARED_FILES | record.files | _local_imports(TESTS_DIR / "conftest.py")
+        files |= _local_imports(Path(item.path))
+
+        if "prod_url" in fixtures:
+            files |= _frontend_files()
+        for marker in item.iter_markers("depends_on"):
+            for path in marker.args:
+                files |= set(_source_files(path)) if (PROJECT_ROOT / path).is_dir() else {path}
+        # Без браузера base_url нужен только для запросов к API напрямую.
+        if fixtures & SERVER_FIXTURES or (not record.browser and "base_url" in fixtures):
+            files |= _server_files()
+        return files
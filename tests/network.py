@@ -0,0 +1,398 @@
+"""
+Перехват сетевых запросов вкладки на уровне браузера (CDP Fetch + Network).
+
+В отличие от подмены window.fetch через execute_script, перехват
+включается до первой навигации, переживает перезагрузку страницы
+и работает с настоящими HTTP-ответами:
+  - сценарные ответы (статус, заголовки, JSON или произвольное тело);
+  - задержка до ответа и ограничение пропускной способности;
+  - тело частями (chunked) с паузами между частями;
+  - отказы: сетевые ошибки Fetch.failRequest и обрыв соединения посреди тела;
+  - журнал запросов с таймингами браузера (Network.*).
+
+Простые ответы отдаются через Fetch.fulfillRequest. Потоковые — через
+локальный HTTP-сервер: запрос продолжается (Fetch.continueRequest) на его
+адрес, а страница по-прежнему видит исходный URL.
+"""
+
+import base64
+import json
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from cdp import CDPSession
+
+
+@dataclass
+class Route:
+    """Сценарий ответа на запросы к одному пути."""
+
+    path: str
+    status: int = 200
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+    latency: float = 0.0
+    chunk_size: int | None = None
+    chunk_delay: float = 0.0
+    bytes_per_second: float | None = None
+    abort_after: int | None = None
+    fail: str | None = None
+    times: int | None = None
+
+    @property
+    def streamed(self) -> bool:
+        return (
+            self.chunk_size is not None
+            or self.bytes_per_second is not None
+            or self.abort_after is not None
+        )
+
+    def pieces(self) -> list[bytes]:
+        size = self.chunk_size or (1024 if self.bytes_per_second else len(self.body)) or 1
+        return [self.body[i:i + size] for i in range(0, len(self.body), size)] or [b""]
+
+    def pause_after(self, piece: bytes) -> float:
+        pause = self.chunk_delay
+        if self.bytes_per_second:
+            pause += len(piece) / self.bytes_per_second
+        return pause
+
+
+@dataclass
+class InterceptedRequest:
+    """Перехваченный запрос. Времена браузера — в секундах (Network.*.timestamp)."""
+
+    url: str
+    method: str
+    post_data: str | None
+    network_id: str | None
+    sent_at: float | None = None
+    response_at: float | None = None
+    finished_at: float | None = None
+    status: int | None = None
+    error: str | None = None
+    encoded_bytes: int = 0
+
+    @property
+    def path(self) -> str:
+        return urlparse(self.url).path
+
+    @property
+    def json(self):
+        return json.loads(self.post_data) if self.post_data else None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None or self.error is not None
+
+    @property
+    def ttfb(self) -> float | None:
+        """Секунды от отправки до заголовков ответа."""
+        if self.sent_at is None or self.response_at is None:
+            return None
+        return self.response_at - self.sent_at
+
+    @property
+    def duration(self) -> float | None:
+        """Секунды от отправки до конца тела (или ошибки)."""
+        if self.sent_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.sent_at
+
+
+class NetworkInterceptor:
+    """
+    Перехватывает запросы вкладки driver, подходящие под patterns (glob по URL).
+    Запросы без сценария уходят в сеть как обычно.
+    Используется как контекст-менеджер или через фикстуру network.
+    """
+
+    def __init__(self, driver, patterns: tuple[str, ...] = ("*/api/*",)):
+        self.patterns = patterns
+        self._routes: list[Route] = []
+        self._requests: list[InterceptedRequest] = []
+        self._by_network_id: dict[str, InterceptedRequest] = {}
+        self._sent_at: dict[str, float] = {}
+        self._streams: dict[str, Route] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._stream_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        self._session = CDPSession(driver)
+        self._session.on("Fetch.requestPaused", self._on_paused)
+        self._session.on("Network.requestWillBeSent", self._on_sent)
+        self._session.on("Network.responseReceived", self._on_response)
+        self._session.on("Network.loadingFinished", self._on_finished)
+        self._session.on("Network.loadingFailed", self._on_failed)
+        self._session.send("Network.enable")
+        self._session.send("Fetch.enable", {
+            "patterns": [{"urlPattern": p, "requestStage": "Request"} for p in patterns],
+        })
+
+        self._reader = threading.Thread(target=self._read_events, daemon=True)
+        self._reader.start()
+
+    def __enter__(self) -> "NetworkInterceptor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._reader.join(timeout=5)
+        try:
+            self._session.send("Fetch.disable")
+        except Exception:
+            pass  # вкладка уже закрыта
+        self._session.close()
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ─── Сценарии ───────────────────────────────────────────────
+
+    def respond(
+        self,
+        path: str,
+        json_body=None,
+        body: bytes | str = b"",
+        status: int = 200,
+        headers: dict[str, str] | None = None,
+        latency: float = 0.0,
+        chunk_size: int | None = None,
+        chunk_delay: float = 0.0,
+        bytes_per_second: float | None = None,
+        abort_after: int | None = None,
+        times: int | None = None,
+    ) -> Route:
+        """
+        Отвечает на запросы к path. json_body сериализуется в JSON.
+        chunk_size / chunk_delay / bytes_per_second отдают тело частями,
+        abort_after обрывает соединение после стольких байт тела.
+        times — сколько запросов обслужить (по умолчанию все).
+        Последний добавленный сценарий для пути главнее предыдущих.
+        """
+        headers = dict(headers or {})
+        if json_body is not None:
+            body = json.dumps(json_body)
+            headers.setdefault("Content-Type", "application/json")
+        route = Route(
+            path=path,
+            status=status,
+            body=body.encode() if isinstance(body, str) else body,
+            headers=headers,
+            latency=latency,
+            chunk_size=chunk_size,
+            chunk_delay=chunk_delay,
+            bytes_per_second=bytes_per_second,
+            abort_after=abort_after,
+            times=times,
+        )
+        with self._lock:
+            self._routes.append(route)
+        return route
+
+    def fail(self, path: str, reason: str = "ConnectionRefused", latency: float = 0.0,
+             times: int | None = None) -> Route:
+        """Запрос к path завершается сетевой ошибкой (Network.ErrorReason: Failed, TimedOut, ...)."""
+        route = Route(path=path, latency=latency, fail=reason, times=times)
+        with self._lock:
+            self._routes.append(route)
+        return route
+
+    def clear(self) -> None:
+        """Убирает все сценарии: дальше запросы идут в сеть."""
+        with self._lock:
+            self._routes.clear()
+
+    # ─── Журнал ────────────────────────────────────────────────
+
+    def requests(self, path: str | None = None) -> list[InterceptedRequest]:
+        with self._lock:
+            return [r for r in self._requests if path is None or r.path == path]
+
+    def wait_for(self, path: str, count: int = 1, timeout: float = 10) -> list[InterceptedRequest]:
+        """Ждёт, пока count запросов к path завершатся (ответом или ошибкой)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            done = [r for r in self.requests(path) if r.done]
+            if len(done) >= count:
+                return done
+            time.sleep(0.05)
+        raise TimeoutError(f"{path}: завершено {len(done)} из {count} запросов за {timeout} с")
+
+    # ─── События CDP ────────────────────────────────────────────
+
+    def _read_events(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._session.poll(0.1)
+            except Exception:
+                if not self._stopped.is_set():
+                    raise
+                return
+
+    def _matches(self, url: str) -> bool:
+        return any(fnmatch(url, pattern) for pattern in self.patterns)
+
+    def _take_route(self, path: str) -> Route | None:
+        with self._lock:
+            for route in reversed(self._routes):
+                if route.path != path:
+                    continue
+                if route.times is not None:
+                    route.times -= 1
+                    if route.times == 0:
+                        self._routes.remove(route)
+                return route
+        return None
+
+    def _on_sent(self, params: dict) -> None:
+        if self._matches(params["request"]["url"]):
+            with self._lock:
+                request = self._by_network_id.get(params["requestId"])
+                if request:
+                    request.sent_at = params["timestamp"]
+                else:
+                    self._sent_at[params["requestId"]] = params["timestamp"]
+
+    def _on_paused(self, params: dict) -> None:
+        network_id = params.get("networkId")
+        request = InterceptedRequest(
+            url=params["request"]["url"],
+            method=params["request"]["method"],
+            post_data=params["request"].get("postData"),
+            network_id=network_id,
+        )
+        with self._lock:
+            request.sent_at = self._sent_at.pop(network_id, None)
+            self._requests.append(request)
+            if network_id:
+                self._by_network_id[network_id] = request
+
+        request_id = params["requestId"]
+        route = self._take_route(request.path)
+        if route is None:
+            action = lambda: self._session.send("Fetch.continueRequest", {"requestId": request_id})
+        elif route.fail:
+            action = lambda: self._session.send(
+                "Fetch.failRequest", {"requestId": request_id, "errorReason": route.fail}
+            )
+        elif route.streamed:
+            token = uuid.uuid4().hex
+            with self._lock:
+                self._streams[token] = route
+            host, port = self._server.server_address[:2]
+            action = lambda: self._session.send("Fetch.continueRequest", {
+                "requestId": request_id,
+                "url": f"http://{host}:{port}/stream/{token}",
+            })
+        else:
+            action = lambda: self._session.send("Fetch.fulfillRequest", {
+                "requestId": request_id,
+                "responseCode": route.status,
+                "responseHeaders": [{"name": k, "value": v} for k, v in route.headers.items()],
+                "body": base64.b64encode(route.body).decode(),
+            })
+
+        def run():
+            try:
+                action()
+            except RuntimeError:
+                pass  # страница успела отменить запрос (перезагрузка, закрытие)
+
+        # Ответ не должен блокировать поток, читающий события CDP.
+        threading.Timer(route.latency if route else 0.0, run).start()
+
+    def _request_for(self, params: dict) -> InterceptedRequest | None:
+        with self._lock:
+            return self._by_network_id.get(params["requestId"])
+
+    def _on_response(self, params: dict) -> None:
+        request = self._request_for(params)
+        if request:
+            request.status = params["response"]["status"]
+            request.response_at = params["timestamp"]
+
+    def _on_finished(self, params: dict) -> None:
+        request = self._request_for(params)
+        if request:
+            request.encoded_bytes = int(params.get("encodedDataLength", 0))
+            request.finished_at = params["timestamp"]
+
+    def _on_failed(self, params: dict) -> None:
+        request = self._request_for(params)
+        if request:
+            request.error = params.get("errorText") or "failed"
+            request.finished_at = params["timestamp"]
+
+    # ─── Потоковые ответы ──────────────────────────────────────
+
+    def _stream_handler(self):
+        interceptor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _cors(self):
+                # Для сетевого стека браузера это уже другой origin.
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Access-Control-Allow-Headers", "*")
+                self.send_header("Access-Control-Allow-Methods", "*")
+
+            def do_OPTIONS(self):
+                self.send_response(204)
+                self._cors()
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                with interceptor._lock:
+                    route = interceptor._streams.pop(self.path.rsplit("/", 1)[-1], None)
+                if route is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(route.status)
+                for name, value in route.headers.items():
+                    self.send_header(name, value)
+                self._cors()
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.wfile.flush()
+
+                sent = 0
+                for piece in route.pieces():
+                    if route.abort_after is not None and sent + len(piece) > route.abort_after:
+                        partial = piece[:route.abort_after - sent]
+                        self.wfile.write(f"{len(piece):x}\r\n".encode() + partial)
+                        self.wfile.flush()
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        return
+                    self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+                    self.wfile.flush()
+                    sent += len(piece)
+                    time.sleep(route.pause_after(piece))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            do_POST = do_GET
+            do_PUT = do_GET
+
+        return Handler
@@ -0,0 +1,371 @@
+"""
+Офлайн-анализ размера и стоимости запроса /api/generate.
+
+Читает исходники, Node не нужен: SYSTEM_PROMPT из server/index.ts,
+ideaSettings и MAX_DETAILS_LENGTH из src/data/ideaOptions.ts, шаблоны из
+server/prompt.ts — и повторяет buildIdeaPrompt. Токены оцениваются
+приближённо (estimate_tokens): разбиение на слова/числа/знаки как у
+BPE-токенизаторов и средняя длина токена — без tiktoken и сети.
+
+Пространство комбинаций: каждая настройка либо не выбрана, либо равна одному
+из вариантов. Токены пользовательского промпта почти аддитивны по строкам,
+поэтому их распределение по всему пространству (~3·10^21 комбинаций) считается
+точно — свёрткой по настройкам. Полный запрос (системный промпт + настройки +
+дополнительные детали) оценивается выборкой.
+
+Запуск:
+  python tests/prompt_cost.py                  # отчёт
+  python tests/prompt_cost.py --check          # + сверка с prompt_budgets.json (код 1 при превышении)
+  python tests/prompt_cost.py --json           # отчёт в JSON
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BUDGETS_PATH = Path(__file__).resolve().parent / "prompt_budgets.json"
+
+# Цены Claude Sonnet 4, $ за миллион токенов (переопределяются флагами).
+INPUT_PRICE = 3.0
+OUTPUT_PRICE = 15.0
+# Типичный ответ — ~3000 токенов (usage.outputTokens); потолок FULL_MAX_TOKENS = 8192.
+OUTPUT_TOKENS = 3000
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Текст для моделирования «Additional Details» — в духе подсказки в textarea.
+DETAILS_SAMPLE = (
+    "This is a fanfiction based on the Naruto universe. I want the main character to be "
+    "a rogue ninja from the Hidden Mist Village who keeps a diary of every technique she "
+    "has stolen, and her younger brother should secretly work for the village she betrayed. "
+    "The story ends with a duel on a frozen lake, but nobody wins it. "
+)
+
+
+@dataclass
+class Setting:
+    id: str
+    label: str
+    options: list[str]
+
+
+@dataclass
+class Templates:
+    empty: str
+    header: str
+    details_header: str
+    footer: str
+    max_details: int
+
+
+# ─── Исходники ────────────────────────────────────────────────
+
+def _js_string(literal: str) -> str:
+    """Содержимое строкового литерала JS в одинарных кавычках."""
+    return json.loads('"' + literal.replace('"', '\\"').replace("\\'", "'") + '"')
+
+
+def load_settings() -> list[Setting]:
+    source = (PROJECT_ROOT / "src" / "data" / "ideaOptions.ts").read_text(encoding="utf-8")
+    blocks = re.finditer(
+        r"id: '([^']*)',\s*label: '((?:[^'\\]|\\.)*)',\s*options: \[(.*?)\]", source, re.DOTALL,
+    )
+    return [
+        Setting(
+            id=block[1],
+            label=_js_string(block[2]),
+            options=[_js_string(option) for option in re.findall(r"'((?:[^'\\]|\\.)*)'", block[3])],
+        )
+        for block in blocks
+    ]
+
+
+def load_system_prompt() -> str:
+    source = (PROJECT_ROOT / "server" / "index.ts").read_text(encoding="utf-8")
+    return re.search(r"const SYSTEM_PROMPT = `(.*?)`\n", source, re.DOTALL)[1]
+
+
+def load_templates() -> Templates:
+    source = (PROJECT_ROOT / "server" / "prompt.ts").read_text(encoding="utf-8")
+    options = (PROJECT_ROOT / "src" / "data" / "ideaOptions.ts").read_text(encoding="utf-8")
+
+    def constant(name: str) -> str:
+        return _js_string(re.search(rf"const {name} = '((?:[^'\\]|\\.)*)'", source)[1])
+
+    return Templates(
+        empty=constant("EMPTY_PROMPT"),
+        header=constant("PROMPT_HEADER"),
+        details_header=constant("DETAILS_HEADER"),
+        footer=constant("PROMPT_FOOTER"),
+        max_details=int(re.search(r"MAX_DETAILS_LENGTH = (\d+)", options)[1]),
+    )
+
+
+def build_prompt(templates: Templates, settings: list[Setting], selections: dict[str, str], details: str = "") -> str:
+    """Повторяет buildIdeaPrompt (server/prompt.ts) для уже нормализованного запроса."""
+    lines = [f"{s.label}: {selections[s.id]}" for s in settings if selections.get(s.id)]
+    details = details.strip()
+    if not lines and not details:
+        return templates.empty
+    prompt = templates.header
+    if lines:
+        prompt += "\n".join(lines) + "\n\n"
+    if details:
+        prompt += f"{templates.details_header}{details}\n\n"
+    return prompt + templates.footer
+
+
+# ─── Оценка токенов ───────────────────────────────────────────
+
+# Предразбиение как у BPE-токенизаторов GPT/Claude: слово с ведущим пробелом,
+# до трёх цифр, серия знаков, пробельные символы.
+_PIECES = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|_+|\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Приближённое число токенов. Латинское слово до 8 букв — один токен,
+    длиннее — токен на каждые ~6 букв, нелатинское — на каждые 2 символа,
+    знаки — по токену на 2 ASCII-символа или на каждый не-ASCII (═, □, —).
+    На английском тексте ошибка против настоящих токенизаторов ~±15%.
+    """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        word = piece.lstrip(" ")
+        if not word:
+            tokens += 1
+        elif word[0].isalpha():
+            if not word.isascii():
+                tokens += math.ceil(len(word) / 2)
+            else:
+                tokens += 1 if len(word) <= 8 else math.ceil(len(word) / 6)
+        elif word[0].isdigit() or word.isspace() or word[0] == "'":
+            tokens += 1
+        else:
+            ascii_marks = sum(char.isascii() for char in word)
+            tokens += math.ceil(ascii_marks / 2) + len(word) - ascii_marks
+    return tokens
+
+
+# ─── Анализ ───────────────────────────────────────────────────
+
+def _percentiles(counts: dict[int, int]) -> dict[str, int]:
+    """Процентили взвешенного распределения {значение: число комбинаций}."""
+    total = sum(counts.values())
+    result, seen = {}, 0
+    targets = iter(PERCENTILES)
+    target = next(targets)
+    for value in sorted(counts):
+        seen += counts[value]
+        while target is not None and seen * 100 >= total * target:
+            result[f"p{target}"] = value
+            target = next(targets, None)
+    result["max"] = max(counts)
+    return result
+
+
+def _sample_percentiles(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    result = {f"p{p}": ordered[min(len(ordered) - 1, math.ceil(len(ordered) * p / 100) - 1)] for p in PERCENTILES}
+    result["max"] = ordered[-1]
+    return result
+
+
+def selection_distribution(settings: list[Setting], templates: Templates) -> dict[int, int]:
+    """
+    Точное распределение токенов пользовательского промпта без деталей по
+    всем комбинациям: свёртка распределений «строка настройки или ничего».
+    """
+    distribution = Counter({0: 1})
+    for setting in settings:
+        line_tokens = Counter({0: 1})
+        for option in setting.options:
+            line_tokens[estimate_tokens(f"{setting.label}: {option}\n")] += 1
+        combined = Counter()
+        for total, ways in distribution.items():
+            for tokens, count in line_tokens.items():
+                combined[total + tokens] += ways * count
+        distribution = combined
+
+    # Постоянная часть: шапка + пустая строка + хвост; ни одной настройки — EMPTY_PROMPT.
+    frame = estimate_tokens(templates.header + "\n" + templates.footer)
+    result = Counter({total + frame: ways for total, ways in distribution.items() if total})
+    result[estimate_tokens(templates.empty)] += distribution[0]
+    return dict(result)
+
+
+def _details_text(chars: int) -> str:
+    text = DETAILS_SAMPLE * (chars // len(DETAILS_SAMPLE) + 1)
+    return text[:chars].strip()
+
+
+def _cost(input_tokens: float, output_tokens: float, input_price: float, output_price: float) -> float:
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def analyze(
+    samples: int = 20_000,
+    fill: float = 0.6,
+    details_share: float = 0.5,
+    seed: int = 7,
+    output_tokens: int = OUTPUT_TOKENS,
+    input_price: float = INPUT_PRICE,
+    output_price: float = OUTPUT_PRICE,
+) -> dict:
+    """
+    Отчёт о размере запроса. Выборка: каждая настройка выбрана с
+    вероятностью fill (вариант — равновероятно), доля details_share
+    запросов с деталями длиной 50…1000 символов (логравномерно).
+    """
+    settings = load_settings()
+    templates = load_templates()
+    system_prompt = load_system_prompt()
+    system_tokens = estimate_tokens(system_prompt)
+
+    space = math.prod(len(s.options) + 1 for s in settings)
+    user_distribution = selection_distribution(settings, templates)
+
+    rng = random.Random(seed)
+    user_tokens, request_tokens, costs = [], [], []
+    for _ in range(samples):
+        selections = {s.id: rng.choice(s.options) for s in settings if rng.random() < fill}
+        details = ""
+        if rng.random() < details_share:
+            details = _details_text(round(math.exp(rng.uniform(math.log(50), math.log(1000)))))
+        tokens = estimate_tokens(build_prompt(templates, settings, selections, details))
+        user_tokens.append(tokens)
+        request_tokens.append(system_tokens + tokens)
+        costs.append(_cost(system_tokens + tokens, output_tokens, input_price, output_price))
+
+    longest = {s.id: max(s.options, key=lambda o: estimate_tokens(f"{s.label}: {o}")) for s in settings}
+    worst_prompt = build_prompt(templates, settings, longest, _details_text(templates.max_details))
+    worst_tokens = system_tokens + estimate_tokens(worst_prompt)
+
+    # Крупнейшие вклады: блоки системного промпта (по заголовкам ═══ и
+    # абзацам с заглавным префиксом) и настройки (средняя строка).
+    blocks = re.split(r"\n(?=[A-Z][A-Z /&-]{3,}(?: —|:|\n))", system_prompt)
+    system_blocks = sorted(
+        ({"block": block.strip().splitlines()[0][:60], "tokens": estimate_tokens(block)} for block in blocks),
+        key=lambda b: b["tokens"], reverse=True,
+    )
+    setting_lines = sorted(
+        (
+            {
+                "setting": s.id,
+                "meanTokens": round(sum(estimate_tokens(f"{s.label}: {o}\n") for o in s.options) / len(s.options), 1),
+                "maxTokens": max(estimate_tokens(f"{s.label}: {o}\n") for o in s.options),
+            }
+            for s in settings
+        ),
+        key=lambda s: s["maxTokens"], reverse=True,
+    )
+
+    return {
+        "settings": len(settings),
+        "options": sum(len(s.options) for s in settings),
+        "combinations": f"{space:.3e}",
+        "systemPrompt": {"chars": len(system_prompt), "tokens": system_tokens},
+        "userPromptTokens": _percentiles(user_distribution),
+        "sample": {
+            "requests": samples,
+            "fill": fill,
+            "detailsShare": details_share,
+            "userPromptTokens": _sample_percentiles(user_tokens),
+            "requestTokens": _sample_percentiles(request_tokens),
+            "costUsd": {k: round(v, 5) for k, v in _sample_percentiles(costs).items()},
+        },
+        "detailsTokens": {
+            str(chars): estimate_tokens(templates.details_header + _details_text(chars) + "\n\n")
+            for chars in (100, 500, 1000, templates.max_details)
+        },
+        "worstCase": {
+            "requestTokens": worst_tokens,
+            "costUsd": round(_cost(worst_tokens, output_tokens, input_price, output_price), 5),
+        },
+        "systemShare": round(system_tokens / _sample_percentiles(request_tokens)["p50"], 3),
+        "topSystemBlocks": system_blocks[:5],
+        "topSettings": setting_lines[:5],
+        "assumptions": {
+            "outputTokens": output_tokens,
+            "inputPricePerMTok": input_price,
+            "outputPricePerMTok": output_price,
+        },
+    }
+
+
+def check_budgets(report: dict, budgets: dict) -> list[str]:
+    """Нарушения бюджетов prompt_budgets.json (пустой список — всё в пределах)."""
+    actual = {
+        "systemPromptTokens": report["systemPrompt"]["tokens"],
+        "userPromptTokensP99": report["userPromptTokens"]["p99"],
+        "requestTokensP95": report["sample"]["requestTokens"]["p95"],
+        "requestTokensMax": report["worstCase"]["requestTokens"],
+        "costUsdP95": report["sample"]["costUsd"]["p95"],
+    }
+    return [
+        f"{name}: {actual[name]} > {limit}"
+        for name, limit in budgets.items()
+        if not name.startswith("_") and actual[name] > limit
+    ]
+
+
+def _print_report(report: dict) -> None:
+    sample = report["sample"]
+    print(f"Настроек: {report['settings']}, вариантов: {report['options']}, комбинаций: {report['combinations']}")
+    print(f"SYSTEM_PROMPT: {report['systemPrompt']['chars']} символов ≈ {report['systemPrompt']['tokens']} токенов "
+          f"({report['systemShare']:.0%} медианного запроса)")
+    print(f"Пользовательский промпт, все комбинации (без деталей): {report['userPromptTokens']}")
+    print(f"Выборка {sample['requests']} запросов (fill={sample['fill']}, детали в {sample['detailsShare']:.0%}):")
+    print(f"  пользовательский промпт: {sample['userPromptTokens']}")
+    print(f"  весь запрос:             {sample['requestTokens']}")
+    print(f"  стоимость, $:            {sample['costUsd']}")
+    print(f"Дополнительные детали, токенов по длине в символах: {report['detailsTokens']}")
+    print(f"Худший случай (самые длинные варианты + максимум деталей): {report['worstCase']}")
+    print("Крупнейшие блоки SYSTEM_PROMPT:")
+    for block in report["topSystemBlocks"]:
+        print(f"  {block['tokens']:5d}  {block['block']}")
+    print("Самые длинные настройки (макс./средн. токенов строки):")
+    for setting in report["topSettings"]:
+        print(f"  {setting['maxTokens']:5d} / {setting['meanTokens']:4}  {setting['setting']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Размер и стоимость запроса /api/generate")
+    parser.add_argument("--samples", type=int, default=20_000, help="размер выборки запросов")
+    parser.add_argument("--fill", type=float, default=0.6, help="вероятность, что настройка выбрана")
+    parser.add_argument("--details-share", type=float, default=0.5, help="доля запросов с деталями")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output-tokens", type=int, default=OUTPUT_TOKENS, help="ожидаемый размер ответа")
+    parser.add_argument("--input-price", type=float, default=INPUT_PRICE, help="$ за 1M входных токенов")
+    parser.add_argument("--output-price", type=float, default=OUTPUT_PRICE, help="$ за 1M выходных токенов")
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    parser.add_argument("--check", action="store_true", help=f"сверить с {BUDGETS_PATH.name}")
+    args = parser.parse_args(argv)
+
+    report = analyze(
+        samples=args.samples, fill=args.fill, details_share=args.details_share, seed=args.seed,
+        output_tokens=args.output_tokens, input_price=args.input_price, output_price=args.output_price,
+    )
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_report(report)
+
+    if not args.check:
+        return 0
+    violations = check_budgets(report, json.loads(BUDGETS_PATH.read_text(encoding="utf-8")))
+    for violation in violations:
+        print(f"Бюджет превышен — {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
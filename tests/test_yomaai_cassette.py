@@ -0,0 +1,183 @@
+"""
+Автотесты YomaAI — запись и воспроизведение трафика провайдера (кассеты).
+
+Тест 14: Запись/воспроизведение на отдельном сервере (подменный провайдер)
+Тест 15: Полная генерация в браузере из закоммиченной кассеты (свой production-сервер)
+"""
+
+import json
+import time
+
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from fake_provider import epic_idea, sample_idea
+from helpers import PROJECT_ROOT, post_json, server_env, skip_dialog_via_storage
+
+
+# Закоммиченные кассеты; create-story — ответ FakeProvider(text=epic_idea())
+# на Create! с настройками по умолчанию.
+CASSETTES_DIR = PROJECT_ROOT / "tests" / "cassettes"
+STORY_CASSETTE = "create-story"
+
+RESULT_HEADING = (By.XPATH, "//h1[contains(text(), \"Yoma's Idea\")]")
+ERROR_BOX = (By.XPATH, "//div[contains(@class, 'border-red-300')]")
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _generate(server_url: str, prompt: str = "Genre: Mystery") -> tuple[int, dict, float]:
+    """POST /api/generate. Возвращает (status, body, секунды)."""
+    status, body, _, seconds = post_json(f"{server_url}/api/generate", {"prompt": prompt}, timeout=30)
+    return status, body, seconds
+
+
+def _put_cassette(server_url: str, name: str) -> tuple[int, dict]:
+    """PUT /api/cassette — переключает активную кассету."""
+    status, body, _, _ = post_json(f"{server_url}/api/cassette", {"name": name}, timeout=30, method="PUT")
+    return status, body
+
+
+def _cassette_env(
+    mode: str, cassette_dir, base_url: str, keys: str, name: str = "roundtrip", **extra: str,
+) -> dict[str, str]:
+    return server_env(
+        base_url, keys,
+        CassetteMode=mode,
+        CassetteDir=str(cassette_dir),
+        Cassette=name,
+        **extra,
+    )
+
+
+def _record(fake_provider, start_api_server, cassette_dir, latency: float = 0.0) -> dict:
+    """Записывает одну генерацию через подменного провайдера, возвращает ответ."""
+    provider = fake_provider({"key-record-1111": 100}, text=sample_idea(6), latency=latency)
+    recorder = start_api_server(_cassette_env("record", cassette_dir, provider.url, "key-record-1111"))
+    status, body, _ = _generate(recorder)
+    assert status == 200, f"Запись не удалась: {body}"
+    return body
+
+
+def _replay_server(start_api_server, cassette_dir, speed: str = "0") -> str:
+    """Сервер в режиме replay без ключей и с недоступным провайдером."""
+    return start_api_server(_cassette_env(
+        "replay", cassette_dir, "http://127.0.0.1:9", "", CassetteSpeed=speed,
+    ))
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 14: Запись и воспроизведение
+# ─────────────────────────────────────────────────────────────
+class TestCassetteRecordReplay:
+    """Записываем ответ подменного провайдера и воспроизводим его без сети."""
+
+    def test_replay_returns_recorded_response(self, fake_provider, start_api_server, tmp_path):
+        """Ответ из кассеты совпадает с записанным, провайдер не нужен."""
+        recorded = _record(fake_provider, start_api_server, tmp_path)
+
+        cassette = json.loads((tmp_path / "roundtrip.json").read_text())
+        assert len(cassette["interactions"]) == 1
+        assert "key-record-1111" not in json.dumps(cassette), "Ключ API попал в кассету"
+
+        replayer = _replay_server(start_api_server, tmp_path)
+        status, replayed, _ = _generate(replayer)
+
+        assert status == 200, f"Воспроизведение не удалось: {replayed}"
+        assert replayed["result"] == recorded["result"]
+        assert len(replayed["sections"]) == len(recorded["sections"])
+
+    def test_replay_preserves_timing(self, fake_provider, start_api_server, tmp_path):
+        """
+        CassetteSpeed=1 воспроизводит исходную задержку провайдера,
+        CassetteSpeed=0 отвечает мгновенно.
+        """
+        _record(fake_provider, start_api_server, tmp_path, latency=0.8)
+
+        _, _, original_pace = _generate(_replay_server(start_api_server, tmp_path, speed="1"))
+        _, _, instant = _generate(_replay_server(start_api_server, tmp_path, speed="0"))
+
+        assert original_pace >= 0.7, f"Задержка не воспроизведена: {original_pace:.2f}s"
+        assert instant < 0.5, f"Мгновенное воспроизведение заняло {instant:.2f}s"
+
+    def test_replay_miss_is_reported(self, fake_provider, start_api_server, tmp_path):
+        """Запрос, которого нет в кассете, получает понятную ошибку, а не сетевой вызов."""
+        _record(fake_provider, start_api_server, tmp_path)
+        replayer = _replay_server(start_api_server, tmp_path)
+
+        status, body, _ = _generate(replayer, prompt="Genre: Horror")
+
+        assert status == 500
+        assert "No recorded interaction" in body["error"]
+
+    def test_switch_cassette_at_runtime(self, fake_provider, start_api_server, tmp_path):
+        """PUT /api/cassette переключает кассету без перезапуска сервера."""
+        _record(fake_provider, start_api_server, tmp_path)
+        replayer = _replay_server(start_api_server, tmp_path)
+
+        status, state = _put_cassette(replayer, "empty")
+        assert status == 200
+        assert state == {"mode": "replay", "name": "empty", "speed": 0, "size": 0}
+        assert _generate(replayer)[0] == 500, "Пустая кассета не должна ничего воспроизводить"
+
+        status, state = _put_cassette(replayer, "roundtrip")
+        assert state["size"] == 1
+        assert _generate(replayer)[0] == 200
+
+        status, _ = _put_cassette(replayer, "../etc")
+        assert status == 400, "Имя кассеты с путём должно отклоняться"
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 15: Генерация в браузере из кассеты
+# ─────────────────────────────────────────────────────────────
+class TestCassetteGeneration:
+    """
+    Полный сценарий Create! на собственном production-сервере в режиме
+    replay с закоммиченной кассетой tests/cassettes/create-story.json.
+    Ни ключа, ни провайдера не нужно, нужен только собранный dist/.
+    После правок SYSTEM_PROMPT или сборки промпта запрос к провайдеру
+    меняется и кассету нужно перезаписать (через FakeProvider):
+      pytest tests/ -k test_create_story_from_cassette --record-cassettes --full-run
+    """
+
+    @pytest.mark.depends_on(f"tests/cassettes/{STORY_CASSETTE}.json")
+    def test_create_story_from_cassette(self, driver, fake_provider, start_api_server, request, record_property):
+        """Реалистичный ответ из кассеты рендерится за секунды вместо минут."""
+        if not (PROJECT_ROOT / "dist" / "index.html").exists():
+            pytest.skip("Нет dist/ — выполните npm run build")
+
+        if request.config.getoption("--record-cassettes"):
+            provider = fake_provider({"key-record-1111": 100}, text=epic_idea())
+            env = _cassette_env("record", CASSETTES_DIR, provider.url, "key-record-1111", name=STORY_CASSETTE)
+        else:
+            env = _cassette_env(
+                "replay", CASSETTES_DIR, "http://127.0.0.1:9", "", name=STORY_CASSETTE, CassetteSpeed="0",
+            )
+        server = start_api_server({**env, "NODE_ENV": "production"})
+
+        skip_dialog_via_storage(driver, server)
+        started = time.perf_counter()
+        driver.find_element(By.XPATH, "//button[contains(@class, 'rainbow-btn')]").click()
+
+        WebDriverWait(driver, 15).until(
+            EC.any_of(EC.presence_of_element_located(RESULT_HEADING), EC.presence_of_element_located(ERROR_BOX))
+        )
+        elapsed = time.perf_counter() - started
+        errors = driver.find_elements(*ERROR_BOX)
+        assert not errors, (
+            f"Генерация из кассеты не удалась: {errors[0].text} — перезапишите кассету с --record-cassettes"
+        )
+        result_text = driver.find_element(
+            By.XPATH, "//div[contains(@class, 'prose-yoma')]"
+        ).text
+
+        record_property("cassette_generation_seconds", round(elapsed, 2))
+        record_property("cassette_result_chars", len(result_text))
+
+        assert len(result_text) > 1000, (
+            f"Ответ из кассеты слишком короткий для реальной генерации: {len(result_text)}"
+        )
+        assert elapsed < 10, f"Воспроизведение заняло {elapsed:.1f}s"
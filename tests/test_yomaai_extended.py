@@ -14,83 +14,46 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from helpers import MOCK_RESULT, skip_dialog_via_storage
 
-# ─── Хелперы ──────────────────────────────────────────────────
-
-def _skip_dialog_via_storage(driver, base_url: str) -> None:
-    """Устанавливает skip-dialog в localStorage и переходит на /create."""
-    driver.get(base_url)
-    driver.execute_script("localStorage.setItem('yoma-skip-dialog', 'true');")
-    driver.get(f"{base_url}/create")
-    WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located(
-            (By.XPATH, "//h1[contains(text(), 'Craft Your Idea')]")
-        )
-    )
 
+# ─── Хелперы ──────────────────────────────────────────────────
 
-def _mock_fetch_success(driver) -> None:
+def _mock_generate_success(network) -> None:
     """
-    Подменяет window.fetch так, чтобы POST /api/generate
-    мгновенно возвращал фейковый успешный ответ.
-    Остальные запросы идут через оригинальный fetch.
+    POST /api/generate мгновенно возвращает фейковый успешный ответ.
+    Перехват на уровне браузера (фикстура network), остальные запросы идут в сеть.
     """
-    driver.execute_script("""
-        window.__originalFetch = window.fetch;
-        window.fetch = function(url, opts) {
-            if (url === '/api/generate' && opts && opts.method === 'POST') {
-                return Promise.resolve(new Response(
-                    JSON.stringify({ result: '## Test Idea\\n\\nThis is a **mock AI response** for automated testing. It contains enough text to pass the length check and verifies that the result phase renders correctly with markdown content.' }),
-                    { status: 200, headers: { 'Content-Type': 'application/json' } }
-                ));
-            }
-            return window.__originalFetch(url, opts);
-        };
-    """)
-
-
-def _mock_fetch_api_error(driver) -> None:
+    network.respond("/api/generate", json_body=MOCK_RESULT)
+
+
+def _mock_generate_api_error(network) -> None:
     """
-    Подменяет fetch: POST /api/generate возвращает 500 с ошибкой.
+    POST /api/generate возвращает 500 с ошибкой.
     Имитирует ситуацию, когда API ключ невалиден / отсутствует.
     """
-    driver.execute_script("""
-        window.__originalFetch = window.fetch;
-        window.fetch = function(url, opts) {
-            if (url === '/api/generate' && opts && opts.method === 'POST') {
-                return Promise.resolve(new Response(
-                    JSON.stringify({ error: 'API key for Claude is not configured' }),
-                    { status: 500, headers: { 'Content-Type': 'application/json' } }
-                ));
-            }
-            return window.__originalFetch(url, opts);
-        };
-    """)
-
-
-def _mock_fetch_network_error(driver) -> None:
+    network.respond(
+        "/api/generate",
+        status=500,
+        json_body={"error": "API key for Claude is not configured"},
+    )
+
+
+def _mock_generate_network_error(network) -> None:
     """
-    Подменяет fetch: POST /api/generate выбрасывает TypeError (network error).
+    POST /api/generate падает с сетевой ошибкой (соединение отклонено).
     Имитирует ситуацию, когда backend вообще не запущен.
     """
-    driver.execute_script("""
-        window.__originalFetch = window.fetch;
-        window.fetch = function(url, opts) {
-            if (url === '/api/generate' && opts && opts.method === 'POST') {
-                return Promise.reject(new TypeError('Failed to fetch'));
-            }
-            return window.__originalFetch(url, opts);
-        };
-    """)
-
-
-def _generate_with_mock(driver, base_url: str) -> None:
+    network.fail("/api/generate", "ConnectionRefused")
+
+
+def _generate_with_mock(driver, network, base_url: str) -> None:
     """
-    Полный цикл: skip dialog → mock fetch → нажать Create! → дождаться результата.
+    Полный цикл: mock /api/generate → skip dialog → нажать Create! → дождаться результата.
     После вызова драйвер находится на фазе result.
     """
-    _skip_dialog_via_storage(driver, base_url)
-    _mock_fetch_success(driver)
+    _mock_generate_success(network)
+    skip_dialog_via_storage(driver, base_url)
 
     create_btn = driver.find_element(
         By.XPATH, "//button[contains(@class, 'rainbow-btn')]"
@@ -323,16 +286,16 @@ class TestLocalStorage:
 class TestErrorHandling:
     """
     Проверяем отображение ошибок при проблемах с backend/API.
-    Используем подмену window.fetch для имитации ошибок.
+    Ошибки имитируются перехватом /api/generate (фикстура network).
     """
 
-    def test_api_error_shows_red_message(self, driver, base_url):
+    def test_api_error_shows_red_message(self, driver, network, base_url):
         """
         Если backend возвращает ошибку (нет API ключа, 500),
         на странице появляется красное сообщение (div с border-red-300).
         """
-        _skip_dialog_via_storage(driver, base_url)
-        _mock_fetch_api_error(driver)
+        _mock_generate_api_error(network)
+        skip_dialog_via_storage(driver, base_url)
 
         # Нажимаем Create!
         create_btn = driver.find_element(
@@ -354,13 +317,13 @@ class TestErrorHandling:
             f"Текст ошибки не содержит информацию об API ключе: '{error_text}'"
         )
 
-    def test_network_error_shows_failed_message(self, driver, base_url):
+    def test_network_error_shows_failed_message(self, driver, network, base_url):
         """
         Если backend недоступен (fetch выбрасывает ошибку),
         появляется сообщение 'Failed to connect to the server'.
         """
-        _skip_dialog_via_storage(driver, base_url)
-        _mock_fetch_network_error(driver)
+        _mock_generate_network_error(network)
+        skip_dialog_via_storage(driver, base_url)
 
         # Нажимаем Create!
         create_btn = driver.find_element(
@@ -388,15 +351,15 @@ class TestErrorHandling:
 class TestResultButtons:
     """
     Проверяем кнопки 'Create Another Idea' и 'Regenerate'
-    на странице результата. Используем mock fetch для скорости.
+    на странице результата. /api/generate перехватывается для скорости.
     """
 
-    def test_create_another_idea_resets_to_settings(self, driver, base_url):
+    def test_create_another_idea_resets_to_settings(self, driver, network, base_url):
         """
         Кнопка 'Create Another Idea' сбрасывает результат
         и возвращает к пустым настройкам.
         """
-        _generate_with_mock(driver, base_url)
+        _generate_with_mock(driver, network, base_url)
 
         # Нажимаем "Create Another Idea"
         another_btn = driver.find_element(
@@ -428,12 +391,12 @@ class TestResultButtons:
             "Textarea 'Additional Details' не сброшен"
         )
 
-    def test_regenerate_produces_new_result(self, driver, base_url):
+    def test_regenerate_produces_new_result(self, driver, network, base_url):
         """
         Кнопка 'Regenerate' повторно генерирует идею —
         показывается загрузка, потом новый результат.
         """
-        _generate_with_mock(driver, base_url)
+        _generate_with_mock(driver, network, base_url)
 
         # Запоминаем текущий результат
         result_container = driver.find_element(
@@ -442,24 +405,16 @@ class TestResultButtons:
         first_result = result_container.text.strip()
         assert len(first_result) > 0, "Первый результат пустой"
 
-        # Мокаем fetch с небольшой задержкой, чтобы фаза загрузки
+        # Следующий ответ — с задержкой, чтобы фаза загрузки
         # успела отрисоваться и Selenium мог её поймать
-        driver.execute_script("""
-            window.__originalFetch = window.__originalFetch || window.fetch;
-            window.fetch = function(url, opts) {
-                if (url === '/api/generate' && opts && opts.method === 'POST') {
-                    return new Promise(resolve => {
-                        setTimeout(() => {
-                            resolve(new Response(
-                                JSON.stringify({ result: '## Regenerated Idea\\n\\nThis is a **regenerated mock response** with different content to verify that the Regenerate button triggers a new generation cycle successfully.' }),
-                                { status: 200, headers: { 'Content-Type': 'application/json' } }
-                            ));
-                        }, 500);
-                    });
-                }
-                return window.__originalFetch(url, opts);
-            };
-        """)
+        network.respond(
+            "/api/generate",
+            json_body={"result": (
+                "## Regenerated Idea\n\nThis is a **regenerated mock response** with different "
+                "content to verify that the Regenerate button triggers a new generation cycle successfully."
+            )},
+            latency=0.5,
+        )
 
         # Нажимаем "Regenerate"
         regen_btn = driver.find_element(
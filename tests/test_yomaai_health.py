@@ -0,0 +1,174 @@
+"""
+Автотесты YomaAI — пробы живости и готовности сервера.
+
+Тест 23: /healthz, /readyz (конфигурация, провайдер, запас лимитов), прогрев
+
+Каждый тест поднимает подменного провайдера (fake_provider.py) и отдельный
+Express-сервер, направленный на него через ClaudeBaseURL. Браузер не нужен.
+"""
+
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+
+from helpers import post_json, server_env
+
+
+KEY = "key-alpha-1111"
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _get(server_url: str, path: str) -> tuple[int, dict, dict]:
+    """GET пробы. Возвращает (status, body, headers)."""
+    try:
+        with urllib.request.urlopen(f"{server_url}{path}", timeout=30) as response:
+            return response.status, json.loads(response.read()), dict(response.headers)
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read()), dict(error.headers)
+
+
+def _generate(server_url: str) -> int:
+    return post_json(f"{server_url}/api/generate", {"prompt": "Genre: Mystery"}, timeout=30)[0]
+
+
+def _closed_port_url() -> str:
+    """URL, на котором никто не слушает."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 23: Пробы живости и готовности
+# ─────────────────────────────────────────────────────────────
+class TestHealthEndpoints:
+    """/healthz отвечает всегда, /readyz — только когда генерация пройдёт."""
+
+    def test_ready_with_working_provider(self, fake_provider, start_api_server):
+        """Ключ настроен, провайдер принимает его, лимиты есть — 200 и все проверки ok."""
+        provider = fake_provider({KEY: 100})
+        server = start_api_server(server_env(provider.url, KEY), ready=True)
+
+        status, body, headers = _get(server, "/readyz")
+
+        assert status == 200, body
+        assert body["ready"] is True
+        assert all(check["ok"] for check in body["checks"].values()), body
+        assert body["checks"]["upstream"]["latencyMs"] >= 0
+        assert headers["Cache-Control"] == "no-store"
+        assert not provider.requests_by_key, "Проба не должна тратить лимит генераций"
+
+    def test_missing_key_not_ready(self, start_api_server):
+        """Без ключа процесс жив, но не готов; провайдер не опрашивается."""
+        server = start_api_server(server_env(_closed_port_url(), ""))
+
+        status, health, _ = _get(server, "/healthz")
+        assert status == 200
+        assert health["status"] == "ok"
+
+        status, body, _ = _get(server, "/readyz")
+        assert status == 503
+        assert not body["checks"]["config"]["ok"]
+        assert "not configured" in body["checks"]["config"]["detail"]
+        assert body["checks"]["upstream"]["detail"].startswith("skipped")
+
+    def test_unreachable_provider_not_ready(self, start_api_server):
+        """Провайдер недоступен — 503 с причиной в upstream."""
+        server = start_api_server(server_env(_closed_port_url(), KEY))
+
+        status, body, _ = _get(server, "/readyz")
+
+        assert status == 503
+        assert body["checks"]["config"]["ok"]
+        assert not body["checks"]["upstream"]["ok"]
+
+    def test_rejected_keys(self, fake_provider, start_api_server):
+        """Отозванный ключ не мешает, пока другой принят; все отозваны — 503."""
+        provider = fake_provider({"key-bad-0000": 100, KEY: 100}, unauthorized=("key-bad-0000",))
+
+        mixed = start_api_server(server_env(provider.url, f"key-bad-0000,{KEY}"))
+        status, body, _ = _get(mixed, "/readyz")
+        assert status == 200, body
+
+        revoked = start_api_server(server_env(provider.url, "key-bad-0000"))
+        status, body, _ = _get(revoked, "/readyz")
+        assert status == 503
+        assert "rejected key-1" in body["checks"]["upstream"]["detail"]
+
+    def test_upstream_check_cached(self, fake_provider, start_api_server):
+        """Частые пробы балансировщика не превращаются в запросы к провайдеру."""
+        provider = fake_provider({KEY: 100})
+        server = start_api_server(server_env(provider.url, KEY))
+
+        for _ in range(5):
+            status, body, _ = _get(server, "/readyz")
+            assert status == 200, body
+
+        assert provider.probes == 1
+
+    def test_no_headroom_not_ready(self, fake_provider, start_api_server):
+        """Единственный ключ исчерпал минутный лимит — сервер снимается с балансировки."""
+        provider = fake_provider({KEY: 100}, send_rate_limit_headers=False)
+        server = start_api_server(server_env(provider.url, KEY, ClaudeRPM="1"), ready=True)
+
+        assert _generate(server) == 200
+        status, body, _ = _get(server, "/readyz")
+
+        assert status == 503
+        assert body["checks"]["upstream"]["ok"]
+        assert not body["checks"]["admission"]["ok"]
+        assert "retry in" in body["checks"]["admission"]["detail"]
+
+    def test_warmup_probes_at_startup(self, fake_provider, start_api_server):
+        """YomaWarmup=1 — сервер сам проверяет провайдера при старте, до первой пробы."""
+        provider = fake_provider({KEY: 100})
+        start_api_server(server_env(provider.url, KEY, YomaWarmup="1"))
+
+        deadline = time.monotonic() + 10
+        while provider.probes == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        assert provider.probes == 1
+
+    def test_probe_status_must_be_ok(self, fake_provider, start_api_server):
+        """Ответ провайдера вне 2xx (например, 404 от чужого BaseURL) — не готов, статус в причине."""
+        provider = fake_provider({KEY: 100}, probe_status=404)
+        server = start_api_server(server_env(provider.url, KEY))
+
+        status, body, _ = _get(server, "/readyz")
+
+        assert status == 503
+        assert not body["checks"]["upstream"]["ok"]
+        assert "404" in body["checks"]["upstream"]["detail"]
+
+    def test_rate_limited_probe_not_admissible(self, fake_provider, start_api_server):
+        """429 на пробу: провайдер доступен, но ключ выведен из ротации — 503 по admission."""
+        provider = fake_provider({KEY: 100}, probe_status=429)
+        server = start_api_server(server_env(provider.url, KEY))
+
+        status, body, _ = _get(server, "/readyz")
+
+        assert status == 503
+        assert body["checks"]["upstream"]["ok"]
+        assert "rate limited" in body["checks"]["upstream"]["detail"]
+        assert not body["checks"]["admission"]["ok"]
+
+    def test_warmup_blocks_readiness(self, fake_provider, start_api_server):
+        """Пока прогрев не прошёл, /readyz отвечает 503 «warming up»; после — 200."""
+        provider = fake_provider({KEY: 100}, probe_status=503)
+        server = start_api_server(server_env(provider.url, KEY, YomaWarmup="1"))
+
+        status, body, _ = _get(server, "/readyz")
+        assert status == 503
+        assert body["checks"]["upstream"]["detail"].startswith("warming up")
+
+        provider.probe_status = None
+        deadline = time.monotonic() + 10
+        while (status := _get(server, "/readyz")[0]) != 200 and time.monotonic() < deadline:
+            time.sleep(0.2)
+        assert status == 200
+        assert provider.probes >= 2
@@ -0,0 +1,151 @@
+"""
+Автотесты YomaAI — выбор тестов по изменённым файлам (impact.py).
+
+Тест 25: Покрытие модулей, cached pass, сброс кеша при правке файлов вне карты
+
+Плагин проверяется напрямую: кеш pytest и тесты подменены простыми
+объектами, хеши файлов задаются в plugin.hashes. Браузер и сервер не нужны.
+"""
+
+from pathlib import Path
+
+from impact import (
+    CACHE_KEY, CACHED_REASON, UNMAPPED_KEY, ImpactPlugin, _covered_files, _Record, _source_files,
+)
+
+
+DEV = "http://localhost:5173"
+NODE_ID = "tests/test_yomaai.py::TestSiteLoads::test_page_title"
+DEPENDENCY = "src/components/TypewriterDialog.tsx"
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+class _Cache(dict):
+    """config.cache: get(key, default) / set(key, value)."""
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class _Config:
+    def __init__(self, cache: _Cache, full_run: bool = False):
+        self.cache = cache
+        self.full_run = full_run
+
+    def getoption(self, name):
+        assert name == "--full-run"
+        return self.full_run
+
+
+class _Item:
+    """Минимум pytest.Item, который читает плагин."""
+
+    def __init__(self, nodeid: str = NODE_ID, keywords=(), fixturenames=()):
+        self.nodeid = nodeid
+        self.keywords = dict.fromkeys(keywords, True)
+        self.fixturenames = list(fixturenames)
+        self.path = Path(__file__).resolve().parent / nodeid.split("::")[0].removeprefix("tests/")
+        self.markers = []
+
+    def add_marker(self, marker):
+        self.markers.append(marker)
+
+    def iter_markers(self, name):
+        return iter(())
+
+
+def _script(path: str, *functions: tuple[str, int]) -> dict:
+    """Запись Profiler.takePreciseCoverage: корень модуля и функции (имя, число вызовов)."""
+    return {
+        "url": f"{DEV}{path}",
+        "functions": [
+            {"functionName": name, "ranges": [{"startOffset": 0, "endOffset": 1, "count": count}]}
+            for name, count in (("", 1), *functions)
+        ],
+    }
+
+
+def _plugin(entries: dict, unmapped: dict | None = None, full_run: bool = False) -> ImpactPlugin:
+    cache = _Cache({CACHE_KEY: entries})
+    if unmapped is not None:
+        cache[UNMAPPED_KEY] = unmapped
+    return ImpactPlugin(_Config(cache, full_run))
+
+
+def _skipped(plugin: ImpactPlugin, *items: _Item) -> list[bool]:
+    plugin.pytest_collection_modifyitems(None, list(items))
+    return [any(marker.kwargs.get("reason") == CACHED_REASON for marker in item.markers) for item in items]
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 25: Выбор тестов по изменённым файлам
+# ─────────────────────────────────────────────────────────────
+class TestImpactSelection:
+    """Зависимости из покрытия и решение «cached pass / выполнить»."""
+
+    def test_loaded_module_counts_without_calls(self):
+        """Модуль, который загрузился, но ни одна его функция не вызывалась, — зависимость."""
+        script = _script(f"/{DEPENDENCY}?t=1700000000", ("TypewriterDialog", 0), ("$RefreshReg$", 1))
+        assert _covered_files(script) == {DEPENDENCY}
+
+    def test_bundle_and_foreign_scripts(self):
+        """Бандл production — весь фронтенд; deps Vite и несуществующие файлы — ничего."""
+        bundle = _covered_files(_script("/assets/index-3f2a.js"))
+        assert {DEPENDENCY, "index.html", "vite.config.ts"} <= bundle
+        assert _covered_files(_script("/node_modules/.vite/deps/react.js")) == set()
+        assert _covered_files(_script("/@vite/client")) == set()
+        assert _covered_files(_script("/src/missing.tsx")) == set()
+
+    def test_unchanged_dependencies_cached(self):
+        """Совпали все хеши — тест пропускается; изменился один — выполняется."""
+        plugin = _plugin({NODE_ID: {"files": {DEPENDENCY: "old"}, "duration": 1.0}}, unmapped={})
+        plugin.hashes[DEPENDENCY] = "old"
+        assert _skipped(plugin, _Item()) == [True]
+
+        plugin = _plugin({NODE_ID: {"files": {DEPENDENCY: "old"}, "duration": 1.0}}, unmapped={})
+        plugin.hashes[DEPENDENCY] = "new"
+        assert _skipped(plugin, _Item()) == [False]
+
+    def test_unmapped_change_runs_everything(self):
+        """Правка файла src/, не попавшего в покрытие, сбрасывает кеш всех тестов."""
+        entries = {NODE_ID: {"files": {DEPENDENCY: "same"}, "duration": 1.0}}
+        plugin = _plugin(entries, unmapped={"src/App.tsx": "old"})
+        plugin.hashes.update({DEPENDENCY: "same", "src/App.tsx": "new"})
+
+        assert _skipped(plugin, _Item()) == [False]
+        assert plugin.invalidated == ["src/App.tsx"]
+
+        # Без карты с прошлого прогона кешу тоже нельзя верить.
+        plugin = _plugin(entries)
+        plugin.hashes[DEPENDENCY] = "same"
+        assert _skipped(plugin, _Item()) == [False]
+
+    def test_build_files_are_shared(self):
+        """index.html, vite.config.ts и package.json — зависимости любого теста, даже без браузера."""
+        files = ImpactPlugin._dependencies(_Record(_Item("tests/test_yomaai_prompt.py::TestPromptBudget::x")))
+        assert {"index.html", "vite.config.ts", "package.json", "tests/conftest.py"} <= files
+        assert "tests/test_yomaai_prompt.py" in files
+
+    def test_session_records_coverage_map(self):
+        """После прогона в кеше — хеши файлов src/ вне покрытия; непрошедшие выбывают при сбросе."""
+        entries = {
+            NODE_ID: {"files": {}, "covered": ["src/App.tsx"], "duration": 1.0},
+            "tests/test_yomaai.py::TestSiteLoads::stale": {"files": {}, "covered": [DEPENDENCY], "duration": 1.0},
+        }
+        plugin = _plugin(entries, unmapped={"src/main.tsx": "old"})
+        plugin.recorded.add(NODE_ID)
+        _skipped(plugin, _Item())
+
+        plugin.pytest_sessionfinish(None)
+
+        assert list(plugin.cache[CACHE_KEY]) == [NODE_ID]
+        unmapped = plugin.cache[UNMAPPED_KEY]
+        assert "src/App.tsx" not in unmapped
+        assert unmapped.keys() == _source_files("src") - {"src/App.tsx"}
+        assert all(digest == plugin.hashes[path] for path, digest in unmapped.items())
+
+    def test_soak_never_cached(self):
+        """Soak-тест выполняется всегда, даже если хеши совпали."""
+        plugin = _plugin({"tests/test_yomaai_soak.py::x": {"files": {}, "duration": 1.0}}, unmapped={})
+        assert _skipped(plugin, _Item("tests/test_yomaai_soak.py::x", keywords=["soak"])) == [False]
@@ -0,0 +1,142 @@
+"""
+Автотесты YomaAI — пул API ключей с лимитами на ключ.
+
+Тест 13: Распределение запросов, вывод ключей из ротации, заголовки rate limit
+
+Каждый тест поднимает подменного провайдера (fake_provider.py) и отдельный
+Express-сервер, направленный на него через ClaudeBaseURL. Браузер не нужен.
+"""
+
+import json
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import post_json, server_env
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _generate(server_url: str) -> tuple[int, dict, dict]:
+    """POST /api/generate. Возвращает (status, body, headers)."""
+    status, body, headers, _ = post_json(f"{server_url}/api/generate", {"prompt": "Genre: Mystery"}, timeout=30)
+    return status, body, headers
+
+
+def _keys(server_url: str) -> dict:
+    """GET /api/keys — утилизация ключей, по id (key-1, key-2, ...)."""
+    with urllib.request.urlopen(f"{server_url}/api/keys", timeout=5) as response:
+        return {key["id"]: key for key in json.loads(response.read())["keys"]}
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 13: Пул ключей
+# ─────────────────────────────────────────────────────────────
+class TestKeyPool:
+    """Проверяем выбор ключа по запасу лимита и вывод ключей из ротации."""
+
+    def test_requests_spread_across_keys(self, fake_provider, start_api_server):
+        """Запросы распределяются между ключами, а не упираются в один."""
+        provider = fake_provider({"key-alpha-1111": 100, "key-bravo-2222": 100})
+        server = start_api_server(server_env(provider.url, "key-alpha-1111,key-bravo-2222"))
+
+        for _ in range(6):
+            status, body, _ = _generate(server)
+            assert status == 200, f"Генерация упала: {body}"
+
+        assert provider.requests_by_key["key-alpha-1111"] >= 2
+        assert provider.requests_by_key["key-bravo-2222"] >= 2
+
+        keys = _keys(server)
+        assert keys["key-1"]["stats"]["requests"] + keys["key-2"]["stats"]["requests"] == 6
+        assert keys["key-1"]["hint"] == "…1111", "Ключ должен показываться только маской"
+
+    def test_unauthorized_key_removed_from_rotation(self, fake_provider, start_api_server):
+        """Ключ с ответом 401 выводится из ротации, запрос уходит на другой ключ."""
+        provider = fake_provider(
+            {"key-revoked-0000": 100, "key-good-1111": 100},
+            unauthorized=("key-revoked-0000",),
+        )
+        server = start_api_server(server_env(provider.url, "key-revoked-0000,key-good-1111"))
+
+        for _ in range(4):
+            status, body, _ = _generate(server)
+            assert status == 200, f"Генерация упала: {body}"
+
+        revoked = _keys(server)["key-1"]
+        assert not revoked["active"]
+        assert revoked["disabledReason"] == "unauthorized"
+        assert revoked["stats"]["unauthorized"] == 1, "Отозванный ключ пробовали повторно"
+
+    def test_rate_limited_key_rotates_out(self, fake_provider, start_api_server):
+        """
+        Провайдер отвечает 429 (лимит выше настроенного не известен серверу) —
+        ключ уходит на cooldown, а запрос повторяется на другом ключе.
+        """
+        provider = fake_provider(
+            {"key-small-1111": 1, "key-large-2222": 100},
+            send_rate_limit_headers=False,
+        )
+        server = start_api_server(
+            server_env(provider.url, "key-small-1111,key-large-2222", ClaudeRPM="100")
+        )
+
+        for _ in range(5):
+            status, body, _ = _generate(server)
+            assert status == 200, f"Генерация упала: {body}"
+
+        small = _keys(server)["key-1"]
+        assert provider.rejected_by_key["key-small-1111"] == 1, "Ключ на cooldown не должен пробоваться"
+        assert not small["active"]
+        assert small["disabledReason"] == "rate limited"
+        assert small["disabledForMs"] > 0
+
+    def test_rate_limit_headers_refill_buckets(self, fake_provider, start_api_server):
+        """Лимиты ключа берутся из заголовков anthropic-ratelimit-* провайдера."""
+        provider = fake_provider({"key-alpha-1111": 7})
+        server = start_api_server(server_env(provider.url, "key-alpha-1111", ClaudeRPM="50"))
+
+        status, _, _ = _generate(server)
+        assert status == 200
+
+        key = _keys(server)["key-1"]
+        assert key["requests"]["limit"] == 7, f"Лимит не синхронизирован: {key['requests']}"
+        assert key["requests"]["available"] <= 6
+
+    def test_exhausted_pool_returns_retry_after(self, fake_provider, start_api_server):
+        """Когда у всех ключей кончился лимит — 429 с Retry-After, без запроса к провайдеру."""
+        provider = fake_provider({"key-alpha-1111": 100}, send_rate_limit_headers=False)
+        server = start_api_server(server_env(provider.url, "key-alpha-1111", ClaudeRPM="1"))
+
+        assert _generate(server)[0] == 200
+        status, body, headers = _generate(server)
+
+        assert status == 429, f"Ожидался 429, получено {status}: {body}"
+        assert int(headers["Retry-After"]) > 0
+        assert provider.requests_by_key["key-alpha-1111"] == 1
+
+    def test_token_reservation_must_fit(self, fake_provider, start_api_server):
+        """Ключ берёт запрос, только если в бакете токенов хватает на всю резервацию."""
+        # Резервация — ~6 200 токенов системного промпта + 8 192 на ответ:
+        # при ClaudeTPM=30000 одновременно помещаются две генерации.
+        provider = fake_provider({"key-alpha-1111": 100}, latency=1.0)
+        server = start_api_server(server_env(provider.url, "key-alpha-1111", ClaudeTPM="30000"))
+
+        with ThreadPoolExecutor(3) as pool:
+            statuses = sorted(status for status, _, _ in pool.map(lambda _: _generate(server), range(3)))
+
+        assert statuses == [200, 200, 429], f"Бакет ушёл в долг: {statuses}"
+        assert provider.requests_by_key["key-alpha-1111"] == 2
+        assert _keys(server)["key-1"]["tokens"]["available"] >= 0
+
+    def test_keys_hidden_in_production(self, fake_provider, start_api_server):
+        """В production /api/keys не отдаётся без YomaDebug."""
+        provider = fake_provider({"key-alpha-1111": 100})
+        server = start_api_server(server_env(provider.url, "key-alpha-1111", NODE_ENV="production"))
+
+        try:
+            _keys(server)
+        except urllib.error.HTTPError as error:
+            assert error.code == 404
+        else:
+            raise AssertionError("/api/keys доступен в production")
@@ -0,0 +1,137 @@
+"""
+Автотесты YomaAI — перехват сети на уровне браузера (фикстура network).
+
+Тест 19: Сценарные ответы, задержка, потоковое тело, отказы, тайминги
+
+Проверяет сам network.py: остальные тесты полагаются на него вместо
+подмены window.fetch. Backend не нужен — /api/* не уходит в сеть.
+"""
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from fake_provider import sample_idea
+from helpers import MOCK_RESULT, skip_dialog_via_storage
+
+
+RESULT_HEADING = (By.XPATH, "//h1[contains(text(), \"Yoma's Idea\")]")
+ERROR_BLOCK = (By.XPATH, "//div[contains(@class, 'border-red-300')]")
+
+READ_STREAM_JS = """
+const done = arguments[arguments.length - 1];
+(async () => {
+  const started = performance.now();
+  const response = await fetch('/api/generate', { method: 'POST', body: '{}' });
+  const reader = response.body.getReader();
+  const arrivals = [];
+  let bytes = 0;
+  for (;;) {
+    const { done: finished, value } = await reader.read();
+    if (finished) break;
+    bytes += value.length;
+    arrivals.push(performance.now() - started);
+  }
+  done({ status: response.status, bytes, arrivals });
+})().catch((error) => done({ error: String(error) }));
+"""
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _click_create(driver) -> None:
+    driver.find_element(By.XPATH, "//button[contains(@class, 'rainbow-btn')]").click()
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 19: Перехват сети
+# ─────────────────────────────────────────────────────────────
+class TestNetworkInterception:
+    """Фикстура network перехватывает /api/* через CDP Fetch/Network."""
+
+    def test_scripted_response_survives_reload(self, driver, network, base_url):
+        """Сценарий задан до загрузки страницы и действует после перезагрузки."""
+        network.respond("/api/generate", json_body=MOCK_RESULT)
+        skip_dialog_via_storage(driver, base_url)
+        driver.refresh()
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//button[contains(@class, 'rainbow-btn')]"))
+        )
+
+        _click_create(driver)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located(RESULT_HEADING))
+
+        request, = network.wait_for("/api/generate")
+        assert request.method == "POST"
+        assert "selections" in request.json
+        assert request.status == 200
+        assert "mock AI response" in driver.find_element(
+            By.XPATH, "//div[contains(@class, 'prose-yoma')]"
+        ).text
+
+    def test_latency_is_applied_and_timed(self, driver, network, base_url):
+        """latency задерживает ответ: видна фаза загрузки, ttfb в журнале ≥ задержки."""
+        network.respond("/api/generate", json_body=MOCK_RESULT, latency=1.0)
+        skip_dialog_via_storage(driver, base_url)
+
+        _click_create(driver)
+        WebDriverWait(driver, 2).until(
+            EC.presence_of_element_located(
+                (By.XPATH, "//*[contains(text(), 'Yoma is crafting your idea')]")
+            )
+        )
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located(RESULT_HEADING))
+
+        request, = network.wait_for("/api/generate")
+        assert request.ttfb >= 0.9, f"Задержка не применена: ttfb={request.ttfb:.2f}s"
+        assert request.duration >= request.ttfb
+
+    def test_streamed_body_is_throttled(self, driver, network, base_url, record_property):
+        """Тело приходит частями со скоростью bytes_per_second."""
+        body = sample_idea(8).encode()
+        network.respond(
+            "/api/generate",
+            body=body,
+            headers={"Content-Type": "text/markdown"},
+            chunk_size=2048,
+            bytes_per_second=len(body),
+        )
+        driver.get(base_url)
+
+        read = driver.execute_async_script(READ_STREAM_JS)
+        request, = network.wait_for("/api/generate")
+
+        record_property("stream_chunks", len(read["arrivals"]))
+        record_property("stream_seconds", round(request.duration, 2))
+
+        assert read["status"] == 200 and read["bytes"] == len(body)
+        assert len(read["arrivals"]) >= 3, f"Тело пришло одним куском: {read['arrivals']}"
+        assert read["arrivals"][-1] - read["arrivals"][0] >= 500, "Части пришли без пауз"
+        assert request.duration >= 0.8, f"Скорость не ограничена: {request.duration:.2f}s"
+
+    def test_connection_drop_mid_body(self, driver, network, base_url):
+        """Обрыв соединения посреди тела — приложение показывает ошибку соединения."""
+        network.respond("/api/generate", json_body=MOCK_RESULT, chunk_size=64, abort_after=100)
+        skip_dialog_via_storage(driver, base_url)
+
+        _click_create(driver)
+        error = WebDriverWait(driver, 10).until(EC.presence_of_element_located(ERROR_BLOCK))
+
+        assert "Failed to connect to the server" in error.text
+        request, = network.wait_for("/api/generate")
+        assert request.status == 200 and request.error, "Обрыв не попал в журнал"
+
+    def test_fail_request_then_recover(self, driver, network, base_url):
+        """Первый запрос падает по таймауту, повторный (times=1 исчерпан) успешен."""
+        network.respond("/api/generate", json_body=MOCK_RESULT)
+        network.fail("/api/generate", "TimedOut", times=1)
+        skip_dialog_via_storage(driver, base_url)
+
+        _click_create(driver)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located(ERROR_BLOCK))
+        _click_create(driver)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located(RESULT_HEADING))
+
+        failed, succeeded = network.wait_for("/api/generate", count=2)
+        assert "TIMED_OUT" in failed.error
+        assert succeeded.status == 200
@@ -0,0 +1,185 @@
+"""
+Автотесты production-режима YomaAI — Express отдаёт собранный фронтенд.
+
+Тест 9: Статика (предсжатые ассеты, immutable-кэш, SPA fallback)
+Тест 10: Загрузка страницы (размер передачи, холодная и тёплая загрузка)
+
+Перед запуском:
+  npm run build && PORT=4173 npm start
+"""
+
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _http_get(url: str, encoding: str = "br, gzip"):
+    """GET-запрос без автоматической распаковки. Возвращает (status, headers, body)."""
+    request = urllib.request.Request(url, headers={"Accept-Encoding": encoding})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def _asset_paths(index_html: str) -> list[str]:
+    """Достаёт пути хэшированных ассетов (/assets/...) из index.html."""
+    return sorted(set(re.findall(r'"(/assets/[^"]+)"', index_html)))
+
+
+def _resource_stats(driver) -> dict:
+    """
+    Собирает Resource Timing по ассетам и время загрузки страницы.
+    transferSize = 0 означает, что ресурс взят из кэша браузера.
+    """
+    return driver.execute_script("""
+        const nav = performance.getEntriesByType('navigation')[0];
+        const assets = performance.getEntriesByType('resource')
+            .filter(e => e.name.includes('/assets/'));
+        return {
+            loadMs: nav.loadEventEnd - nav.startTime,
+            transfer: assets.reduce((s, e) => s + e.transferSize, 0),
+            encoded: assets.reduce((s, e) => s + e.encodedBodySize, 0),
+            decoded: assets.reduce((s, e) => s + e.decodedBodySize, 0),
+            count: assets.length,
+        };
+    """)
+
+
+def _load_and_measure(driver, url: str) -> dict:
+    """Открывает страницу, ждёт onload и возвращает метрики загрузки."""
+    driver.get(url)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.TAG_NAME, "h1"))
+    )
+    WebDriverWait(driver, 10).until(
+        lambda d: d.execute_script(
+            "return performance.getEntriesByType('navigation')[0].loadEventEnd > 0;"
+        )
+    )
+    return _resource_stats(driver)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _require_production_server(prod_url):
+    """Пропускает модуль, если production-сервер не запущен."""
+    try:
+        status, _, body = _http_get(f"{prod_url}/", encoding="identity")
+    except OSError:
+        pytest.skip(f"Production-сервер недоступен: {prod_url}")
+    if status != 200 or b'id="root"' not in body:
+        pytest.skip(f"{prod_url} не отдаёт собранный фронтенд (npm run build && npm start)")
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 9: Статика
+# ─────────────────────────────────────────────────────────────
+class TestProductionStatic:
+    """Проверяем заголовки и сжатие статики в production-режиме."""
+
+    def test_assets_served_precompressed(self, prod_url):
+        """JS/CSS-ассеты отдаются в brotli (предсжатые при сборке) и меньше оригинала."""
+        _, _, index_body = _http_get(f"{prod_url}/", encoding="identity")
+        assets = [a for a in _asset_paths(index_body.decode()) if a.endswith((".js", ".css"))]
+        assert assets, "В index.html не найдено ни одного /assets/*.js|css"
+
+        for asset in assets:
+            status, headers, body = _http_get(f"{prod_url}{asset}", encoding="br")
+            _, _, raw = _http_get(f"{prod_url}{asset}", encoding="identity")
+            assert status == 200, f"{asset}: статус {status}"
+            assert headers.get("Content-Encoding") == "br", (
+                f"{asset} отдан без brotli: Content-Encoding={headers.get('Content-Encoding')}"
+            )
+            assert len(body) < len(raw), (
+                f"{asset}: сжатый размер {len(body)} не меньше исходного {len(raw)}"
+            )
+
+    def test_gzip_fallback(self, prod_url):
+        """Клиент без brotli получает gzip-вариант."""
+        _, _, index_body = _http_get(f"{prod_url}/", encoding="identity")
+        asset = next(a for a in _asset_paths(index_body.decode()) if a.endswith(".js"))
+
+        _, headers, _ = _http_get(f"{prod_url}{asset}", encoding="gzip")
+        assert headers.get("Content-Encoding") == "gzip", (
+            f"Ожидался gzip, получено: {headers.get('Content-Encoding')}"
+        )
+
+    def test_hashed_assets_are_immutable(self, prod_url):
+        """Хэшированные ассеты кэшируются навсегда (immutable)."""
+        _, _, index_body = _http_get(f"{prod_url}/", encoding="identity")
+        for asset in _asset_paths(index_body.decode()):
+            _, headers, _ = _http_get(f"{prod_url}{asset}")
+            cache_control = headers.get("Cache-Control", "")
+            assert "immutable" in cache_control and "max-age=31536000" in cache_control, (
+                f"{asset}: Cache-Control='{cache_control}'"
+            )
+
+    def test_index_html_revalidates(self, prod_url):
+        """index.html не кэшируется надолго — иначе новый деплой не подхватится."""
+        _, headers, _ = _http_get(f"{prod_url}/")
+        assert headers.get("Cache-Control") == "no-cache", (
+            f"index.html: Cache-Control='{headers.get('Cache-Control')}'"
+        )
+
+    @pytest.mark.parametrize("route", ["/create", "/settings"])
+    def test_spa_fallback(self, prod_url, route):
+        """Клиентские маршруты отдают index.html, а не 404."""
+        status, _, body = _http_get(f"{prod_url}{route}", encoding="identity")
+        assert status == 200, f"{route}: статус {status}"
+        assert b'id="root"' in body, f"{route} не вернул index.html"
+
+    def test_api_not_shadowed_by_fallback(self, prod_url):
+        """/api/* не перехватывается статикой — пустой запрос получает 400 от API."""
+        request = urllib.request.Request(
+            f"{prod_url}/api/generate",
+            data=b"{}",
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=10)
+        assert error.value.code == 400
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 10: Загрузка страницы
+# ─────────────────────────────────────────────────────────────
+class TestProductionLoad:
+    """
+    Измеряем размер передачи и время холодной/тёплой загрузки.
+    Метрики пишутся через record_property (видны в --junitxml).
+    """
+
+    def test_cold_load_transfers_compressed_assets(self, driver, prod_url, record_property):
+        """Холодная загрузка: ассеты приходят сжатыми (encoded < decoded)."""
+        cold = _load_and_measure(driver, prod_url)
+
+        record_property("cold_load_ms", round(cold["loadMs"]))
+        record_property("cold_transfer_bytes", cold["transfer"])
+        record_property("cold_decoded_bytes", cold["decoded"])
+
+        assert cold["count"] > 0, "Ассеты не загружены"
+        assert cold["encoded"] < cold["decoded"], (
+            f"Ассеты не сжаты: encoded={cold['encoded']}, decoded={cold['decoded']}"
+        )
+
+    def test_warm_load_uses_cache(self, driver, prod_url, record_property):
+        """Тёплая загрузка: хэшированные ассеты берутся из кэша (transferSize = 0)."""
+        cold = _load_and_measure(driver, prod_url)
+        warm = _load_and_measure(driver, f"{prod_url}/settings")
+
+        record_property("cold_load_ms", round(cold["loadMs"]))
+        record_property("warm_load_ms", round(warm["loadMs"]))
+        record_property("warm_transfer_bytes", warm["transfer"])
+
+        assert warm["transfer"] == 0, (
+            f"При тёплой загрузке ассеты скачаны повторно: {warm['transfer']} байт"
+        )
@@ -0,0 +1,193 @@
+"""
+Автотесты YomaAI — сборка промпта на сервере из структурированных настроек.
+
+Тест 20: Валидация selections, канонический ключ запроса, совместимость с prompt
+Тест 21: Микробенчмарк валидации и сборки (server/prompt.bench.ts)
+Тест 22: Бюджеты размера и стоимости запроса (prompt_cost.py)
+
+Тест 20 поднимает подменного провайдера и отдельный Express-сервер, как
+test_yomaai_keypool.py, и читает промпт, дошедший до провайдера.
+Браузер не нужен.
+"""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from helpers import PROJECT_ROOT, post_json, server_env
+from prompt_cost import analyze, build_prompt, check_budgets, load_settings, load_templates, BUDGETS_PATH
+
+
+KEY = "key-alpha-1111"
+
+FOOTER = "Remember: Be original, avoid clichés. Create something truly unique and surprising!"
+
+# Нижняя граница пропускной способности (операций в секунду) на медленном CI.
+# Локально валидация + сборка + ключ — ~100 000 оп/с.
+MIN_TOTAL_OPS = 10_000
+BENCH_ITERATIONS = 50_000
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _generate(server_url: str, payload: dict) -> tuple[int, dict]:
+    """POST /api/generate. Возвращает (status, body)."""
+    status, body, _, _ = post_json(f"{server_url}/api/generate", payload, timeout=30)
+    return status, body
+
+
+def _server(fake_provider, start_api_server):
+    provider = fake_provider({KEY: 100})
+    url = start_api_server(server_env(provider.url, KEY))
+    return provider, url
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 20: Структурированный запрос
+# ─────────────────────────────────────────────────────────────
+class TestStructuredPrompt:
+    """/api/generate принимает {selections, additionalDetails} и сам собирает промпт."""
+
+    def test_prompt_matches_create_page(self, fake_provider, start_api_server):
+        """Промпт совпадает с тем, что раньше собирала страница: порядок настроек, детали, хвост."""
+        provider, server = _server(fake_provider, start_api_server)
+
+        status, body = _generate(server, {
+            "selections": {"tone": "Dark & Gritty", "genre": "Mystery", "medium": ""},
+            "additionalDetails": "  A rogue ninja\r\nfrom the Mist.  ",
+        })
+
+        assert status == 200, body
+        assert provider.prompts[-1] == (
+            "Create an original creative idea based on these preferences:\n\n"
+            "Genre: Mystery\n"
+            "Tone / Mood: Dark & Gritty\n\n"
+            "Additional Details from the creator:\n"
+            "A rogue ninja\nfrom the Mist.\n\n"
+            f"{FOOTER}"
+        )
+        assert len(body["requestKey"]) == 16
+
+    def test_empty_selections_ask_for_surprise(self, fake_provider, start_api_server):
+        """Ничего не выбрано и нет деталей — промпт «удиви меня»; пробелы — тоже «не выбрано»."""
+        provider, server = _server(fake_provider, start_api_server)
+
+        status, body = _generate(server, {"selections": {"genre": "", "tone": "  "}, "additionalDetails": " "})
+
+        assert status == 200, body
+        assert provider.prompts[-1] == (
+            "Generate a completely original creative idea. Surprise me with something unique!"
+        )
+
+    def test_equivalent_requests_share_key(self, fake_provider, start_api_server):
+        """Порядок ключей, регистр, пробелы и пустые значения не меняют ключ и промпт."""
+        provider, server = _server(fake_provider, start_api_server)
+
+        _, first = _generate(server, {
+            "selections": {"genre": "Mystery", "tone": "Melancholic"},
+            "additionalDetails": "Set in a lighthouse.",
+        })
+        _, second = _generate(server, {
+            "selections": {"tone": " melancholic ", "settingCountry": "", "genre": "MYSTERY"},
+            "additionalDetails": "Set in a lighthouse.\n",
+        })
+        _, other = _generate(server, {
+            "selections": {"genre": "Mystery", "tone": "Melancholic"},
+            "additionalDetails": "Set in a windmill.",
+        })
+
+        assert first["requestKey"] == second["requestKey"]
+        assert provider.prompts[0] == provider.prompts[1]
+        assert other["requestKey"] != first["requestKey"]
+
+    @pytest.mark.parametrize("payload, message", [
+        ({"selections": {"villain": "Yes"}}, "Unknown setting: villain"),
+        ({"selections": {"genre": "Western"}}, "Unknown Genre option: Western"),
+        ({"selections": ["Mystery"]}, "selections must be an object"),
+        ({"selections": {}, "additionalDetails": 42}, "additionalDetails must be a string"),
+        ({"selections": {}, "additionalDetails": "x" * 4001}, "too long"),
+        ({}, "Prompt is required"),
+    ], ids=["setting", "option", "not-object", "details-type", "details-length", "empty"])
+    def test_invalid_request_rejected(self, fake_provider, start_api_server, payload, message):
+        """Неверные настройки — 400 с понятной ошибкой, провайдер не вызывается."""
+        provider, server = _server(fake_provider, start_api_server)
+
+        status, body = _generate(server, payload)
+
+        assert status == 400
+        assert message in body["error"]
+        assert not provider.prompts
+
+    def test_raw_prompt_still_accepted(self, fake_provider, start_api_server):
+        """Старые клиенты присылают готовый prompt — он уходит провайдеру как есть."""
+        provider, server = _server(fake_provider, start_api_server)
+
+        status, body = _generate(server, {"prompt": "Genre: Mystery"})
+
+        assert status == 200, body
+        assert provider.prompts[-1] == "Genre: Mystery"
+        assert body["requestKey"]
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 21: Микробенчмарк
+# ─────────────────────────────────────────────────────────────
+@pytest.mark.depends_on("server/prompt.ts", "server/prompt.bench.ts", "src/data/ideaOptions.ts")
+class TestPromptBenchmark:
+    """Пропускная способность валидации, сборки промпта и ключа запроса."""
+
+    def test_validation_and_assembly_throughput(self, record_property):
+        """npm run bench:prompt укладывается в нижнюю границу оп/с."""
+        tsx = PROJECT_ROOT / "node_modules" / ".bin" / "tsx"
+        if not tsx.exists() or shutil.which("node") is None:
+            pytest.skip("tsx не найден — выполните npm install")
+
+        output = subprocess.run(
+            [str(tsx), "server/prompt.bench.ts", str(BENCH_ITERATIONS)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120, check=True,
+        ).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+
+        for phase in ("validate", "assemble", "key", "total"):
+            record_property(f"prompt_{phase}_ops", results[phase]["opsPerSecond"])
+
+        assert results["total"]["opsPerSecond"] >= MIN_TOTAL_OPS, (
+            f"Валидация + сборка: {results['total']['opsPerSecond']} оп/с "
+            f"(минимум {MIN_TOTAL_OPS})"
+        )
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 22: Бюджеты размера запроса
+# ─────────────────────────────────────────────────────────────
+@pytest.mark.depends_on(
+    "server/index.ts", "server/prompt.ts", "src/data/ideaOptions.ts", "tests/prompt_budgets.json",
+)
+class TestPromptBudget:
+    """Правки SYSTEM_PROMPT, настроек или шаблонов не раздувают запрос сверх бюджета."""
+
+    def test_analyzer_reproduces_server_prompt(self, fake_provider, start_api_server):
+        """prompt_cost.build_prompt собирает тот же текст, что сервер отправляет провайдеру."""
+        provider, server = _server(fake_provider, start_api_server)
+        settings = load_settings()
+        selections = {setting.id: setting.options[-1] for setting in settings[::3]}
+        details = "Set in a lighthouse that moves every night."
+
+        status, body = _generate(server, {"selections": selections, "additionalDetails": details})
+
+        assert status == 200, body
+        assert provider.prompts[-1] == build_prompt(load_templates(), settings, selections, details)
+
+    def test_request_within_budgets(self, record_property):
+        """Процентили токенов и стоимости не выше prompt_budgets.json."""
+        report = analyze(samples=5000)
+
+        record_property("system_prompt_tokens", report["systemPrompt"]["tokens"])
+        record_property("request_tokens_p95", report["sample"]["requestTokens"]["p95"])
+        record_property("request_tokens_max", report["worstCase"]["requestTokens"])
+        record_property("request_cost_usd_p95", report["sample"]["costUsd"]["p95"])
+
+        violations = check_budgets(report, json.loads(BUDGETS_PATH.read_text(encoding="utf-8")))
+        assert not violations, f"Бюджеты превышены: {violations}"
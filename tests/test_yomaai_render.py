@@ -0,0 +1,193 @@
+"""
+Автотесты YomaAI — рендеринг очень длинных идей (бенчмарк).
+
+Тест 18: Время до первой отрисовки результата и самая длинная задача
+
+Идея ~35 000 символов (≈8000 токенов, как у «Epic» / «Extremely Intricate»)
+отдаётся перехватом /api/generate (network.py) мгновенно, так что измеряется только разбор
+markdown и рендеринг. На мобильном viewport CPU замедляется в 4 раза
+(CDP Emulation.setCPUThrottlingRate), как на слабом телефоне.
+"""
+
+import re
+
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from fake_provider import epic_idea
+from helpers import RENDER_STATS_JS, skip_dialog_via_storage
+from network import NetworkInterceptor
+
+
+HEADING = re.compile(r"^##[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+
+# Бюджеты в мс: первая отрисовка и самая длинная задача главного потока.
+BUDGETS = {
+    "driver": {"first_paint": 300, "longest_task": 100},
+    "mobile_driver": {"first_paint": 1000, "longest_task": 250},
+}
+MOBILE_CPU_SLOWDOWN = 4
+
+START_BENCH_JS = """
+const expectedItems = arguments[0], expectedFooters = arguments[1];
+const bench = window.__bench = { start: performance.now(), firstPaint: null, complete: null };
+// Двойной шаг rAF → setTimeout: колбэк выполняется уже после отрисовки кадра.
+const afterPaint = (field) => requestAnimationFrame(() => setTimeout(() => {
+  bench[field] = performance.now() - bench.start;
+}));
+const observer = new MutationObserver(() => {
+  const prose = document.querySelector('.prose-yoma');
+  if (!prose) return;
+  if (bench.firstPaint === null && prose.textContent.length > 0) {
+    bench.firstPaint = -1;
+    afterPaint('firstPaint');
+  }
+  if (prose.querySelectorAll('li').length === expectedItems
+      && prose.querySelectorAll('section[data-section-id] button').length === expectedFooters) {
+    observer.disconnect();
+    afterPaint('complete');
+  }
+});
+observer.observe(document.body, { childList: true, subtree: true });
+document.querySelector('button.rainbow-btn').click();
+"""
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _slugify(title: str) -> str:
+    return re.sub(r"[\W_]+", "-", title.lower()).strip("-") or "section"
+
+
+def _list_items(markdown: str) -> int:
+    return len(re.findall(r"^(?:- |\d+\. )", markdown, re.MULTILINE))
+
+
+def _idea_payload(markdown: str, with_sections: bool = True) -> dict:
+    """Ответ /api/generate, как его собирает server/sections.ts."""
+    if not with_sections:
+        return {"result": markdown}
+    matches = list(HEADING.finditer(markdown))
+    sections = [
+        {
+            "id": _slugify(match[1]),
+            "title": match[1],
+            "content": markdown[match.end(): matches[i + 1].start() if i + 1 < len(matches) else None].strip(),
+        }
+        for i, match in enumerate(matches)
+    ]
+    return {"result": markdown, "ideaId": "epic-idea", "preamble": "", "sections": sections}
+
+
+def _open_create(driver, base_url: str, throttle: bool) -> None:
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": RENDER_STATS_JS})
+    if throttle:
+        driver.execute_cdp_cmd("Emulation.setCPUThrottlingRate", {"rate": MOBILE_CPU_SLOWDOWN})
+    skip_dialog_via_storage(driver, base_url)
+
+
+def _generate_and_measure(driver, payload: dict) -> dict:
+    """Жмёт Create! и ждёт полной отрисовки. Возвращает тайминги в мс."""
+    footers = len(payload.get("sections", []))
+    driver.execute_script(START_BENCH_JS, _list_items(payload["result"]), footers)
+    WebDriverWait(driver, 30).until(
+        lambda d: d.execute_script("return window.__bench.complete !== null")
+    )
+    return driver.execute_script("""
+        const bench = window.__bench;
+        const tasks = window.__yomaRenderStats.longTasks.filter((t) => t.start >= bench.start);
+        return {
+            firstPaint: bench.firstPaint,
+            complete: bench.complete,
+            longestTask: Math.max(0, ...tasks.map((t) => t.duration)),
+            longTasks: tasks.length,
+        };
+    """)
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 18: Рендеринг длинных идей
+# ─────────────────────────────────────────────────────────────
+class TestLongResultRendering:
+    """Длинный результат появляется частями и не блокирует главный поток."""
+
+    @pytest.mark.parametrize("with_sections", [True, False], ids=["sections", "plain"])
+    @pytest.mark.parametrize("driver_name", ["driver", "mobile_driver"])
+    def test_epic_idea_first_paint(self, request, base_url, driver_name, with_sections, record_property):
+        """Первые секции видны в пределах бюджета, длинных задач нет, текст полный."""
+        driver = request.getfixturevalue(driver_name)
+        markdown = epic_idea()
+        payload = _idea_payload(markdown, with_sections)
+
+        with NetworkInterceptor(driver) as network:
+            network.respond("/api/generate", json_body=payload)
+            _open_create(driver, base_url, throttle=driver_name == "mobile_driver")
+            timings = _generate_and_measure(driver, payload)
+
+        for name, value in timings.items():
+            record_property(f"render_{name}", round(value, 1))
+
+        prose = driver.find_element(By.XPATH, "//div[contains(@class, 'prose-yoma')]")
+        assert len(prose.find_elements(By.TAG_NAME, "li")) == _list_items(markdown), "Часть текста потерялась"
+
+        budget = BUDGETS[driver_name]
+        assert timings["firstPaint"] < budget["first_paint"], (
+            f"Первая отрисовка через {timings['firstPaint']:.0f} мс (бюджет {budget['first_paint']})"
+        )
+        assert timings["longestTask"] < budget["longest_task"], (
+            f"Самая длинная задача {timings['longestTask']:.0f} мс (бюджет {budget['longest_task']})"
+        )
+
+    def test_rewrite_section_reuses_parsed_text(self, driver, network, base_url, record_property):
+        """После 'Rewrite section' остальные секции не разбираются заново — без long tasks."""
+        markdown = epic_idea()
+        payload = _idea_payload(markdown)
+        rewritten = _idea_payload(markdown.replace("Title, arc 1.1.", "Title, arc 1.1 (rewritten)."))
+        rewritten["section"] = rewritten["sections"][0]
+
+        network.respond("/api/generate", json_body=payload)
+        network.respond("/api/regenerate-section", json_body=rewritten)
+        _open_create(driver, base_url, throttle=False)
+        _generate_and_measure(driver, payload)
+
+        elapsed = driver.execute_async_script("""
+            const done = arguments[arguments.length - 1];
+            const start = window.__rewriteStart = performance.now();
+            const observer = new MutationObserver(() => {
+                if (document.querySelector('.prose-yoma').textContent.includes('(rewritten)')) {
+                    observer.disconnect();
+                    requestAnimationFrame(() => setTimeout(() => done(performance.now() - start)));
+                }
+            });
+            observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+            document.querySelector('section[data-section-id="title"] button').click();
+        """)
+        long_tasks = driver.execute_script(
+            "return window.__yomaRenderStats.longTasks"
+            ".filter((t) => t.start >= window.__rewriteStart).map((t) => t.duration)"
+        )
+
+        record_property("rewrite_section_ms", round(elapsed, 1))
+        assert not long_tasks, f"Long tasks при перерисовке одной секции: {long_tasks}"
+
+    def test_chunks_keep_lists_and_references(self, driver, network, base_url):
+        """Разбиение на куски не рвёт «рыхлый» список и не теряет ссылки по определению."""
+        item = (
+            "The keeper audits a harbour that only exists at low tide; every hull "
+            "that never arrives costs the town one shared memory of the sea."
+        )
+        loose_list = "\n\n".join(f"{n}. **Arc {n}.** {item}\n\n   {item}" for n in range(1, 31))
+        markdown = (
+            f"## Structure & Pacing\n\nSee [the map of Vell][vell] first.\n\n{loose_list}\n\n"
+            "Closing paragraph.\n\n[vell]: https://example.com/vell"
+        )
+        network.respond("/api/generate", json_body=_idea_payload(markdown, with_sections=False))
+        _open_create(driver, base_url, throttle=False)
+        _generate_and_measure(driver, {"result": markdown})
+
+        lists = driver.find_elements(By.CSS_SELECTOR, ".prose-yoma ol")
+        assert len(lists) == 1, f"Список разрезан на {len(lists)} частей"
+        assert len(lists[0].find_elements(By.CSS_SELECTOR, ":scope > li")) == 30
+        links = driver.find_elements(By.CSS_SELECTOR, ".prose-yoma a[href='https://example.com/vell']")
+        assert links, "Ссылка по определению не отрисовалась"
@@ -0,0 +1,192 @@
+"""
+Автотесты YomaAI — перегенерация отдельных секций идеи.
+
+Тест 11: Кнопки 'Rewrite section' в фазе результата (перехват /api)
+Тест 12: Бенчмарк — секция против полной перегенерации (подменный провайдер и реальный API)
+"""
+
+import urllib.error
+
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from fake_provider import epic_idea
+from helpers import post_json, server_env, skip_dialog_via_storage
+
+
+# Скорость подменной модели: ~10 000 выходных токенов в секунду. Полная
+# идея (epic_idea, упирается в 8192 max_tokens) — ~0.8 с, одна секция — ~0.1 с.
+LATENCY_PER_TOKEN = 0.0001
+
+MOCK_IDEA = {
+    "result": "## Title\n\nThe Clockmaker's Debt\n\n## Main Characters\n\nOld cast.",
+    "ideaId": "mock-idea",
+    "preamble": "",
+    "sections": [
+        {"id": "title", "title": "Title", "content": "The Clockmaker's Debt"},
+        {"id": "main-characters", "title": "Main Characters", "content": "Old cast."},
+    ],
+}
+
+MOCK_SECTION = {
+    "result": "## Title\n\nThe Clockmaker's Debt\n\n## Main Characters\n\nA brand new cast.",
+    "ideaId": "mock-idea",
+    "preamble": "",
+    "sections": [
+        {"id": "title", "title": "Title", "content": "The Clockmaker's Debt"},
+        {"id": "main-characters", "title": "Main Characters", "content": "A brand new cast."},
+    ],
+}
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _mock_sections(network) -> None:
+    """
+    /api/generate возвращает идею с секциями,
+    /api/regenerate-section — идею с переписанной секцией 'Main Characters'.
+    Тело запроса к regenerate-section остаётся в журнале network.
+    """
+    network.respond("/api/generate", json_body=MOCK_IDEA, latency=0.3)
+    network.respond("/api/regenerate-section", json_body=MOCK_SECTION, latency=0.3)
+
+
+def _full_then_section(server_url: str, unavailable=pytest.fail) -> tuple[dict, dict]:
+    """
+    Полная генерация, затем перегенерация секции 'Main Characters'.
+    Возвращает тела ответов с добавленным "seconds". Если генерация не
+    прошла (нет ключа, провайдер не отвечает) — вызывает unavailable.
+    """
+    status, full, _, full_seconds = post_json(
+        f"{server_url}/api/generate", {"prompt": "Create an original creative idea. Genre: Mystery"},
+    )
+    if status != 200:
+        unavailable(f"/api/generate вернул {status}: {full.get('error')}")
+
+    section_id = next(
+        (s["id"] for s in full["sections"] if s["title"] == "Main Characters"),
+        full["sections"][-1]["id"],
+    )
+    status, section, _, section_seconds = post_json(
+        f"{server_url}/api/regenerate-section",
+        {"ideaId": full["ideaId"], "sectionId": section_id},
+    )
+    assert status == 200, f"/api/regenerate-section вернул {status}: {section}"
+    return {**full, "seconds": full_seconds}, {**section, "seconds": section_seconds}
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 11: Перегенерация секции в UI
+# ─────────────────────────────────────────────────────────────
+class TestSectionRegenerate:
+    """Проверяем кнопки 'Rewrite section' на странице результата."""
+
+    def _generate(self, driver, network, base_url: str) -> None:
+        _mock_sections(network)
+        skip_dialog_via_storage(driver, base_url)
+        driver.find_element(By.XPATH, "//button[contains(@class, 'rainbow-btn')]").click()
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located(
+                (By.XPATH, "//h1[contains(text(), \"Yoma's Idea\")]")
+            )
+        )
+
+    def test_each_section_has_rewrite_button(self, driver, network, base_url):
+        """Каждая секция идеи получает свою кнопку 'Rewrite section'."""
+        self._generate(driver, network, base_url)
+
+        sections = driver.find_elements(By.CSS_SELECTOR, "section[data-section-id]")
+        assert [s.get_attribute("data-section-id") for s in sections] == [
+            "title", "main-characters",
+        ]
+        for section in sections:
+            button = section.find_element(By.TAG_NAME, "button")
+            assert "Rewrite section" in button.text
+
+    def test_rewrite_replaces_only_that_section(self, driver, network, base_url):
+        """
+        'Rewrite section' отправляет ideaId + sectionId и заменяет
+        только выбранную секцию, не переходя в фазу загрузки.
+        """
+        self._generate(driver, network, base_url)
+
+        section = driver.find_element(
+            By.CSS_SELECTOR, "section[data-section-id='main-characters']"
+        )
+        section.find_element(By.TAG_NAME, "button").click()
+
+        WebDriverWait(driver, 10).until(
+            EC.text_to_be_present_in_element(
+                (By.CSS_SELECTOR, "section[data-section-id='main-characters']"),
+                "A brand new cast.",
+            )
+        )
+
+        sent = network.requests("/api/regenerate-section")[-1].json
+        assert sent == {"ideaId": "mock-idea", "sectionId": "main-characters"}, (
+            f"Неверное тело запроса: {sent}"
+        )
+
+        title = driver.find_element(By.CSS_SELECTOR, "section[data-section-id='title']")
+        assert "The Clockmaker's Debt" in title.text, "Соседняя секция изменилась"
+        assert not driver.find_elements(
+            By.XPATH, "//*[contains(text(), 'Yoma is crafting your idea')]"
+        ), "Перегенерация секции не должна показывать полную загрузку"
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 12: Бенчмарк перегенерации секции
+# ─────────────────────────────────────────────────────────────
+class TestSectionRegenerateBenchmark:
+    """
+    Сравниваем полную перегенерацию с перегенерацией одной секции:
+    выходные токены (usage.outputTokens) и время ответа. Подменный провайдер
+    отвечает на просьбу о секции одной секцией и тратит время на каждый
+    выходной токен, как настоящая модель.
+    """
+
+    def test_section_cheaper_than_full(self, fake_provider, start_api_server, record_property):
+        """Секция дешевле и быстрее полной генерации: меньше выходных токенов и времени."""
+        provider = fake_provider(
+            {"key-alpha-1111": 100}, text=epic_idea(), latency_per_token=LATENCY_PER_TOKEN,
+        )
+        server = start_api_server(server_env(provider.url, "key-alpha-1111"))
+
+        full, section = _full_then_section(server)
+        full_tokens = full["usage"]["outputTokens"]
+        section_tokens = section["usage"]["outputTokens"]
+
+        record_property("full_output_tokens", full_tokens)
+        record_property("section_output_tokens", section_tokens)
+        record_property("full_seconds", round(full["seconds"], 2))
+        record_property("section_seconds", round(section["seconds"], 2))
+
+        assert section["section"]["title"] == "Main Characters"
+        assert section_tokens * 4 < full_tokens, (
+            f"Секция ({section_tokens}) не намного дешевле полной генерации ({full_tokens})"
+        )
+        assert section["seconds"] < full["seconds"] / 2, (
+            f"Секция ({section['seconds']:.2f}s) не намного быстрее полной генерации ({full['seconds']:.2f}s)"
+        )
+
+    def test_section_cheaper_on_real_api(self, base_url, record_property):
+        """То же на настоящем провайдере. Пропускается без backend или ключа."""
+        try:
+            full, section = _full_then_section(base_url, unavailable=pytest.skip)
+        except (urllib.error.URLError, ConnectionError) as error:
+            pytest.skip(f"Backend недоступен: {error}")
+
+        full_tokens = full["usage"]["outputTokens"]
+        section_tokens = section["usage"]["outputTokens"]
+        record_property("full_output_tokens", full_tokens)
+        record_property("section_output_tokens", section_tokens)
+        record_property("full_seconds", round(full["seconds"], 2))
+        record_property("section_seconds", round(section["seconds"], 2))
+
+        if full_tokens is None or section_tokens is None:
+            pytest.skip("Провайдер не вернул usage.outputTokens")
+        assert section_tokens < full_tokens, (
+            f"Секция ({section_tokens}) не дешевле полной генерации ({full_tokens})"
+        )
@@ -0,0 +1,218 @@
+"""
+Автотесты YomaAI — soak-тест утечек памяти (браузер и Express).
+
+Тест 16: Тысячи циклов генерация → регенерация → перезапись секции → сброс
+
+Запуск (долго, по умолчанию 2000 циклов):
+  npm run build
+  pytest tests/test_yomaai_soak.py --soak --soak-cycles 2000
+
+Отдельный Express-сервер в production-режиме отдаёт собранный dist/
+и ходит в подменного провайдера, так что реальные ключи не нужны.
+Каждые несколько циклов снимаются:
+  - JS-куча вкладки (CDP: HeapProfiler.collectGarbage + Runtime.getHeapUsage);
+  - RSS и куча Node (GET /api/debug/memory?gc=1, сервер с YomaDebug=1).
+По точкам после прогрева (IdeaStore заполнен) строится линейный тренд
+(байт на цикл);
+тест падает, если рост выше порога. Снимки кучи в начале и в конце
+и сами замеры сохраняются в --soak-dir для сравнения в DevTools.
+"""
+
+import json
+import time
+import urllib.request
+
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from cdp import take_heap_snapshot
+from fake_provider import sample_idea
+from helpers import PROJECT_ROOT, server_env, skip_dialog_via_storage
+
+pytestmark = pytest.mark.soak
+
+# Допустимый рост удерживаемой памяти после прогрева, байт на цикл.
+# 2000 циклов × 2 КБ ≈ 4 МБ — столько не набегает на шуме GC.
+BROWSER_HEAP_LIMIT = 2 * 1024
+SERVER_HEAP_LIMIT = 4 * 1024
+# RSS шумнее кучи (аллокатор не сразу отдаёт страницы ОС).
+SERVER_RSS_LIMIT = 16 * 1024
+
+# Прогрев: пока IdeaStore сервера не заполнен (500 идей, по 2 на цикл —
+# ~250 циклов), память растёт законно. Плюс первая четверть прогона на
+# JIT и кэши. Тренд строится по точкам после обоих.
+WARMUP_FRACTION = 0.25
+SAMPLES = 40
+# Меньше точек — наклон ничего не говорит.
+MIN_STEADY_SAMPLES = 5
+
+RESULT_HEADING = (By.XPATH, "//h1[contains(text(), \"Yoma's Idea\")]")
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _slope(xs: list[float], ys: list[float]) -> float:
+    """Наклон прямой по методу наименьших квадратов."""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+def _steady_samples(samples: list[dict]) -> list[dict]:
+    """Точки после прогрева: IdeaStore заполнен и прошла WARMUP_FRACTION прогона."""
+    full = next((s["cycle"] for s in samples if s["ideasStored"] >= s["ideasCapacity"]), None)
+    if full is None:
+        return []
+    start = max(full, samples[-1]["cycle"] * WARMUP_FRACTION)
+    return [s for s in samples if s["cycle"] >= start]
+
+
+def _trend(steady: list[dict], field: str) -> float:
+    """Рост field в байтах на цикл."""
+    return _slope([s["cycle"] for s in steady], [s[field] for s in steady])
+
+
+def _server_memory(server_url: str) -> dict:
+    with urllib.request.urlopen(f"{server_url}/api/debug/memory?gc=1", timeout=30) as response:
+        return json.loads(response.read())
+
+
+def _server_heap_snapshot(server_url: str) -> str:
+    request = urllib.request.Request(f"{server_url}/api/debug/heap-snapshot", method="POST")
+    with urllib.request.urlopen(request, timeout=120) as response:
+        return json.loads(response.read())["path"]
+
+
+def _browser_heap(driver) -> int:
+    driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+    return int(driver.execute_cdp_cmd("Runtime.getHeapUsage", {})["usedSize"])
+
+
+def _sample(driver, server_url: str, cycle: int) -> dict:
+    server = _server_memory(server_url)
+    return {
+        "cycle": cycle,
+        "time": time.time(),
+        "browserHeap": _browser_heap(driver),
+        "serverHeap": server["heapUsed"],
+        "serverRss": server["rss"],
+        "ideasStored": server["ideas"]["stored"],
+        "ideasCapacity": server["ideas"]["capacity"],
+    }
+
+
+def _click(driver, xpath: str) -> None:
+    driver.find_element(By.XPATH, xpath).click()
+
+
+def _wait_result(driver) -> None:
+    WebDriverWait(driver, 15).until(EC.presence_of_element_located(RESULT_HEADING))
+
+
+def _run_cycle(driver, provider) -> None:
+    """Create! → Regenerate → перезапись секции → Create Another Idea."""
+    _click(driver, "//button[contains(@class, 'rainbow-btn')]")
+    _wait_result(driver)
+
+    heading = driver.find_element(*RESULT_HEADING)
+    _click(driver, "//button[normalize-space()='Regenerate']")
+    WebDriverWait(driver, 15).until(EC.staleness_of(heading))
+    _wait_result(driver)
+
+    sent = sum(provider.requests_by_key.values())
+    _click(driver, "(//section[@data-section-id]//button)[1]")
+    WebDriverWait(driver, 15).until(
+        lambda d: sum(provider.requests_by_key.values()) > sent
+        and d.find_element(By.XPATH, "(//section[@data-section-id]//button)[1]").text
+        == "↻ Rewrite section"
+    )
+
+    _click(driver, "//button[contains(text(), 'Create Another Idea')]")
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.XPATH, "//button[contains(@class, 'rainbow-btn')]"))
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 16: Soak-тест памяти
+# ─────────────────────────────────────────────────────────────
+class TestMemorySoak:
+    """Повторяем полный сценарий и ищем устойчивый рост памяти."""
+
+    def test_generate_cycles_do_not_leak(
+        self, driver, fake_provider, start_api_server, soak_options, record_property
+    ):
+        """Куча вкладки и сервера не растёт после прогрева."""
+        if not (PROJECT_ROOT / "dist" / "index.html").exists():
+            pytest.skip("Нет dist/ — выполните npm run build")
+
+        cycles = soak_options["cycles"]
+        artifacts = soak_options["dir"] / time.strftime("%Y%m%d-%H%M%S")
+        artifacts.mkdir(parents=True, exist_ok=True)
+
+        provider = fake_provider({"key-soak-1111": 10**9}, text=sample_idea(3))
+        server = start_api_server(server_env(
+            provider.url, "key-soak-1111",
+            NODE_ENV="production",
+            YomaDebug="1",
+            YomaDebugDir=str(artifacts),
+            ClaudeRPM=str(10**9),
+            ClaudeTPM=str(10**12),
+        ), ready=True)
+
+        skip_dialog_via_storage(driver, server)
+        _run_cycle(driver, provider)
+
+        take_heap_snapshot(driver, artifacts / "browser-start.heapsnapshot")
+        _server_heap_snapshot(server)
+
+        every = max(1, cycles // SAMPLES)
+        samples = [_sample(driver, server, 0)]
+        started = time.perf_counter()
+        for cycle in range(1, cycles + 1):
+            _run_cycle(driver, provider)
+            if cycle % every == 0 or cycle == cycles:
+                samples.append(_sample(driver, server, cycle))
+        elapsed = time.perf_counter() - started
+
+        take_heap_snapshot(driver, artifacts / "browser-end.heapsnapshot")
+        _server_heap_snapshot(server)
+
+        steady = _steady_samples(samples)
+        trends = {
+            field: _trend(steady, field) if len(steady) >= MIN_STEADY_SAMPLES else None
+            for field in ("browserHeap", "serverHeap", "serverRss")
+        }
+        (artifacts / "samples.json").write_text(json.dumps({
+            "cycles": cycles,
+            "seconds": elapsed,
+            "steadyFrom": steady[0]["cycle"] if steady else None,
+            "trends": trends,
+            "samples": samples,
+        }, indent=2))
+
+        record_property("soak_cycles", cycles)
+        record_property("soak_seconds", round(elapsed, 1))
+        assert provider.requests_by_key["key-soak-1111"] == 3 * (cycles + 1)
+        if len(steady) < MIN_STEADY_SAMPLES:
+            pytest.skip(
+                f"За {cycles} циклов IdeaStore не заполнился или после прогрева мало точек "
+                f"({len(steady)}) — запустите больше циклов, замеры: {artifacts}"
+            )
+        for field, bytes_per_cycle in trends.items():
+            record_property(f"soak_{field}_bytes_per_cycle", round(bytes_per_cycle, 1))
+
+        assert trends["browserHeap"] < BROWSER_HEAP_LIMIT, (
+            f"JS-куча растёт на {trends['browserHeap']:.0f} Б/цикл, снимки: {artifacts}"
+        )
+        assert trends["serverHeap"] < SERVER_HEAP_LIMIT, (
+            f"Куча Node растёт на {trends['serverHeap']:.0f} Б/цикл, снимки: {artifacts}"
+        )
+        assert trends["serverRss"] < SERVER_RSS_LIMIT, (
+            f"RSS Node растёт на {trends['serverRss']:.0f} Б/цикл, снимки: {artifacts}"
+        )
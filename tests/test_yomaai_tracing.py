@@ -0,0 +1,170 @@
+"""
+Автотесты YomaAI — сквозные трассы генерации (браузер → Express → провайдер).
+
+Тест 24: traceparent, Server-Timing, файлы трасс сервера, разбивка по стадиям
+
+Серверные тесты поднимают подменного провайдера и отдельный Express-сервер
+с YomaTraceDir во временном каталоге. Браузерный тест открывает собранный
+dist/ на production-сервере (как soak-тест) и собирает трассу через
+фикстуру request_traces.
+"""
+
+import json
+import time
+
+import pytest
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from helpers import PROJECT_ROOT, post_json, server_env, skip_dialog_via_storage
+from tracing import parse_server_timing
+
+KEY = "key-alpha-1111"
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+CLIENT_SPAN_ID = "00f067aa0ba902b7"
+TRACEPARENT = f"00-{TRACE_ID}-{CLIENT_SPAN_ID}-01"
+
+SERVER_STAGES = {"total", "parse", "prompt", "acquire", "upstream", "download", "sections"}
+
+# Задержка подменного провайдера: её должна показать стадия upstream.
+PROVIDER_LATENCY = 0.3
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _generate(server_url: str, traceparent: str | None = None) -> tuple[int, dict]:
+    """POST /api/generate. Возвращает (status, headers)."""
+    headers = {"traceparent": traceparent} if traceparent else None
+    status, _, reply_headers, _ = post_json(
+        f"{server_url}/api/generate", {"selections": {"genre": "Mystery"}}, headers, timeout=30,
+    )
+    return status, reply_headers
+
+
+def _server(fake_provider, start_api_server, trace_dir, rpm_by_key=None, keys=KEY, **provider_options):
+    provider = fake_provider(rpm_by_key or {KEY: 100}, **provider_options)
+    url = start_api_server(server_env(provider.url, keys, YomaTraceDir=str(trace_dir)))
+    return provider, url
+
+
+def _server_trace(trace_dir, trace_id: str, timeout: float = 5) -> dict[str, list[dict]]:
+    """События серверной трассы trace_id по имени спана. Файл пишется после ответа — ждём его."""
+    deadline = time.monotonic() + timeout
+    while not (paths := list(trace_dir.glob(f"{trace_id}-*.json"))) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    events: dict[str, list[dict]] = {}
+    for path in paths:
+        for event in json.loads(path.read_text(encoding="utf-8"))["traceEvents"]:
+            if event["ph"] == "X":
+                events.setdefault(event["name"], []).append(event)
+    return events
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 24: Трассы генерации
+# ─────────────────────────────────────────────────────────────
+class TestRequestTracing:
+    """Одна трасса от кнопки Create! до провайдера и обратно."""
+
+    def test_trace_continued_to_provider(self, fake_provider, start_api_server, tmp_path):
+        """Сервер продолжает трассу клиента и передаёт её провайдеру от спана upstream."""
+        provider, server = _server(fake_provider, start_api_server, tmp_path)
+
+        status, headers = _generate(server, TRACEPARENT)
+
+        assert status == 200
+        assert headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+        sent, = provider.traceparents
+        assert sent.split("-")[1] == TRACE_ID
+
+        events = _server_trace(tmp_path, TRACE_ID)
+        root, = events["POST /api/generate"]
+        upstream, = events["upstream"]
+        assert root["args"]["parentId"] == CLIENT_SPAN_ID
+        assert upstream["args"]["parentId"] == root["args"]["spanId"]
+        assert sent.split("-")[2] == upstream["args"]["spanId"]
+
+    def test_server_timing_breakdown(self, fake_provider, start_api_server, tmp_path):
+        """Server-Timing перечисляет стадии сервера; задержка провайдера видна в upstream."""
+        _, server = _server(fake_provider, start_api_server, tmp_path, latency=PROVIDER_LATENCY)
+
+        _, headers = _generate(server, TRACEPARENT)
+        metrics = parse_server_timing(headers["Server-Timing"])
+        durations = {m["name"]: m["duration"] for m in metrics}
+
+        assert SERVER_STAGES <= durations.keys(), metrics
+        assert durations["upstream"] >= PROVIDER_LATENCY * 1000
+        stages = sum(d for name, d in durations.items() if name in SERVER_STAGES - {"total"})
+        assert stages <= durations["total"] + 1, "Стадии не укладываются в total"
+        written = _server_trace(tmp_path, TRACE_ID)
+        assert {"respond", *SERVER_STAGES - {"total"}} <= written.keys()
+
+    def test_new_trace_without_header(self, fake_provider, start_api_server, tmp_path):
+        """Без traceparent сервер начинает свою трассу и всё равно её возвращает."""
+        provider, server = _server(fake_provider, start_api_server, tmp_path)
+
+        _, headers = _generate(server)
+
+        trace_id = headers["traceparent"].split("-")[1]
+        assert trace_id != TRACE_ID
+        assert provider.traceparents[0].split("-")[1] == trace_id
+        assert _server_trace(tmp_path, trace_id)["POST /api/generate"][0]["args"]["parentId"] is None
+
+    def test_prompt_span_on_bad_request(self, fake_provider, start_api_server, tmp_path):
+        """Отклонённые настройки (400): спан prompt закрыт до ответа и есть в Server-Timing."""
+        provider, server = _server(fake_provider, start_api_server, tmp_path)
+        status, _, headers, _ = post_json(
+            f"{server}/api/generate", {"selections": {"genre": "No Such Genre"}},
+            {"traceparent": TRACEPARENT}, timeout=30,
+        )
+
+        assert status == 400
+        names = [m["name"] for m in parse_server_timing(headers["Server-Timing"])]
+        assert "prompt" in names
+        assert not provider.prompts
+
+    def test_retried_upstream_attempts_are_separate(self, fake_provider, start_api_server, tmp_path):
+        """Отклонённый ключ и повтор с другим — два спана upstream со своими статусами."""
+        _, server = _server(
+            fake_provider, start_api_server, tmp_path,
+            rpm_by_key={"key-bad-0000": 100, KEY: 100}, keys=f"key-bad-0000,{KEY}",
+            unauthorized=("key-bad-0000",),
+        )
+
+        _, headers = _generate(server, TRACEPARENT)
+        upstream = [m for m in parse_server_timing(headers["Server-Timing"]) if m["name"] == "upstream"]
+
+        assert [m["description"] for m in upstream] == ["401", "200"]
+        keys = [event["args"]["key"] for event in _server_trace(tmp_path, TRACE_ID)["upstream"]]
+        assert sorted(keys) == ["key-1", "key-2"]
+
+    def test_end_to_end_breakdown(self, driver, request_traces, fake_provider, start_api_server, tmp_path):
+        """Create! в браузере: одна трасса со стадиями клиента, сервера и провайдера."""
+        if not (PROJECT_ROOT / "dist" / "index.html").exists():
+            pytest.skip("Нет dist/ — выполните npm run build")
+
+        provider = fake_provider({KEY: 100}, latency=PROVIDER_LATENCY)
+        server = start_api_server(server_env(
+            provider.url, KEY, NODE_ENV="production", YomaTraceDir=str(tmp_path),
+        ))
+        request_traces.server_trace_dir = tmp_path
+
+        skip_dialog_via_storage(driver, server)
+        driver.find_element(By.XPATH, "//button[contains(@class, 'rainbow-btn')]").click()
+        WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.XPATH, "//h1[contains(text(), \"Yoma's Idea\")]"))
+        )
+        trace, = request_traces.wait_for(1)
+        stages = trace.breakdown()
+
+        assert provider.traceparents[0].split("-")[1] == trace.trace_id
+        for stage in ("client.request", "client.parse", "client.render", "client.generate",
+                      "server.total", "server.upstream", "proxy"):
+            assert stage in stages, f"Нет стадии {stage}: {stages}"
+        assert stages["server.upstream"] >= PROVIDER_LATENCY * 1000
+        assert stages["client.request"] >= stages["server.total"]
+        assert stages["client.generate"] >= (
+            stages["client.request"] + stages["client.parse"] + stages["client.render"] - 1
+        )
+        assert trace.server_spans("upstream"), "Серверная трасса не записана"
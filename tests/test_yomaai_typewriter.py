@@ -0,0 +1,123 @@
+"""
+Автотесты YomaAI — производительность TypewriterDialog.
+
+Тест 17: Коммиты React и long tasks во время печати реплики
+
+Счётчик коммитов — подставной __REACT_DEVTOOLS_GLOBAL_HOOK__:
+React вызывает hook.onCommitFiberRoot на каждый коммит (и в dev,
+и в production-сборке). Long tasks собирает PerformanceObserver.
+Оба ставятся через CDP до загрузки страницы.
+"""
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from helpers import RENDER_STATS_JS
+
+
+# Реплики из TypewriterDialog.tsx
+FIRST_LINE = "Hi! I'll save you from the agony, at least partially, hee-hee.."
+SECOND_LINE = "I'll help you create an idea for your masterpiece! Are you ready?"
+CHAR_DELAY_MS = 3
+
+# Раньше было по коммиту на символ (~65 на реплику). С батчами по кадрам
+# печать ~200 мс — это ~12 кадров при 60 FPS; запас на медленный CI.
+MAX_COMMITS_PER_LINE = 25
+
+DIALOG_TEXT = (By.XPATH, "//div[contains(@class, 'border-gray-800')]//p[contains(@class, 'text-xl')]")
+
+
+# ─── Хелперы ──────────────────────────────────────────────────
+
+def _open_dialog(driver, base_url: str) -> None:
+    """Ставит счётчики и открывает /create с диалогом."""
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": RENDER_STATS_JS})
+    driver.get(base_url)
+    driver.execute_script("localStorage.removeItem('yoma-skip-dialog');")
+    driver.get(f"{base_url}/create")
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Yoma:')]"))
+    )
+
+
+def _button(driver, text: str, timeout: float = 5):
+    return WebDriverWait(driver, timeout).until(
+        EC.element_to_be_clickable((By.XPATH, f"//button[contains(text(), \"{text}\")]"))
+    )
+
+
+def _stats_since(driver, since: float) -> dict:
+    """Коммиты и long tasks после отметки performance.now()."""
+    return driver.execute_script(
+        """
+        const stats = window.__yomaRenderStats;
+        const since = arguments[0];
+        const commits = stats.commits.filter((t) => t >= since);
+        return {
+          commits: commits.length,
+          lastCommitMs: commits.length ? commits[commits.length - 1] - since : 0,
+          longTasks: stats.longTasks.filter((t) => t.start >= since).map((t) => t.duration),
+        };
+        """,
+        since,
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Тест 17: Рендеринг печатной машинки
+# ─────────────────────────────────────────────────────────────
+class TestTypewriterRendering:
+    """Печать идёт батчами по кадрам, а не рендером на каждый символ."""
+
+    def test_line_renders_in_frame_batches(self, driver, base_url, record_property):
+        """Вторая реплика печатается за ≤25 коммитов без long tasks и с прежним темпом."""
+        _open_dialog(driver, base_url)
+        _button(driver, "Next")
+
+        started = driver.execute_script("return performance.now()")
+        driver.find_element(By.XPATH, "//button[contains(text(), 'Next')]").click()
+        _button(driver, "Let's go!")
+        stats = _stats_since(driver, started)
+
+        record_property("typewriter_commits", stats["commits"])
+        record_property("typewriter_duration_ms", round(stats["lastCommitMs"]))
+        record_property("typewriter_long_tasks", len(stats["longTasks"]))
+
+        assert driver.find_element(*DIALOG_TEXT).text == SECOND_LINE
+        assert stats["commits"] <= MAX_COMMITS_PER_LINE, (
+            f"{stats['commits']} коммитов React на реплику из {len(SECOND_LINE)} символов"
+        )
+        assert stats["lastCommitMs"] >= len(SECOND_LINE) * CHAR_DELAY_MS * 0.8, (
+            f"Реплика напечатана слишком быстро: {stats['lastCommitMs']:.0f} мс"
+        )
+        assert not stats["longTasks"], f"Long tasks во время печати: {stats['longTasks']}"
+
+    def test_reduced_motion_shows_line_at_once(self, driver, base_url):
+        """С prefers-reduced-motion реплика показывается целиком, без анимации."""
+        driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {
+            "features": [{"name": "prefers-reduced-motion", "value": "reduce"}],
+        })
+        _open_dialog(driver, base_url)
+
+        assert driver.find_element(*DIALOG_TEXT).text == FIRST_LINE
+        _button(driver, "Next", timeout=1)
+
+    def test_click_reveals_rest_of_line(self, driver, base_url):
+        """Клик по окну диалога сразу дописывает реплику до конца."""
+        _open_dialog(driver, base_url)
+        _button(driver, "Next")
+
+        # Next и клик по окну в одной задаче — печать второй реплики
+        # гарантированно не успевает закончиться сама.
+        text = driver.execute_async_script(
+            """
+            const done = arguments[arguments.length - 1];
+            [...document.querySelectorAll('button')].find((b) => b.textContent === 'Next').click();
+            document.querySelector('div.border-gray-800').click();
+            requestAnimationFrame(() => done(document.querySelector('div.border-gray-800 p').textContent));
+            """
+        )
+
+        assert text == SECOND_LINE
+        _button(driver, "Let's go!", timeout=1)
@@ -0,0 +1,162 @@
+"""
+Сквозные трассы генерации для автотестов YomaAI: браузер → Express → провайдер.
+
+Откуда берутся спаны:
+  - браузер: performance.measure("yoma:<stage>") из CreateIdeaPage —
+    request, parse, render, generate (detail.traceId — id трассы);
+  - сервер, кратко: serverTiming ресурса /api/generate (заголовок
+    Server-Timing: parse, prompt, acquire, upstream, download, sections, total);
+  - сервер, полностью: Chrome trace JSON, который сервер пишет
+    в YomaTraceDir (<traceId>-<spanId>.json).
+
+Трасса связывается по traceparent: страница отправляет его в запросе,
+сервер возвращает его в Server-Timing. Разбивка по стадиям — в миллисекундах;
+export() собирает браузерные и серверные события в один файл для
+chrome://tracing или ui.perfetto.dev.
+"""
+
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+COLLECT_JS = """
+const measures = performance.getEntriesByType('measure')
+    .filter((m) => m.name.startsWith('yoma:') && m.detail && m.detail.traceId)
+    .map((m) => ({
+        stage: m.name.slice(5),
+        start: performance.timeOrigin + m.startTime,
+        duration: m.duration,
+        traceId: m.detail.traceId,
+    }));
+const resources = performance.getEntriesByType('resource')
+    .filter((r) => new URL(r.name).pathname === '/api/generate')
+    .map((r) => ({
+        start: performance.timeOrigin + r.startTime,
+        duration: r.duration,
+        serverTiming: r.serverTiming.map((t) => ({
+            name: t.name, duration: t.duration, description: t.description,
+        })),
+    }));
+return {measures, resources};
+"""
+
+
+@dataclass
+class RequestTrace:
+    """Одна генерация: стадии браузера, Server-Timing и события серверной трассы."""
+
+    trace_id: str
+    client: list[dict] = field(default_factory=list)
+    server_timing: list[dict] = field(default_factory=list)
+    server_events: list[dict] = field(default_factory=list)
+
+    def breakdown(self) -> dict[str, float]:
+        """
+        Миллисекунды по стадиям: client.* — браузер, server.* — сервер
+        (повторные спаны, например попытки upstream, суммируются),
+        proxy — запрос минус время сервера: прокси Vite, сеть, очередь браузера.
+        """
+        stages: dict[str, float] = defaultdict(float)
+        for measure in self.client:
+            stages[f"client.{measure['stage']}"] += measure["duration"]
+        for metric in self.server_timing:
+            if metric["name"] != "traceparent":
+                stages[f"server.{metric['name']}"] += metric["duration"]
+        if "client.request" in stages and "server.total" in stages:
+            stages["proxy"] = stages["client.request"] - stages["server.total"]
+        return {name: round(ms, 1) for name, ms in stages.items()}
+
+    def server_spans(self, name: str) -> list[dict]:
+        """События серверной трассы с данным именем (нужен каталог трасс сервера)."""
+        return [event for event in self.server_events if event.get("name") == name]
+
+
+class TraceCollector:
+    """Собирает трассы вкладки driver и, если задан каталог, серверные файлы."""
+
+    def __init__(self, driver, server_trace_dir: Path | None = None):
+        self.driver = driver
+        self.server_trace_dir = server_trace_dir
+
+    def _browser(self) -> dict:
+        return self.driver.execute_script(COLLECT_JS)
+
+    def wait_for(self, count: int = 1, timeout: float = 30) -> list[RequestTrace]:
+        """Ждёт count завершённых генераций (стадия generate) и возвращает трассы."""
+        deadline = time.monotonic() + timeout
+        while True:
+            traces = self.collect()
+            finished = [t for t in traces if any(m["stage"] == "generate" for m in t.client)]
+            if len(finished) >= count:
+                return finished
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Завершено генераций: {len(finished)} из {count} за {timeout} с")
+            time.sleep(0.1)
+
+    def collect(self) -> list[RequestTrace]:
+        """Все трассы вкладки в порядке начала."""
+        browser = self._browser()
+        traces: dict[str, RequestTrace] = {}
+        for measure in sorted(browser["measures"], key=lambda m: m["start"]):
+            trace_id = measure["traceId"]
+            traces.setdefault(trace_id, RequestTrace(trace_id)).client.append(measure)
+
+        for resource in browser["resources"]:
+            trace_id = _trace_id(resource["serverTiming"])
+            if trace_id in traces:
+                traces[trace_id].server_timing = resource["serverTiming"]
+
+        for trace in traces.values():
+            trace.server_events = self._server_events(trace.trace_id)
+        return list(traces.values())
+
+    def _server_events(self, trace_id: str) -> list[dict]:
+        if self.server_trace_dir is None:
+            return []
+        events = []
+        for path in sorted(self.server_trace_dir.glob(f"{trace_id}-*.json")):
+            events.extend(json.loads(path.read_text(encoding="utf-8"))["traceEvents"])
+        return events
+
+    def export(self, path: Path) -> Path:
+        """Trace Event Format: браузерные стадии и серверные спаны на одной шкале."""
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": "Browser"}}]
+        for trace in self.collect():
+            for measure in trace.client:
+                events.append({
+                    "name": measure["stage"], "cat": "browser", "ph": "X", "pid": 1, "tid": 0,
+                    "ts": round(measure["start"] * 1000), "dur": round(measure["duration"] * 1000),
+                    "args": {"traceId": trace.trace_id},
+                })
+            events.extend(trace.server_events)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events}), encoding="utf-8")
+        return path
+
+
+def _trace_id(server_timing: list[dict]) -> str | None:
+    """id трассы из метрики traceparent;desc="00-<traceId>-<spanId>-01"."""
+    for metric in server_timing:
+        if metric["name"] == "traceparent":
+            parts = metric["description"].split("-")
+            if len(parts) == 4:
+                return parts[1]
+    return None
+
+
+def parse_server_timing(header: str) -> list[dict]:
+    """Заголовок Server-Timing → [{"name", "duration", "description"}], как serverTiming в браузере."""
+    metrics = []
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, *params = (part.strip() for part in entry.split(";"))
+        metric = {"name": name, "duration": 0.0, "description": ""}
+        for param in params:
+            key, _, value = param.partition("=")
+            if key == "dur":
+                metric["duration"] = float(value)
+            elif key == "desc":
+                metric["description"] = value.strip('"')
+        metrics.append(metric)
+    return metrics
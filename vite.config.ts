@@ -1,9 +1,46 @@
-import { defineConfig } from 'vite'
+import fs from 'fs'
+import path from 'path'
+import zlib from 'zlib'
+import { defineConfig, type Plugin } from 'vite'
 import react from '@vitejs/plugin-react'
 import tailwindcss from '@tailwindcss/vite'
 
+const COMPRESSIBLE = /\.(js|css|html|svg|json|txt)$/
+const MIN_COMPRESS_BYTES = 1024
+
+// Writes .br and .gz siblings for every text asset of the build,
+// so the production server never compresses static files per request.
+function precompress(): Plugin {
+  let outDir = 'dist'
+
+  return {
+    name: 'yoma-precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = path.resolve(config.root, config.build.outDir)
+    },
+    writeBundle(_options, bundle) {
+      for (const fileName of Object.keys(bundle)) {
+        if (!COMPRESSIBLE.test(fileName)) continue
+
+        const filePath = path.join(outDir, fileName)
+        const raw = fs.readFileSync(filePath)
+        if (raw.length < MIN_COMPRESS_BYTES) continue
+
+        fs.writeFileSync(
+          filePath + '.br',
+          zlib.brotliCompressSync(raw, {
+            params: { [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY },
+          }),
+        )
+        fs.writeFileSync(filePath + '.gz', zlib.gzipSync(raw, { level: 9 }))
+      }
+    },
+  }
+}
+
 export default defineConfig({
-  plugins: [react(), tailwindcss()],
+  plugins: [react(), tailwindcss(), precompress()],
   server: {
     proxy: {
       '/api': {